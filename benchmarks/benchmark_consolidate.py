@@ -0,0 +1,39 @@
+"""Time statement consolidation on generated statements of 10k to 1M rows
+
+Usage: python benchmarks/benchmark_consolidate.py [rows ...]
+
+The row-by-row reference is only timed up to LEGACY_MAX_ROWS, above that it
+takes minutes. Where both run, their results are checked to be identical.
+"""
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.database import consolidate_statement
+from tests.legacy_consolidate import LegacyConsolidation
+from tests.statement_factory import make_statement
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+LEGACY_MAX_ROWS = 100_000
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for n_rows in sizes:
+        raw = make_statement(n_rows)
+        start = time.perf_counter()
+        result = consolidate_statement(raw.copy())
+        vectorized = time.perf_counter() - start
+        line = f"{n_rows:>9,} rows -> {len(result):>8,} sales: vectorized {vectorized:8.3f}s"
+
+        if n_rows <= LEGACY_MAX_ROWS:
+            start = time.perf_counter()
+            expected = LegacyConsolidation().process_statement_data(raw.copy())
+            legacy = time.perf_counter() - start
+            pd.testing.assert_frame_equal(result, expected, check_exact=True)
+            line += f"  row by row {legacy:8.3f}s  x{legacy / vectorized:.0f}, identical"
+        print(line)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, 
                            QTabWidget, QFileDialog, QMessageBox, QDialog)
 from PySide6.QtCore import QSettings, Qt
@@ -10,6 +11,7 @@ from modules.settings import SettingsWidget
 from modules.sales import SalesWidget
 from modules.inventory import InventoryWidget
 from modules.database import Database
+from modules.data_watcher import DataWatcher
 from modules.welcome import WelcomeDialog
 from modules.theme import ThemeManager
 from modules.sidebar import Sidebar, MainContent
@@ -34,7 +36,11 @@ class MainWindow(QMainWindow):
         
         # Initialize database
         storage_path = self.settings.value('storage_location')
-        self.db = Database(storage_path)
+        self.db = Database(storage_path, self.settings.value('storage_backend'))
+        # Receipts left unreferenced by a previous session (e.g. a crash mid import) are collected in the background
+        self.db.collect_receipts()
+        # Tells the pages when the data they show changes
+        self.data_watcher = DataWatcher(self.db, self)
         
         # Setup UI
         self.setup_ui()
@@ -84,11 +90,11 @@ class MainWindow(QMainWindow):
         self.main_content = MainContent()
         
         # Create and add dashboard (index 0)
-        self.dashboard = DashboardWidget(self.db, self.theme_manager, None)
+        self.dashboard = DashboardWidget(self.db, self.theme_manager, None, self.data_watcher)
         self.main_content.add_widget(self.dashboard, "Dashboard")
         
         # Create and add sales (index 1)
-        self.sales = SalesWidget(self.db, self.theme_manager)
+        self.sales = SalesWidget(self.db, self.theme_manager, self.data_watcher)
         self.main_content.add_widget(self.sales, "Sales")
         
         # Create and add expenses (index 2)
@@ -108,6 +114,14 @@ class MainWindow(QMainWindow):
         
         # Add main content to layout
         layout.addWidget(self.main_content)
+    
+    def closeEvent(self, event):
+        # Let a running statement import or data migration stop before the window goes away
+        self.sales.stop_import()
+        self.settings_widget.stop_migration()
+        # Write changes still waiting in memory (e.g. inventory counts)
+        self.db.close()
+        super().closeEvent(event)
 
 def main():
     # Set platform-specific Qt environment variables
@@ -142,4 +156,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    # Statement imports use worker processes, which need this in frozen builds
+    multiprocessing.freeze_support()
     main()
@@ -1,7 +1,7 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, 
                               QGridLayout, QSizePolicy, QPushButton, QComboBox, 
-                              QTableWidget, QTableWidgetItem, QHeaderView, QScrollArea)
-from PySide6.QtCore import Qt, Signal, QTimer
+                              QTableWidget, QTableWidgetItem, QHeaderView, QScrollArea, QDateEdit)
+from PySide6.QtCore import Qt, Signal, QTimer, QDate
 from PySide6.QtGui import QFont, QColor
 import pandas as pd
 import os
@@ -13,6 +13,14 @@ import matplotlib.dates as mdates
 import numpy as np
 import calendar
 
+# Expenses chart series -> fee columns it adds up
+FEE_CHART_SERIES = {
+    'Etsy Fees': ['Item Transaction Fee', 'Shipping Transaction Fee', 'Processing Fee'],
+    'Listing Fees': ['Listing Fee'],
+    'Offsite Ads': ['Offsite Ads Fee'],
+    'Etsy Ads': ['Etsy Ads Fee']
+}
+
 class StatCard(QFrame):
     def __init__(self, title, value, parent=None):
         super().__init__(parent)
@@ -264,10 +272,11 @@ class ChartWidget(QFrame):
         self.update_chart_theme()
 
 class DashboardWidget(QWidget):
-    def __init__(self, db, theme_manager, sales_page):
+    def __init__(self, db, theme_manager, sales_page, data_watcher=None):
         super().__init__()
         self.db = db
         self.theme_manager = theme_manager
+        self.shown_key = None
         self.init_ui()
         
         self.current_month = datetime.now().month
@@ -276,6 +285,10 @@ class DashboardWidget(QWidget):
         if self.theme_manager:
             self.theme_manager.theme_changed.connect(self.on_theme_changed)
         
+        # Refresh when the sales or expenses change
+        if data_watcher:
+            data_watcher.changed.connect(self.on_data_changed)
+        
         QTimer.singleShot(0, self.refresh_dashboard)
         
     def init_ui(self):
@@ -289,7 +302,7 @@ class DashboardWidget(QWidget):
         years = self.db.get_all_years()  # Get years from both sales and expenses
         if not years:  # If no data, just show current year
             years = [datetime.now().year]
-        self.year_filter.addItems(['All Years'] + [str(year) for year in years])
+        self.year_filter.addItems(['All Years'] + [str(year) for year in years] + ['Custom Range'])
         self.year_filter.setCurrentText(str(datetime.now().year))
         self.year_filter.currentTextChanged.connect(self.on_year_changed)
         filter_layout.addWidget(QLabel("Year:"))
@@ -303,8 +316,23 @@ class DashboardWidget(QWidget):
         filter_layout.addWidget(QLabel("Month:"))
         filter_layout.addWidget(self.month_filter)
         
+        # Custom date range, shown when 'Custom Range' is selected
+        self.range_label = QLabel("From:")
+        self.start_date_edit = QDateEdit(QDate.currentDate().addDays(-89))
+        self.start_date_edit.setCalendarPopup(True)
+        self.start_date_edit.setDisplayFormat('yyyy-MM-dd')
+        self.start_date_edit.dateChanged.connect(self.refresh_dashboard)
+        self.range_to_label = QLabel("To:")
+        self.end_date_edit = QDateEdit(QDate.currentDate())
+        self.end_date_edit.setCalendarPopup(True)
+        self.end_date_edit.setDisplayFormat('yyyy-MM-dd')
+        self.end_date_edit.dateChanged.connect(self.refresh_dashboard)
+        for widget in (self.range_label, self.start_date_edit, self.range_to_label, self.end_date_edit):
+            widget.setVisible(False)
+            filter_layout.addWidget(widget)
+        
         self.refresh_btn = QPushButton("Refresh")
-        self.refresh_btn.clicked.connect(self.refresh_dashboard)
+        self.refresh_btn.clicked.connect(lambda: self.refresh_dashboard(force=True))
         filter_layout.addWidget(self.refresh_btn)
         
         filter_layout.addStretch()
@@ -425,41 +453,24 @@ class DashboardWidget(QWidget):
         
     def get_filtered_data(self):
         try:
-            all_data = []
-            for filename in os.listdir(self.db.statements_dir):
-                if not filename.endswith('.csv'):
-                    continue
-                    
-                file_path = os.path.join(self.db.statements_dir, filename)
-                try:
-                    df = pd.read_csv(file_path)
-                    processed_df = self.db.process_statement_data(df)
-                    if processed_df is not None:
-                        all_data.append(processed_df)
-                except Exception as e:
-                    continue
-                    
-            if not all_data:
-                return None
-                
-            df = pd.concat(all_data, ignore_index=True)
-            if df.empty:
-                return None
-                
-            # Convert date column to datetime
-            df['Date'] = pd.to_datetime(df['Date'])
+            if self.is_custom_range():
+                start_date, end_date = self.get_date_filter()
+                df = self.db.sales_store.get_filtered(start_date=start_date, end_date=end_date)
+                return None if df.empty else df
             
             # Apply year filter if not 'All Years'
+            year = None
             selected_year = self.year_filter.currentText()
             if selected_year != 'All Years':
-                df = df[df['Date'].dt.year == int(selected_year)]
+                year = int(selected_year)
             
             # Apply month filter if not 'All Months'
+            month = None
             selected_month = self.month_filter.currentText()
             if selected_month != 'All Months':
-                month_num = list(calendar.month_name).index(selected_month)
-                df = df[df['Date'].dt.month == month_num]
+                month = list(calendar.month_name).index(selected_month)
             
+            df = self.db.sales_store.get_filtered(year=year, month=month)
             if df.empty:
                 return None
                 
@@ -469,6 +480,9 @@ class DashboardWidget(QWidget):
             print(f"Error getting filtered data: {str(e)}")
             return None
 
+    def is_custom_range(self):
+        return self.year_filter.currentText() == 'Custom Range'
+
     def get_date_filter(self):
         selected_year = self.year_filter.currentText()
         selected_month = self.month_filter.currentText()
@@ -478,6 +492,11 @@ class DashboardWidget(QWidget):
         if selected_year == 'All Years':
             return None, None
         
+        if self.is_custom_range():
+            start = self.start_date_edit.date()
+            end = self.end_date_edit.date()
+            return datetime(start.year(), start.month(), start.day()), datetime(end.year(), end.month(), end.day())
+        
         year = int(selected_year)
         
         if selected_month != 'All Months':
@@ -511,46 +530,58 @@ class DashboardWidget(QWidget):
         self.sales_chart.plot_data(empty_data, title='Sales Over Time')
         self.expenses_chart.plot_data(empty_data, title='Expenses Over Time')
 
-    def refresh_dashboard(self):
+    def get_filtered_rollup(self):
+        """Get the precomputed sales totals for the selected year and month or date range"""
+        if self.is_custom_range():
+            # Two prefix-sum lookups per category, no matter how long the range
+            return self.db.get_range_totals(*self.get_date_filter())
+        
+        selected_year = self.year_filter.currentText()
+        selected_month = self.month_filter.currentText()
+        year = int(selected_year) if selected_year != 'All Years' else None
+        month = list(calendar.month_name).index(selected_month) if selected_month != 'All Months' else None
+        return self.db.get_sales_rollup(year=year, month=month)
+
+    def get_shown_key(self):
+        """Get the data versions and filters the dashboard is built from"""
+        return (self.db.get_data_version('sales'), self.db.get_data_version('expenses'),
+                self.year_filter.currentText(), self.month_filter.currentText(),
+                self.start_date_edit.date(), self.end_date_edit.date())
+
+    def refresh_dashboard(self, force=False):
+        """Rebuild the cards and charts unless nothing changed since they were last built"""
         try:
-            df = self.get_filtered_data()
-            if df is None or df.empty:
+            key = self.get_shown_key()
+            if not force and key == self.shown_key:
+                return
+            self.shown_key = key
+            rollup = self.get_filtered_rollup()
+            if rollup['rows'] == 0:
                 self.reset_metrics()
                 return
             
-            self.update_metrics(df)
-            self.update_charts(df)
+            self.update_metrics(rollup)
+            self.update_charts(self.get_filtered_data())
             
         except Exception:
             self.reset_metrics()
 
-    def update_metrics(self, df):
+    def update_metrics(self, rollup):
         try:
-            total_sales = df['Sale Amount'].sum()
-            total_orders = len(df[df['Sale Amount'] > 0])
+            total_sales = rollup['sales']
+            total_orders = rollup['orders']
             avg_order_value = total_sales / total_orders if total_orders > 0 else 0
-            total_shipping = df['Shipping Fee'].sum()
-            total_tax = df['Sales Tax'].sum()
-            total_fees = df['Item Transaction Fee'].sum() + df['Shipping Transaction Fee'].sum() + df['Processing Fee'].sum()
-            total_listing_fees = df['Listing Fee'].sum()
-            total_offsite_ads = df['Offsite Ads Fee'].sum()
-            total_etsy_ads = df['Etsy Ads Fee'].sum()
+            total_shipping = rollup['shipping']
+            total_tax = rollup['tax']
+            total_fees = rollup['transaction_fees'] + rollup['processing_fees']
+            total_listing_fees = rollup['listing_fees']
+            total_offsite_ads = rollup['offsite_ads_fees']
+            total_etsy_ads = rollup['etsy_ads_fees']
             net_income = total_sales + total_shipping + total_tax + total_fees + total_listing_fees + total_offsite_ads + total_etsy_ads
             
             
             start_date, end_date = self.get_date_filter()
-            
-            expenses = self.db.get_expenses()
-            total_expenses = 0
-            
-            if expenses:
-                for expense in expenses:
-                    expense_date = datetime.strptime(expense['date'], '%Y-%m-%d')
-                    if start_date and end_date:
-                        if start_date <= expense_date <= end_date:
-                            total_expenses += float(expense['amount'])
-                    else:
-                        total_expenses += float(expense['amount'])
+            total_expenses = self.db.get_expense_total(start_date, end_date)
             
             total_profit = net_income - total_expenses
             profit_margin = (total_profit / total_sales * 100) if total_sales > 0 else 0
@@ -593,64 +624,21 @@ class DashboardWidget(QWidget):
             
             start_date, end_date = self.get_date_filter()
             
-            fees_data = {
-                'Date': [],
-                'Amount': [],
-                'Type': []
-            }
+            # Daily totals of each fee series, summing the absolute value of every fee (missing fees count as 0)
+            fees = pd.DataFrame({
+                series: sum(df[column].abs().fillna(0) for column in columns)
+                for series, columns in FEE_CHART_SERIES.items()
+            }).groupby(pd.to_datetime(df['Date'])).sum()
             
-            if not df.empty:
-                for _, row in df.iterrows():
-                    date = pd.to_datetime(row['Date'])
-                    
-                    if row['Item Transaction Fee'] != 0:
-                        fees_data['Date'].append(date)
-                        fees_data['Amount'].append(abs(row['Item Transaction Fee']))
-                        fees_data['Type'].append('Etsy Fees')
-                    
-                    if row['Shipping Transaction Fee'] != 0:
-                        fees_data['Date'].append(date)
-                        fees_data['Amount'].append(abs(row['Shipping Transaction Fee']))
-                        fees_data['Type'].append('Etsy Fees')
-                    
-                    if row['Processing Fee'] != 0:
-                        fees_data['Date'].append(date)
-                        fees_data['Amount'].append(abs(row['Processing Fee']))
-                        fees_data['Type'].append('Etsy Fees')
-                    
-                    if row['Listing Fee'] != 0:
-                        fees_data['Date'].append(date)
-                        fees_data['Amount'].append(abs(row['Listing Fee']))
-                        fees_data['Type'].append('Listing Fees')
-                        
-                    if row['Offsite Ads Fee'] != 0:
-                        fees_data['Date'].append(date)
-                        fees_data['Amount'].append(abs(row['Offsite Ads Fee']))
-                        fees_data['Type'].append('Offsite Ads')
-                        
-                    if row['Etsy Ads Fee'] != 0:
-                        fees_data['Date'].append(date)
-                        fees_data['Amount'].append(abs(row['Etsy Ads Fee']))
-                        fees_data['Type'].append('Etsy Ads')
+            # Keep only the days and series that have a fee
+            fees = fees.loc[fees.sum(axis=1) != 0, fees.sum() != 0]
             
-            expenses = self.db.get_expenses()
-            if expenses:
-                for expense in expenses:
-                    expense_date = datetime.strptime(expense['date'], '%Y-%m-%d')
-                    if start_date and end_date:
-                        if start_date <= expense_date <= end_date:
-                            fees_data['Date'].append(expense_date)
-                            fees_data['Amount'].append(float(expense['amount']))
-                            fees_data['Type'].append('Other Expenses')
-                    else:
-                        fees_data['Date'].append(expense_date)
-                        fees_data['Amount'].append(float(expense['amount']))
-                        fees_data['Type'].append('Other Expenses')
+            expenses = self.db.get_expenses_df(start_date, end_date)
+            if not expenses.empty:
+                fees = fees.join(expenses.groupby('date')['amount'].sum().rename('Other Expenses'), how='outer')
             
-            if fees_data['Date']:
-                fees_df = pd.DataFrame(fees_data)
-                
-                daily_fees = fees_df.groupby(['Date', 'Type'])['Amount'].sum().unstack(fill_value=0)
+            if not fees.empty:
+                daily_fees = fees.fillna(0)
                 
                 plot_data = {
                     'labels': daily_fees.index,
@@ -670,12 +658,21 @@ class DashboardWidget(QWidget):
 
     def on_year_changed(self, selected_year):
         """Handle year selection changes"""
-        if selected_year == 'All Years':
+        is_custom_range = selected_year == 'Custom Range'
+        for widget in (self.range_label, self.start_date_edit, self.range_to_label, self.end_date_edit):
+            widget.setVisible(is_custom_range)
+        
+        if selected_year == 'All Years' or is_custom_range:
             self.month_filter.setCurrentText('All Months')
             self.month_filter.setEnabled(False)
         else:
             self.month_filter.setEnabled(True)
         self.refresh_dashboard()
 
+    def on_data_changed(self, area):
+        """Rebuild when the sales or expenses changed since the dashboard was last built"""
+        if area in ('sales', 'expenses') and self.get_shown_key() != self.shown_key:
+            self.refresh_dashboard()
+
     def on_theme_changed(self, is_dark):
-        self.refresh_dashboard()
+        self.refresh_dashboard(force=True)
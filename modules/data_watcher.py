@@ -0,0 +1,94 @@
+import os
+from PySide6.QtCore import QObject, QTimer, QFileSystemWatcher, Signal
+
+class DataWatcher(QObject):
+    """Tells pages when the data they show changes, instead of having them poll
+
+    Database reports its own changes through a change listener, and a
+    QFileSystemWatcher on the statements directory catches statements added,
+    removed or edited outside the app. Notifications are collected for a
+    short moment and then emitted as one changed(area) per area, so nothing
+    runs while the data stays the same.
+    """
+
+    changed = Signal(str)
+    # Carries Database notifications, which may come from worker threads, to the GUI thread
+    _notified = Signal(str)
+
+    NOTIFY_DELAY = 200
+    CHECK_DELAY = 500
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._pending_areas = set()
+        self._paused = False
+
+        self._notify_timer = QTimer(self)
+        self._notify_timer.setSingleShot(True)
+        self._notify_timer.setInterval(self.NOTIFY_DELAY)
+        self._notify_timer.timeout.connect(self._emit_pending)
+
+        # Statement writes come in bursts (copies, temporary files), so check once they settle
+        self._check_timer = QTimer(self)
+        self._check_timer.setSingleShot(True)
+        self._check_timer.setInterval(self.CHECK_DELAY)
+        self._check_timer.timeout.connect(self.check_statements)
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_statements_changed)
+        self.watcher.fileChanged.connect(self._on_statements_changed)
+        self._watch_statements()
+
+        self._notified.connect(self._on_notified)
+        db.add_change_listener(self._notified.emit)
+
+    def _watch_statements(self):
+        """Watch the current statements directory and the statement files in it"""
+        paths = [self.db.statements_dir] if os.path.isdir(self.db.statements_dir) else []
+        paths += self.db.get_statement_files() if paths else []
+        watched = set(self.watcher.directories() + self.watcher.files())
+        stale = list(watched - set(paths))
+        if stale:
+            self.watcher.removePaths(stale)
+        new = [path for path in paths if path not in watched]
+        if new:
+            self.watcher.addPaths(new)
+
+    def _on_statements_changed(self, path):
+        if not self._paused:
+            self._check_timer.start()
+
+    def check_statements(self):
+        """Reload the sales if the statement files changed"""
+        try:
+            self._watch_statements()
+            self.db.check_statements()
+        except Exception as e:
+            print(f"Error checking statements: {str(e)}")
+
+    def _on_notified(self, area):
+        self._pending_areas.add(area)
+        if not self._paused:
+            self._notify_timer.start()
+
+    def _emit_pending(self):
+        areas, self._pending_areas = self._pending_areas, set()
+        if 'sales' in areas:
+            # The statements directory moves with the storage location
+            self._watch_statements()
+        for area in sorted(areas):
+            self.changed.emit(area)
+
+    def pause(self):
+        """Hold back notifications, e.g. while statements are being replaced by an import"""
+        self._paused = True
+        self._check_timer.stop()
+        self._notify_timer.stop()
+
+    def resume(self):
+        """Send the notifications held back while paused and look for statement changes missed meanwhile"""
+        self._paused = False
+        if self._pending_areas:
+            self._notify_timer.start()
+        self._check_timer.start()
@@ -1,32 +1,387 @@
 import os
-import json
+import re
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, date
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from contextlib import contextmanager
+from collections import Counter
 import shutil
+import hashlib
+import threading
+import multiprocessing
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from .statement_cache import StatementCache, build_cached_statement, local_cache_dir
+from .sales_store import SalesStore
+from .order_index import OrderIndex
+from .search_index import SearchIndex, statement_search_tokens
+from .manifest import StatementManifest, summarize_statement
+from .rollup import ROLLUP_CATEGORIES
+from .range_index import RangeIndex
+from .storage import open_storage, SQLITE_FILENAME
+from .relocation import relocate
+from .receipt_store import ReceiptStore
+
+# Bump whenever consolidate_statement changes its output so cached statements are rebuilt
+STATEMENT_PARSER_VERSION = 1
+
+@lru_cache(maxsize=4096)
+def _date_ordinal(value):
+    """Get the ordinal of a date, datetime or YYYY-MM-DD string"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return value.toordinal()
+
+def _distinct(column):
+    """Factorize a column as text so string checks run once per distinct value"""
+    codes, uniques = pd.factorize(column.astype(str))
+    return codes, pd.Series(uniques, dtype=object)
+
+def _clean_amount_column(column):
+    """Convert a column of currency strings to floats (vectorized Database.clean_amount)"""
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(dtype=float)
+    
+    # '--' means no amount, while blank cells stay NaN like they did per row
+    is_blank = column.isna().to_numpy()
+    codes, uniques = _distinct(column)
+    text = uniques.str.replace('$', '', regex=False).str.replace(',', '', regex=False).str.strip()
+    text[uniques == '--'] = '0'
+    text[uniques.isin(['nan', '<NA>'])] = 'nan'
+    result = text.astype(float).to_numpy()[codes]
+    result[is_blank] = np.nan
+    return result
+
+def _extract_id(text, marker):
+    """Vectorized `text.split(marker)[-1].split()[0]`, NaN where marker is missing"""
+    return text.str.extract(r'(?s).*' + re.escape(marker) + r'\s*(\S+)', expand=False)
+
+def _first_rows(codes, mask, size):
+    """Index of the first masked row for each group code, -1 if there is none"""
+    rows = np.flatnonzero(mask)
+    first = np.full(size, -1)
+    unique_codes, index = np.unique(codes[rows], return_index=True)
+    first[unique_codes] = rows[index]
+    return first
+
+def _last_rows(codes, mask, size):
+    """Index of the last masked row for each group code, -1 if there is none"""
+    rows = np.flatnonzero(mask)[::-1]
+    last = np.full(size, -1)
+    unique_codes, index = np.unique(codes[rows], return_index=True)
+    last[unique_codes] = rows[index]
+    return last
+
+def _fold_in_order(codes, values, size, resets=None):
+    """Accumulate values per group strictly in row order
+    
+    Rows flagged in resets replace the running total instead of adding to it.
+    Groups are advanced one position at a time so floating point results match
+    the row-by-row accumulation exactly.
+    """
+    totals = np.zeros(size)
+    if len(codes) == 0:
+        return totals
+    
+    # Position of every row within its group
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    counts = np.diff(np.r_[starts, len(codes)])
+    position = np.empty(len(codes), dtype=np.int64)
+    position[order] = np.arange(len(codes)) - np.repeat(starts, counts)
+    
+    # Rows bucketed by position; every group appears at most once per bucket
+    by_position = np.argsort(position, kind='stable')
+    bounds = np.r_[0, np.cumsum(np.bincount(position))]
+    for step in range(len(bounds) - 1):
+        rows = by_position[bounds[step]:bounds[step + 1]]
+        groups = codes[rows]
+        added = totals[groups] + values[rows]
+        if resets is not None:
+            added = np.where(resets[rows], values[rows], added)
+        totals[groups] = added
+    return totals
+
+def consolidate_statement(df):
+    """Consolidate raw Etsy statement rows into one row per order, listing, label and ad day
+    
+    Vectorized equivalent of walking the statement row by row: every row is
+    classified up front and amounts are folded per order in row order, so
+    the result matches the original loop exactly.
+    """
+    amounts = _clean_amount_column(df['Amount'])
+    nets = _clean_amount_column(df['Net'])
+    
+    # Replace '--' with NaN
+    df = df.replace('--', pd.NA)
+    
+    # Try different date formats
+    for date_format in ['%d-%b-%y', '%B %d, %Y', '%Y-%m-%d']:
+        try:
+            df['Date'] = pd.to_datetime(df['Date'], format=date_format)
+            break
+        except:
+            continue
+    
+    if pd.api.types.is_datetime64_any_dtype(df['Date']) == False:
+        print("Failed to parse dates")
+        return None
+    
+    dates = df['Date'].to_numpy()
+    type_codes, types = _distinct(df['Type'])
+    title_codes, titles = _distinct(df['Title'])
+    info_codes, infos = _distinct(df['Info'])
+    
+    def is_type(*names):
+        return types.isin(names).to_numpy()[type_codes]
+    
+    def title_has(*phrases, lower=False):
+        text = titles.str.lower() if lower else titles
+        found = np.zeros(len(titles), dtype=bool)
+        for phrase in phrases:
+            found |= text.str.contains(phrase, regex=False).to_numpy()
+        return found[title_codes]
+    
+    def info_id(marker):
+        return _extract_id(infos, marker).to_numpy()[info_codes]
+    
+    # Extract order ID from Title or Info if present
+    has_title_order = title_has('Order #')
+    has_info_order = infos.str.contains('Order #', regex=False).to_numpy()[info_codes]
+    info_order_id = info_id('Order #')
+    order_id = np.where(has_title_order, _extract_id(titles, 'Order #').to_numpy()[title_codes], info_order_id)
+    
+    # Classify rows the way the row loop branches on them
+    is_fee = is_type('Fee')
+    is_listing = is_fee & title_has('Listing fee', 'Credit for listing fee')
+    is_label = is_type('Shipping') & title_has('shipping label', lower=True)
+    is_order = ~pd.isna(order_id) & ~is_listing & ~is_label
+    
+    # Consolidation keys, numbered in the order they are first seen
+    listing_id = np.where(is_listing, info_id('Listing #'), np.nan)
+    label_id = np.where(is_label, info_id('Label #'), np.nan)
+    is_listing_row = ~pd.isna(listing_id)
+    is_label_row = ~pd.isna(label_id)
+    keys = pd.Series(np.where(is_order, order_id, None), dtype=object)
+    keys[is_listing_row] = 'Listing_' + listing_id[is_listing_row].astype(object)
+    keys[is_label_row] = 'Label_' + label_id[is_label_row].astype(object)
+    codes, key_values = pd.factorize(keys)
+    key_count = len(key_values)
+    first_row = _first_rows(codes, codes >= 0, key_count)
+    
+    # Offsite ads and tax rows update the order named in Info, if it already exists
+    target = pd.Index(key_values).get_indexer(info_order_id)
+    target_exists = target >= 0
+    target_exists[target_exists] = first_row[target[target_exists]] <= np.flatnonzero(target_exists)
+    
+    is_order_fee = is_order & is_fee
+    is_sale = is_order & is_type('Sale', 'Refund')
+    is_refund = is_order & is_type('Refund')
+    is_shipping_fee = is_order_fee & title_has('Transaction fee: Shipping', 'Credit for transaction fee on shipping')
+    is_item_fee = is_order_fee & ~is_shipping_fee & title_has('Transaction fee:', 'Credit for transaction fee on')
+    is_processing_fee = (is_order_fee & ~is_shipping_fee & ~is_item_fee &
+                         title_has('Processing fee', 'Credit for processing fee'))
+    is_offsite = (is_order & is_type('Marketing') & has_info_order & target_exists &
+                  title_has('Fee for sale made through Offsite Ads'))
+    is_tax = is_order & is_type('Tax') & has_info_order & target_exists
+    
+    def fold(mask, values, key_codes=codes, resets=None):
+        return _fold_in_order(key_codes[mask], values[mask], key_count,
+                              None if resets is None else resets[mask])
+    
+    def last(mask, values, key_codes=codes):
+        result = np.zeros(key_count)
+        rows = _last_rows(key_codes, mask, key_count)
+        result[rows >= 0] = values[rows[rows >= 0]]
+        return result
+    
+    # Order amounts; sales and refunds replace the running net total
+    event_codes = np.where(is_offsite | is_tax, target, codes)
+    is_event = is_sale | is_shipping_fee | is_item_fee | is_processing_fee | is_offsite | is_tax
+    net = fold(is_event, np.where(is_sale, amounts, nets), key_codes=event_codes, resets=is_sale)
+    sale_amount = last(is_sale, amounts)
+    shipping_transaction_fee = fold(is_shipping_fee, nets)
+    item_transaction_fee = fold(is_item_fee, nets)
+    processing_fee = fold(is_processing_fee, nets)
+    offsite_ads_fee = last(is_offsite, nets, key_codes=target)
+    sales_tax = last(is_tax, nets, key_codes=target)
+    
+    # Listing fees and credits accumulate; a shipping label keeps its latest row
+    listing_fee = fold(is_listing_row, nets)
+    is_listing_key = is_listing_row[first_row]
+    net[is_listing_key] = listing_fee[is_listing_key]
+    label_row = _last_rows(codes, is_label_row, key_count)
+    is_label_key = label_row >= 0
+    shipping_fee = np.zeros(key_count)
+    shipping_fee[is_label_key] = nets[label_row[is_label_key]]
+    net[is_label_key] = shipping_fee[is_label_key]
+    
+    # Item names come from the first transaction fee, refunds are prefixed
+    names = titles.str.split('Transaction fee:').str[-1].where(
+        titles.str.contains('Transaction fee:', regex=False),
+        titles.str.split('Credit for transaction fee on').str[-1]).str.strip().to_numpy()
+    item_names = names[title_codes]
+    name_row = _first_rows(codes, is_item_fee & (item_names != ''), key_count)
+    refund_row = _first_rows(codes, is_refund, key_count)
+    refund_count = np.bincount(codes[is_refund], minlength=key_count)
+    
+    items = np.full(key_count, '', dtype=object)
+    has_name = name_row >= 0
+    items[has_name] = item_names[name_row[has_name]]
+    named_before_refund = has_name & ((refund_row < 0) | (name_row < refund_row))
+    items[(refund_count > 0) & ~named_before_refund] = 'Order'
+    for key in np.flatnonzero(refund_count):
+        items[key] = '[REFUNDED] ' * refund_count[key] + items[key]
+    
+    order_ids = np.asarray(key_values, dtype=object).copy()
+    key_dates = dates[first_row]
+    key_dates[is_label_key] = dates[label_row[is_label_key]]
+    order_ids[is_listing_key] = 'Listing #' + listing_id[first_row[is_listing_key]].astype(object)
+    items[is_listing_key] = 'Listing Fee'
+    order_ids[is_label_key] = 'Label #' + label_id[label_row[is_label_key]].astype(object)
+    items[is_label_key] = 'Shipping Label'
+    columns = {
+        'Date': key_dates,
+        'Order ID': order_ids,
+        'Items': items,
+        'Sale Amount': sale_amount,
+        'Shipping Fee': shipping_fee,
+        'Sales Tax': sales_tax,
+        'Shipping Transaction Fee': shipping_transaction_fee,
+        'Item Transaction Fee': item_transaction_fee,
+        'Processing Fee': processing_fee,
+        'Listing Fee': listing_fee,
+        'Offsite Ads Fee': offsite_ads_fee,
+        'Etsy Ads Fee': np.zeros(key_count),
+        'Net': net
+    }
+    
+    # Standalone Etsy Ads charges, one entry per day (the latest charge wins)
+    ads_rows = np.flatnonzero(is_type('Marketing') & title_has('Etsy Ads'))
+    if len(ads_rows):
+        day_codes, days = pd.factorize(pd.Series(dates[ads_rows]).dt.strftime('%Y-%m-%d'))
+        ads_rows = ads_rows[_last_rows(day_codes, day_codes >= 0, len(days))]
+        ads = {
+            'Date': dates[ads_rows],
+            'Order ID': np.full(len(ads_rows), 'Etsy Ads', dtype=object),
+            'Items': np.asarray([f"Ad clicks on {day}" for day in days], dtype=object),
+            'Etsy Ads Fee': nets[ads_rows],
+            'Net': nets[ads_rows]
+        }
+        columns = {
+            name: np.concatenate([values, ads.get(name, np.zeros(len(ads_rows)))])
+            for name, values in columns.items()
+        }
+    
+    result_df = pd.DataFrame(columns)
+    
+    # Sort by date
+    return result_df.sort_values('Date', ascending=False)
+
+def statement_order_ids(processed_df):
+    """Get the Order ID of each row of a consolidated statement, None where there is none"""
+    if processed_df is None or 'Order ID' not in processed_df:
+        return []
+    order_ids = processed_df['Order ID']
+    return [str(order_id) for order_id in order_ids.where(order_ids.notna(), None)]
+
+def cache_statement(source_path, cache_path):
+    """Consolidate a statement into its cache file, returns (cache entry, Order IDs, manifest summary, search tokens)
+    Runs in the import worker processes, so it must stay a module level function.
+    """
+    entry, processed_df = build_cached_statement(source_path, cache_path, consolidate_statement)
+    return (entry, statement_order_ids(processed_df), summarize_statement(processed_df),
+            statement_search_tokens(processed_df))
 
 class Database:
-    def __init__(self, storage_path):
+    def __init__(self, storage_path, backend=None):
         self.storage_path = storage_path
         self.expenses_file = os.path.join(storage_path, 'expenses.json')
         self.statements_dir = os.path.join(storage_path, 'statements')
         self.receipts_dir = os.path.join(storage_path, 'receipts')
         self.inventory_file = os.path.join(storage_path, 'inventory.json')
         self.inventory_images_dir = os.path.join(storage_path, 'inventory_images')
+        self.cache_dir = os.path.join(storage_path, 'cache')
         
         # Initialize storage files if they don't exist
         self._init_storage()
+        self.storage = open_storage(storage_path, backend)
+        self.statement_cache = StatementCache(local_cache_dir(storage_path), STATEMENT_PARSER_VERSION)
+        self.order_index = OrderIndex(os.path.join(self.cache_dir, 'order_index.json'))
+        self.manifest = StatementManifest(self.statements_dir)
+        self.search_index = SearchIndex(self.statements_dir, STATEMENT_PARSER_VERSION)
+        self.sales_store = SalesStore(self)
+        self._expenses_key = None
+        self._expense_views = ()
+        self._expense_ordinals = []
+        self._expenses_by_id = {}
+        self._expenses_df = None
+        self._expense_range_index = None
+        self._receipt_refcounts = None
+        self.receipt_store = ReceiptStore(self.receipts_dir)
+        # Held while statements are imported, which writes to the statements directory and its indexes
+        self._import_lock = threading.Lock()
+        # Bumped whenever the 'sales' or 'expenses' data changes, so pages only recompute when it did
+        self.data_versions = Counter()
+        self._change_listeners = []
     
     def _init_storage(self):
-        if not os.path.exists(self.expenses_file):
-            with open(self.expenses_file, 'w') as f:
-                json.dump([], f)
-        
         os.makedirs(self.statements_dir, exist_ok=True)
+        # Statement caches used to be pickled into the data directory, where they must not be loaded from
+        shutil.rmtree(os.path.join(self.cache_dir, 'statements'), ignore_errors=True)
         os.makedirs(self.receipts_dir, exist_ok=True)
         os.makedirs(self.inventory_images_dir, exist_ok=True)
-        if not os.path.exists(self.inventory_file):
-            with open(self.inventory_file, 'w') as f:
-                json.dump([], f)
+    
+    def add_change_listener(self, listener):
+        """Call listener(area) after the 'sales' or 'expenses' data changes
+        Listeners may be called from worker threads (e.g. a statement import).
+        """
+        self._change_listeners.append(listener)
+    
+    def get_data_version(self, area):
+        """Get a number that changes whenever the 'sales' or 'expenses' data does"""
+        return self.data_versions[area]
+    
+    def _data_changed(self, *areas):
+        for area in areas:
+            self.data_versions[area] += 1
+            for listener in self._change_listeners:
+                try:
+                    listener(area)
+                except Exception as e:
+                    print(f"Error notifying {area} change: {str(e)}")
+    
+    def switch_storage_backend(self, backend):
+        """Move expenses and inventory to another storage backend ('json' or 'sqlite')"""
+        if backend == self.storage.backend:
+            return
+        
+        expenses = self.storage.get_expenses()
+        inventory = self.storage.get_inventory()
+        old_storage = self.storage
+        new_file = os.path.join(self.storage_path, SQLITE_FILENAME) if backend == 'sqlite' else None
+        existed = new_file is not None and os.path.exists(new_file)
+        new_storage = open_storage(self.storage_path, backend)
+        try:
+            new_storage.replace_all(expenses, inventory)
+        except Exception:
+            # A half written database would be picked up as the storage on the next start
+            new_storage.close()
+            if new_file is not None and not existed:
+                for path in (new_file, new_file + '-wal', new_file + '-shm'):
+                    if os.path.exists(path):
+                        os.remove(path)
+            raise
+        self.storage = new_storage
+        old_storage.close()
+        
+        # Keep the database as a backup so the data directory opens as JSON again
+        if old_storage.backend == 'sqlite':
+            os.replace(old_storage.db_file, old_storage.db_file + '.bak')
+        self._data_changed('expenses')
     
     def add_expense(self, expense_data):
         """Add an expense to the database
@@ -36,55 +391,62 @@ class Database:
         - amount: float
         - receipt_file: optional string, path to receipt
         """
-        with open(self.expenses_file, 'r') as f:
-            expenses = json.load(f)
-        
-        # Find the next available ID
-        max_id = max([expense['id'] for expense in expenses]) if expenses else 0
-        next_id = max_id + 1
-        
-        expense = {
-            'id': next_id,
+        expense_id = self.storage.add_expense({
             'date': expense_data['date'],
             'description': expense_data['description'],
             'amount': expense_data['amount'],
             'receipt_file': expense_data.get('receipt_file')
-        }
-        
-        expenses.append(expense)
-        
-        with open(self.expenses_file, 'w') as f:
-            json.dump(expenses, f)
-        
-        return next_id
+        })
+        self._data_changed('expenses')
+        return expense_id
+    
+    def _load_expenses(self):
+        """Refresh the in-memory expenses if the storage changed since they were loaded"""
+        key = self.storage.expenses_version()
+        if self._expenses_key != key:
+            # Keep the expenses sorted by date next to their date ordinals for range lookups
+            expenses = sorted(
+                ((_date_ordinal(expense['date']), MappingProxyType(expense)) for expense in self.storage.get_expenses()),
+                key=lambda pair: pair[0]
+            )
+            self._expense_ordinals = [ordinal for ordinal, _ in expenses]
+            self._expense_views = tuple(expense for _, expense in expenses)
+            self._expenses_by_id = {expense['id']: expense for expense in self._expense_views}
+            self._expenses_df = None
+            self._expense_range_index = None
+            self._receipt_refcounts = None
+            self._expenses_key = key
+    
+    def _expense_bounds(self, start_date, end_date):
+        """Get the slice of the date-sorted expenses between two dates (inclusive, open ended when None)"""
+        self._load_expenses()
+        start = 0
+        end = len(self._expense_ordinals)
+        if start_date is not None:
+            start = bisect_left(self._expense_ordinals, _date_ordinal(start_date))
+        if end_date is not None:
+            end = bisect_right(self._expense_ordinals, _date_ordinal(end_date))
+        return start, max(start, end)
     
     def get_expenses(self, start_date=None, end_date=None):
-        with open(self.expenses_file, 'r') as f:
-            expenses = json.load(f)
-        
-        if start_date and end_date:
-            filtered_expenses = [
-                exp for exp in expenses 
-                if start_date <= datetime.fromisoformat(exp['date']).date() <= end_date
-            ]
-            return filtered_expenses
-        return expenses
+        """Get the expenses sorted by date as read-only mappings, optionally only those between two dates"""
+        start, end = self._expense_bounds(start_date, end_date)
+        return self._expense_views[start:end]
+    
+    def get_expense(self, expense_id):
+        """Get a single expense as a read-only mapping, or None if it does not exist"""
+        self._load_expenses()
+        return self._expenses_by_id.get(expense_id)
     
     def get_existing_order_ids(self):
-        """Get a set of all existing Order IDs from processed statements"""
-        existing_orders = set()
-        
-        for filename in os.listdir(self.statements_dir):
-            if filename.startswith('processed_') and filename.endswith('.csv'):
-                file_path = os.path.join(self.statements_dir, filename)
-                try:
-                    df = pd.read_csv(file_path)
-                    # Add all non-null Order IDs to the set
-                    existing_orders.update(str(order_id) for order_id in df['Order ID'].dropna())
-                except Exception as e:
-                    print(f"Error reading {filename}: {e}")
-                    
-        return existing_orders
+        """Get a set of all existing Order IDs from the stored statements
+        Answered from the order index, which imports, clears and statement reloads keep up to date.
+        """
+        return set(self.order_index.order_ids())
+    
+    def has_order(self, order_id):
+        """Check whether an Order ID appears in any stored statement, without reading any statement"""
+        return order_id in self.order_index
         
     def clean_amount(self, amount_str):
         """Convert currency string to float"""
@@ -97,189 +459,304 @@ class Database:
 
     def process_statement_data(self, df):
         """Process statement data to consolidate transactions by Order ID"""
-        # Replace '--' with NaN
-        df = df.replace('--', pd.NA)
-        
-        # Try different date formats
-        for date_format in ['%d-%b-%y', '%B %d, %Y', '%Y-%m-%d']:
+        return consolidate_statement(df)
+    
+    def get_statement_signature(self):
+        """Get the (name, size, mtime) of every statement file, to tell when they change"""
+        signature = []
+        for file_path in self.get_statement_files():
             try:
-                df['Date'] = pd.to_datetime(df['Date'], format=date_format)
-                break
-            except:
-                continue
+                stat = os.stat(file_path)
+                signature.append((os.path.basename(file_path), stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                pass
+        return tuple(signature)
+    
+    def check_statements(self):
+        """Reload the sales if statement files were added, removed or changed outside the app
+        Returns True when they were.
+        """
+        if self.sales_store.is_current() or not self.sales_store.reload():
+            return False
+        self._data_changed('sales')
+        return True
+    
+    def get_statement_files(self):
+        """Get the paths of all statement CSV files"""
+        return [
+            os.path.join(self.statements_dir, filename)
+            for filename in sorted(os.listdir(self.statements_dir))
+            if filename.endswith('.csv')
+        ]
+    
+    def load_statement(self, file_path):
+        """Get the consolidated data for a statement file, reprocessing it only when it changed"""
+        return self.statement_cache.load(file_path, self.process_statement_data)
+    
+    def load_statements(self):
+        """Get (file name, consolidated data) for every statement file, skipping unreadable ones"""
+        statements = []
+        file_paths = self.get_statement_files()
         
-        if pd.api.types.is_datetime64_any_dtype(df['Date']) == False:
-            print("Failed to parse dates")
-            return None
+        # Files that failed before are only retried once their content changes
+        failed_paths = {path for path in file_paths if self._failed_unchanged(path)}
         
-        # Initialize order data dictionary
-        orders = {}
+        # Rebuild stale cache entries in parallel (e.g. after a parser version bump)
+        stale_paths = [
+            path for path in file_paths
+            if path not in failed_paths and not self.statement_cache.is_current(path)
+        ]
+        rebuilt = len(stale_paths) > 1
+        if rebuilt:
+            self._consolidate_statements([(path, path) for path in stale_paths], self._record_statement)
         
-        # First pass: Process sales, refunds, and fees
-        for _, row in df.iterrows():
-            # Extract order ID from Title or Info if present
-            order_id = None
-            if 'Order #' in str(row['Title']):
-                order_id = row['Title'].split('Order #')[-1].split()[0]
-            elif 'Order #' in str(row['Info']):
-                order_id = row['Info'].split('Order #')[-1].split()[0]
-            
-            # Handle listing fees (create new entry)
-            if row['Type'] == 'Fee' and ('Listing fee' in str(row['Title']) or 'Credit for listing fee' in str(row['Title'])):
-                listing_id = None
-                if 'Listing #' in str(row['Info']):
-                    listing_id = row['Info'].split('Listing #')[-1].split()[0]
-                if listing_id:
-                    key = f"Listing_{listing_id}"
-                    if key not in orders:
-                        orders[key] = {
-                            'Date': row['Date'],
-                            'Order ID': f"Listing #{listing_id}",
-                            'Items': 'Listing Fee',
-                            'Sale Amount': 0.0,
-                            'Shipping Fee': 0.0,
-                            'Sales Tax': 0.0,
-                            'Shipping Transaction Fee': 0.0,
-                            'Item Transaction Fee': 0.0,
-                            'Processing Fee': 0.0,
-                            'Listing Fee': 0.0,
-                            'Offsite Ads Fee': 0.0,
-                            'Etsy Ads Fee': 0.0,
-                            'Net': 0.0
-                        }
-                    # Add the fee or credit
-                    fee_amount = self.clean_amount(row['Net'])
-                    orders[key]['Listing Fee'] += fee_amount
-                    orders[key]['Net'] += fee_amount
-                continue
-            
-            # Handle shipping labels (create new entry)
-            if row['Type'] == 'Shipping' and 'shipping label' in str(row['Title'].lower()):
-                label_id = None
-                if 'Label #' in str(row['Info']):
-                    label_id = row['Info'].split('Label #')[-1].split()[0]
-                if label_id:
-                    orders[f"Label_{label_id}"] = {
-                        'Date': row['Date'],
-                        'Order ID': f"Label #{label_id}",
-                        'Items': 'Shipping Label',
-                        'Sale Amount': 0.0,
-                        'Shipping Fee': self.clean_amount(row['Net']),
-                        'Sales Tax': 0.0,
-                        'Shipping Transaction Fee': 0.0,
-                        'Item Transaction Fee': 0.0,
-                        'Processing Fee': 0.0,
-                        'Listing Fee': 0.0,
-                        'Offsite Ads Fee': 0.0,
-                        'Etsy Ads Fee': 0.0,
-                        'Net': self.clean_amount(row['Net'])
-                    }
+        order_index_changed = rebuilt
+        manifest_changed = rebuilt
+        search_index_changed = rebuilt
+        for file_path in file_paths:
+            if file_path in failed_paths:
                 continue
-            
-            # Initialize order if not exists (for regular transactions)
-            if order_id and order_id not in orders:
-                orders[order_id] = {
-                    'Date': row['Date'],
-                    'Order ID': order_id,
-                    'Items': '',
-                    'Sale Amount': 0.0,
-                    'Shipping Fee': 0.0,
-                    'Sales Tax': 0.0,
-                    'Shipping Transaction Fee': 0.0,
-                    'Item Transaction Fee': 0.0,
-                    'Processing Fee': 0.0,
-                    'Listing Fee': 0.0,
-                    'Offsite Ads Fee': 0.0,
-                    'Etsy Ads Fee': 0.0,
-                    'Net': 0.0
-                }
-            
-            # Handle different transaction types
-            if order_id:
-                if row['Type'] == 'Sale':
-                    amount = self.clean_amount(row['Amount'])
-                    orders[order_id]['Sale Amount'] = amount
-                    orders[order_id]['Net'] = amount
-                
-                elif row['Type'] == 'Refund':
-                    amount = self.clean_amount(row['Amount'])
-                    orders[order_id]['Sale Amount'] = amount  # This will be negative
-                    orders[order_id]['Net'] = amount
-                    # Mark the items as refunded
-                    if orders[order_id]['Items']:
-                        orders[order_id]['Items'] = '[REFUNDED] ' + orders[order_id]['Items']
-                    else:
-                        orders[order_id]['Items'] = '[REFUNDED] Order'
+            name = os.path.basename(file_path)
+            try:
+                processed_df = self.load_statement(file_path)
+                if processed_df is not None:
+                    statements.append((name, processed_df))
                 
-                elif row['Type'] == 'Fee':
-                    fee_amount = self.clean_amount(row['Net'])
-                    if 'Transaction fee: Shipping' in row['Title'] or 'Credit for transaction fee on shipping' in row['Title']:
-                        orders[order_id]['Shipping Transaction Fee'] += fee_amount
-                        orders[order_id]['Net'] += fee_amount
-                    elif 'Transaction fee:' in row['Title'] or 'Credit for transaction fee on' in row['Title']:
-                        orders[order_id]['Item Transaction Fee'] += fee_amount
-                        orders[order_id]['Net'] += fee_amount
-                        # Extract item name from transaction fee if not already set
-                        if not orders[order_id]['Items']:
-                            if 'Transaction fee:' in row['Title']:
-                                item_name = row['Title'].split('Transaction fee:')[-1].strip()
-                            else:
-                                item_name = row['Title'].split('Credit for transaction fee on')[-1].strip()
-                            if item_name:
-                                orders[order_id]['Items'] = item_name
-                    elif 'Processing fee' in row['Title'] or 'Credit for processing fee' in row['Title']:
-                        orders[order_id]['Processing Fee'] += fee_amount
-                        orders[order_id]['Net'] += fee_amount
-                elif row['Type'] == 'Marketing':
-                    if 'Fee for sale made through Offsite Ads' in row['Title']:
-                        fee_amount = self.clean_amount(row['Net'])
-                        # Extract order ID from Info field for Offsite Ads
-                        if 'Order #' in str(row['Info']):
-                            order_id = row['Info'].split('Order #')[-1].split()[0]
-                            if order_id in orders:
-                                orders[order_id]['Offsite Ads Fee'] = fee_amount
-                                orders[order_id]['Net'] += fee_amount
-                elif row['Type'] == 'Tax':
-                    tax_amount = self.clean_amount(row['Net'])
-                    # Extract order ID from Info field for tax
-                    if 'Order #' in str(row['Info']):
-                        order_id = row['Info'].split('Order #')[-1].split()[0]
-                        if order_id in orders:
-                            orders[order_id]['Sales Tax'] = tax_amount
-                            orders[order_id]['Net'] += tax_amount
+                # Index statements that changed outside an import (or predate the indexes)
+                content_hash = self.statement_cache.content_hash(file_path)
+                if self.order_index.source_hash(name) != content_hash:
+                    self.order_index.set_source(name, content_hash, statement_order_ids(processed_df), save=False)
+                    order_index_changed = True
+                if self.manifest.content_hash(name) != content_hash:
+                    self.manifest.set_statement(name, content_hash, summarize_statement(processed_df), save=False)
+                    manifest_changed = True
+                if self.search_index.source_hash(name) != content_hash:
+                    self.search_index.set_source(name, content_hash, statement_search_tokens(processed_df), save=False)
+                    search_index_changed = True
+            except Exception as e:
+                print(f"Error processing {name}: {str(e)}")
+                try:
+                    self.manifest.set_failed(name, self._file_hash(file_path), save=False)
+                    manifest_changed = True
+                except OSError:
+                    pass
         
-        # Handle standalone Etsy Ads fees (not associated with orders)
-        for _, row in df.iterrows():
-            if row['Type'] == 'Marketing' and 'Etsy Ads' in row['Title']:
-                fee_amount = self.clean_amount(row['Net'])
-                # Create a unique key for this Etsy Ads charge
-                ads_date = row['Date'].strftime('%Y-%m-%d')
-                key = f"EtsyAds_{ads_date}"
-                
-                orders[key] = {
-                    'Date': row['Date'],
-                    'Order ID': 'Etsy Ads',
-                    'Items': f"Ad clicks on {ads_date}",
-                    'Sale Amount': 0.0,
-                    'Shipping Fee': 0.0,
-                    'Sales Tax': 0.0,
-                    'Shipping Transaction Fee': 0.0,
-                    'Item Transaction Fee': 0.0,
-                    'Processing Fee': 0.0,
-                    'Listing Fee': 0.0,
-                    'Offsite Ads Fee': 0.0,
-                    'Etsy Ads Fee': fee_amount,
-                    'Net': fee_amount
-                }
+        names = {os.path.basename(file_path) for file_path in file_paths}
+        self.statement_cache.prune(names)
+        self.order_index.prune(names)
+        self.manifest.prune(names)
+        self.search_index.prune(names)
+        if order_index_changed:
+            self.order_index.save()
+        if manifest_changed:
+            self.manifest.save()
+        if search_index_changed:
+            self.search_index.save()
+        return statements
+    
+    def _file_hash(self, file_path):
+        """Get the sha256 of a file's content"""
+        with open(file_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    
+    def _failed_unchanged(self, file_path):
+        """Check whether a statement file failed to load before and has not changed since"""
+        failed_hash = self.manifest.failed_hash(os.path.basename(file_path))
+        if failed_hash is None:
+            return False
+        try:
+            return self._file_hash(file_path) == failed_hash
+        except OSError:
+            return False
+    
+    def _record_statement(self, job, build_path, result):
+        """Record a statement consolidated by cache_statement into build_path in the cache, indexes and manifest
+        The indexes and manifest are only changed in memory, _save_statement_indexes writes them once per batch.
+        """
+        entry, order_ids, summary, search_tokens = result
+        statement_path = job[1]
+        name = os.path.basename(statement_path)
+        self.statement_cache.record(statement_path, entry, build_path)
+        self.order_index.set_source(name, entry['sha256'], order_ids, save=False)
+        self.manifest.set_statement(name, entry['sha256'], summary, save=False)
+        self.search_index.set_source(name, entry['sha256'], search_tokens, save=False)
+    
+    def _forget_statement(self, name):
+        """Drop a removed statement file from the indexes and manifest (in memory, like _record_statement)"""
+        self.order_index.remove_source(name, save=False)
+        self.manifest.remove_statement(name, save=False)
+        self.search_index.remove_source(name, save=False)
+    
+    def _save_statement_indexes(self):
+        """Write the indexes and manifest after statements were recorded or forgotten"""
+        self.order_index.save()
+        self.manifest.save()
+        self.search_index.save()
+    
+    def get_statement_manifest(self):
+        """Get the manifest of the statements directory, bringing it up to date if files were added or removed"""
+        names = {os.path.basename(file_path) for file_path in self.get_statement_files()}
+        if self.manifest.names() != names:
+            # Loading the sales records any statements the manifest is missing
+            if self.sales_store.reload():
+                self._data_changed('sales')
+        return self.manifest
+    
+    def search_sales(self, query):
+        """Get the sales from every statement whose Order ID or Items contain each word of a query
         
-        # Convert orders to DataFrame
-        orders_list = list(orders.values())
-        result_df = pd.DataFrame(orders_list)
+        Words match the start of a word, so 'cer mug' finds 'Ceramic Mug'.
+        """
+        # Loading the sales brings the search index in line with the statement files
+        self.sales_store.get_sales()
+        return self.sales_store.get_statement_rows(self.search_index.search(query))
+    
+    def get_sales_rollup(self, year=None, month=None):
+        """Get the sales totals for a year and/or month from the precomputed monthly rollup"""
+        return self.get_statement_manifest().get_rollup(year=year, month=month)
+    
+    def get_expenses_df(self, start_date=None, end_date=None):
+        """Get the expenses as a DataFrame with a datetime 'date' and float 'amount' column
+        Rows are sorted by date and optionally limited to those between two dates.
+        The frame is rebuilt when the expenses change; do not modify it.
+        """
+        start, end = self._expense_bounds(start_date, end_date)
+        if self._expenses_df is None:
+            expenses = pd.DataFrame([dict(expense) for expense in self._expense_views],
+                                    columns=['id', 'date', 'description', 'amount', 'receipt_file'])
+            expenses['date'] = pd.to_datetime(expenses['date'], format='%Y-%m-%d')
+            expenses['amount'] = expenses['amount'].astype(float)
+            self._expenses_df = expenses
+        return self._expenses_df.iloc[start:end]
+    
+    def get_expense_range_index(self):
+        """Get the daily cumulative sums of the expenses, rebuilt when the expenses change"""
+        self._load_expenses()
+        if self._expense_range_index is None:
+            expenses = self.get_expenses_df()
+            self._expense_range_index = RangeIndex(expenses['date'], {'expenses': expenses['amount'].to_numpy()})
+        return self._expense_range_index
+    
+    def get_expense_total(self, start_date=None, end_date=None):
+        """Get the total of the expenses between two dates (inclusive, all expenses when None)"""
+        return self.get_expense_range_index().total('expenses', start_date, end_date)
+    
+    def get_range_totals(self, start_date=None, end_date=None):
+        """Get the sales rollup categories and expenses between two dates (inclusive)"""
+        totals = dict.fromkeys(ROLLUP_CATEGORIES, 0)
+        totals.update(self.sales_store.get_range_index().totals(start_date, end_date))
+        totals['orders'] = int(round(totals['orders']))
+        totals['rows'] = int(round(totals['rows']))
+        totals['expenses'] = self.get_expense_total(start_date, end_date)
+        return totals
+    
+    def get_statement_months(self):
+        """Get the YYYY_MM months that have a stored statement"""
+        return self.get_statement_manifest().get_months()
+    
+    def _consolidate_statements(self, jobs, on_done, progress=None, is_cancelled=None):
+        """Consolidate statements into the cache using one worker process per core
+        jobs is a list of (source_path, statement_path) pairs; the source is parsed and
+        cached under the statement's name. Each job writes its cache file to a build
+        path of its own, which on_done(job, build_path, result) moves into place with
+        _record_statement, so a job finishing after a cancel never replaces a cache
+        file. on_done runs on the calling thread as each job finishes, progress(done,
+        total) is called while waiting and is_cancelled() is polled to stop early,
+        without waiting for the statements still being processed. Returns the finished jobs.
+        """
+        finished_jobs = []
+        if progress:
+            progress(0, len(jobs))
         
-        # Sort by date
-        result_df = result_df.sort_values('Date', ascending=False)
+        def finish(job, build_path, get_result):
+            try:
+                on_done(job, build_path, get_result())
+                finished_jobs.append(job)
+            finally:
+                if os.path.exists(build_path):
+                    os.remove(build_path)
         
-        return result_df
+        # A single statement is not worth starting worker processes for
+        if len(jobs) == 1:
+            source_path, statement_path = jobs[0]
+            build_path = self.statement_cache.build_path(statement_path)
+            finish(jobs[0], build_path, lambda: cache_statement(source_path, build_path))
+        elif jobs:
+            # Spawned rather than forked, forking copies the GUI process and its threads
+            executor = ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1),
+                                           mp_context=multiprocessing.get_context('spawn'))
+            cancelled = False
+            try:
+                futures = {}
+                for job in jobs:
+                    build_path = self.statement_cache.build_path(job[1])
+                    futures[executor.submit(cache_statement, job[0], build_path)] = (job, build_path)
+                pending = set(futures)
+                while pending:
+                    if is_cancelled and is_cancelled():
+                        cancelled = True
+                        break
+                    
+                    done, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job, build_path = futures[future]
+                        try:
+                            finish(job, build_path, future.result)
+                        except Exception as e:
+                            print(f"Error processing {os.path.basename(job[0])}: {str(e)}")
+                    if progress:
+                        progress(len(futures) - len(pending), len(jobs))
+            finally:
+                # Statements still being processed finish in the background, their build files are dropped later
+                executor.shutdown(wait=not cancelled, cancel_futures=True)
+        
+        if progress:
+            progress(len(jobs), len(jobs))
+        return finished_jobs
+    
+    def import_statements(self, statement_files, progress=None, is_cancelled=None):
+        """Import downloaded Etsy statements, consolidating them in parallel
+        statement_files maps YYYY_MM to the statement file for that month. A month
+        only replaces the stored statement once it has been consolidated, so
+        cancelling leaves the remaining months untouched. Clearing or relocating the
+        data is refused while it runs. Returns the imported months.
+        """
+        with self._import_lock:
+            return self._import_statements(statement_files, progress, is_cancelled)
+    
+    def _import_statements(self, statement_files, progress, is_cancelled):
+        jobs = [
+            (file_path, os.path.join(self.statements_dir, f"etsy_statement_{year_month}.csv"))
+            for year_month, file_path in statement_files.items()
+        ]
+        months = {job: year_month for job, year_month in zip(jobs, statement_files)}
+        
+        def on_done(job, build_path, result):
+            self._replace_statement(job[0], months[job])
+            self._record_statement(job, build_path, result)
+        
+        try:
+            finished_jobs = self._consolidate_statements(jobs, on_done, progress, is_cancelled)
+        finally:
+            self._save_statement_indexes()
+        
+        # Pages keep the previous sales until the new ones are fully loaded
+        if self.sales_store.reload():
+            self._data_changed('sales')
+        return [months[job] for job in finished_jobs]
+    
+    def _replace_statement(self, file_path, year_month):
+        """Copy a statement over the stored one for its month without touching the loaded sales"""
+        # Remove any existing statements for this month
+        for existing_file in os.listdir(self.statements_dir):
+            if existing_file.startswith(f"etsy_statement_{year_month}"):
+                os.remove(os.path.join(self.statements_dir, existing_file))
+                self._forget_statement(existing_file)
+        
+        # Copy the new statement
+        dest_path = os.path.join(self.statements_dir, f"etsy_statement_{year_month}.csv")
+        shutil.copy2(file_path, dest_path)
+        return dest_path
 
     def import_etsy_statement(self, file_path):
         """Import an Etsy CSV statement file, skipping duplicate orders"""
@@ -302,6 +779,12 @@ class Database:
             
             # Save processed data
             processed_df.to_csv(output_path, index=False)
+            content_hash = self._file_hash(output_path)
+            self.order_index.set_source(filename, content_hash, statement_order_ids(processed_df))
+            self.manifest.set_statement(filename, content_hash, summarize_statement(processed_df))
+            self.search_index.set_source(filename, content_hash, statement_search_tokens(processed_df))
+            self.sales_store.invalidate()
+            self._data_changed('sales')
             
             return True
             
@@ -309,68 +792,56 @@ class Database:
             print(f"Error importing statement: {e}")
             return False
             
+    def _check_not_importing(self):
+        """Refuse to change the statements directory while an import is writing to it"""
+        if self._import_lock.locked():
+            raise RuntimeError("A statement import is running, wait for it to finish or cancel it")
+    
     def clear_sales_data(self):
-        """Clear all sales data by removing processed statement files"""
+        """Clear all sales data by removing the statement files"""
+        self._check_not_importing()
         try:
-            # Remove all processed statement files
-            for filename in os.listdir(self.statements_dir):
-                if filename.startswith('processed_') and filename.endswith('.csv'):
-                    file_path = os.path.join(self.statements_dir, filename)
-                    os.remove(file_path)
+            # Remove all statement files
+            for file_path in self.get_statement_files():
+                os.remove(file_path)
             return True
         except Exception as e:
             print(f"Error clearing sales data: {e}")
             return False
+        finally:
+            remaining = {os.path.basename(file_path) for file_path in self.get_statement_files()}
+            self.order_index.prune(remaining)
+            self.manifest.prune(remaining)
+            self.search_index.prune(remaining)
+            self.sales_store.invalidate()
+            self._data_changed('sales')
     
     def get_statements_summary(self, start_date=None, end_date=None):
         """Get aggregated summary of all statements within date range"""
-        all_data = []
-        
-        # Read all processed statement files
-        for filename in os.listdir(self.statements_dir):
-            if filename.startswith('processed_') and filename.endswith('.csv'):
-                file_path = os.path.join(self.statements_dir, filename)
-                try:
-                    df = pd.read_csv(file_path)
-                    
-                    # Convert date column
-                    df['Date'] = pd.to_datetime(df['Date'])
-                    
-                    # Filter by date range if specified
-                    if start_date and end_date:
-                        mask = (df['Date'].dt.date >= start_date) & (df['Date'].dt.date <= end_date)
-                        df = df[mask]
-                    
-                    if not df.empty:
-                        all_data.append(df)
-                        
-                except Exception as e:
-                    print(f"Error reading {filename}: {e}")
-                    continue
+        if start_date and end_date:
+            combined_df = self.sales_store.get_filtered(start_date=start_date, end_date=end_date)
+        else:
+            combined_df = self.sales_store.get_sales()
         
-        if not all_data:
+        if combined_df.empty:
             return None
-            
-        # Combine all data
-        combined_df = pd.concat(all_data, ignore_index=True)
         
         # Sort by date
-        combined_df = combined_df.sort_values('Date', ascending=False)
-        
-        return combined_df
+        return combined_df.sort_values('Date', ascending=False)
     
     def update_storage_location(self, new_path):
         """Update the storage location and move all files to the new location"""
+        self._check_not_importing()
         if not os.path.exists(new_path):
             os.makedirs(new_path)
         
-        # Move expenses file
+        backend = self.storage.backend
+        data_files = self.storage.data_files()
+        self.storage.close()
+        
+        # Copy expenses file
         new_expenses_file = os.path.join(new_path, 'expenses.json')
-        if os.path.exists(self.expenses_file):
-            with open(self.expenses_file, 'r') as f:
-                expenses_data = json.load(f)
-            with open(new_expenses_file, 'w') as f:
-                json.dump(expenses_data, f)
+        relocate(self.storage_path, new_path, ['expenses.json'])
         
         # Create new directories
         new_statements_dir = os.path.join(new_path, 'statements')
@@ -380,49 +851,101 @@ class Database:
         os.makedirs(new_receipts_dir, exist_ok=True)
         os.makedirs(new_inventory_images_dir, exist_ok=True)
         
-        # Move inventory file
+        # Move inventory file and the SQLite database
         new_inventory_file = os.path.join(new_path, 'inventory.json')
-        if os.path.exists(self.inventory_file):
-            shutil.move(self.inventory_file, new_inventory_file)
+        moved_files = ['inventory.json']
+        if backend == 'sqlite':
+            moved_files += [os.path.basename(file_path) for file_path in data_files]
+        relocate(self.storage_path, new_path, moved_files, move=True)
         
         # Update paths
         self.storage_path = new_path
         self.expenses_file = new_expenses_file
         self.statements_dir = new_statements_dir
         self.receipts_dir = new_receipts_dir
+        self.receipt_store.close()
+        self.receipt_store = ReceiptStore(new_receipts_dir)
         self.inventory_file = new_inventory_file
         self.inventory_images_dir = new_inventory_images_dir
+        self.cache_dir = os.path.join(new_path, 'cache')
+        # Statements keep their mtimes when copied, so the local cache stays valid for the new location
+        new_cache_dir = local_cache_dir(new_path)
+        if os.path.isdir(self.statement_cache.cache_dir) and not os.path.exists(new_cache_dir):
+            shutil.copytree(self.statement_cache.cache_dir, new_cache_dir)
+        self.statement_cache = StatementCache(new_cache_dir, STATEMENT_PARSER_VERSION)
+        self.order_index = OrderIndex(os.path.join(self.cache_dir, 'order_index.json'))
+        self.manifest = StatementManifest(self.statements_dir)
+        self.search_index = SearchIndex(self.statements_dir, STATEMENT_PARSER_VERSION)
+        self.storage = open_storage(new_path, backend)
+        self.sales_store.invalidate()
+        self._data_changed('sales', 'expenses')
+    
+    def close(self):
+        """Write any pending changes to disk and release the storage"""
+        self.receipt_store.close()
+        self.storage.close()
+    
+    @contextmanager
+    def batch(self):
+        """Group expense and inventory changes so they are written once
+        Use as `with db.batch():`; if the block raises, its changes are rolled back.
+        """
+        try:
+            with self.storage.batch():
+                yield
+        except BaseException:
+            # Receipts attached by the rolled back changes may no longer be referenced
+            self._data_changed('expenses')
+            self.collect_receipts()
+            raise
+    
+    def copy_data_to(self, new_path, progress=None, is_cancelled=None):
+        """Copy the data files, receipts, statements and indexes to another directory
+        Returns False if cancelled; calling it again resumes the copy.
+        """
+        self._check_not_importing()
+        self.storage.flush()
+        names = [os.path.basename(file_path) for file_path in self.storage.data_files()]
+        names += ['receipts', 'inventory_images', 'statements', 'cache']
+        return relocate(self.storage_path, new_path, names, progress=progress, is_cancelled=is_cancelled)
+    
+    def store_receipt(self, source_path):
+        """Store a receipt file in the receipt store and get the receipt_file to attach to an expense"""
+        return self.receipt_store.add(source_path)
+    
+    def get_receipt_refcounts(self):
+        """Get the number of expenses referencing each stored receipt blob"""
+        self._load_expenses()
+        if self._receipt_refcounts is None:
+            self._receipt_refcounts = Counter(
+                expense['receipt_file'] for expense in self._expense_views
+                if ReceiptStore.is_blob(expense['receipt_file'])
+            )
+        return self._receipt_refcounts
+    
+    def collect_receipts(self):
+        """Remove stored receipt blobs no expense references, on a background thread"""
+        self.receipt_store.collect_garbage_async(self.get_receipt_refcounts().keys())
+    
+    def _set_receipt(self, expense_id, receipt_file):
+        expense = self.get_expense(expense_id)
+        self.storage.update_expense(expense_id, {'receipt_file': receipt_file})
+        self._data_changed('expenses')
+        
+        # The replaced receipt may no longer be referenced
+        if expense is not None and ReceiptStore.is_blob(expense.get('receipt_file')) and expense['receipt_file'] != receipt_file:
+            self.collect_receipts()
     
     def update_expense_receipt(self, expense_id, receipt_file):
         """Update the receipt file for an existing expense"""
-        with open(self.expenses_file, 'r') as f:
-            expenses = json.load(f)
-        
-        # Find and update the expense
-        for expense in expenses:
-            if expense['id'] == expense_id:
-                expense['receipt_file'] = receipt_file
-                break
-        
-        # Save updated expenses
-        with open(self.expenses_file, 'w') as f:
-            json.dump(expenses, f)
+        self._set_receipt(expense_id, receipt_file)
 
     def update_expense(self, expense_id, receipt_path=None):
         """Update an expense's receipt path in the database"""
         try:
-            with open(self.expenses_file, 'r') as f:
-                expenses = json.load(f)
-            
             if receipt_path:
-                for expense in expenses:
-                    if expense['id'] == expense_id:
-                        # Store receipt path directly as string
-                        expense['receipt_file'] = receipt_path
-                        break
-            
-            with open(self.expenses_file, 'w') as f:
-                json.dump(expenses, f)
+                # Store receipt path directly as string
+                self._set_receipt(expense_id, receipt_path)
             
             return True
         except Exception as e:
@@ -432,40 +955,43 @@ class Database:
     def delete_expense(self, expense_id):
         """Delete an expense and its associated receipt file if it exists"""
         try:
-            # Load current expenses
-            expenses = self.get_expenses()
-            
-            # Find the expense to delete
-            expense_to_delete = None
-            remaining_expenses = []
-            
-            for expense in expenses:
-                if expense['id'] == expense_id:
-                    expense_to_delete = expense
-                else:
-                    remaining_expenses.append(expense)
-            
+            expense_to_delete = self.storage.delete_expense(expense_id)
             if expense_to_delete is None:
                 raise ValueError(f"Expense with ID {expense_id} not found")
+            self._data_changed('expenses')
             
+            # Stored receipts may be shared with other expenses, unreferenced ones are collected
+            if ReceiptStore.is_blob(expense_to_delete.get('receipt_file')):
+                self.collect_receipts()
             # Delete associated receipt file if it exists
-            if expense_to_delete.get('receipt_file'):
+            elif expense_to_delete.get('receipt_file'):
                 receipt_path = os.path.join(self.receipts_dir, expense_to_delete['receipt_file'])
                 if os.path.exists(receipt_path):
                     os.remove(receipt_path)
             
-            # Save updated expenses list
-            with open(self.expenses_file, 'w') as f:
-                json.dump(remaining_expenses, f, indent=4)
-            
         except Exception as e:
             raise Exception(f"Failed to delete expense: {str(e)}")
 
     def get_inventory(self):
         """Get all inventory items"""
-        with open(self.inventory_file, 'r') as f:
-            return json.load(f)
+        return self.storage.get_inventory()
+    
+    def get_inventory_item(self, item_id):
+        """Get a single inventory item, or None if it does not exist"""
+        return self.storage.get_inventory_item(item_id)
             
+    def _copy_inventory_image(self, source_path, item_id):
+        """Copy an image into inventory_images as {id}{ext} and get its path
+        The copy replaces any existing file instead of writing into it, so a file shared with another
+        data directory (e.g. by an older migration) is never changed.
+        """
+        image_ext = os.path.splitext(source_path)[1]
+        image_path = os.path.join(self.inventory_images_dir, f"{item_id}{image_ext}")
+        temp_path = image_path + '.tmp'
+        shutil.copy2(source_path, temp_path)
+        os.replace(temp_path, image_path)
+        return image_path
+    
     def add_inventory_item(self, item_data):
         """Add an inventory item
         item_data should be a dictionary with:
@@ -475,91 +1001,50 @@ class Database:
         - url: optional string
         - image: optional string, path to image
         """
-        items = self.get_inventory()
-        
         # Generate new ID
-        max_id = max([item['id'] for item in items]) if items else 0
-        item_data['id'] = max_id + 1
+        item_data['id'] = self.storage.next_inventory_id()
         
         # Handle image if present
         if 'image' in item_data and item_data['image']:
             # Copy image to inventory_images directory
-            image_ext = os.path.splitext(item_data['image'])[1]
-            new_image_path = os.path.join(self.inventory_images_dir, f"{item_data['id']}{image_ext}")
-            shutil.copy2(item_data['image'], new_image_path)
-            item_data['image'] = new_image_path
+            item_data['image'] = self._copy_inventory_image(item_data['image'], item_data['id'])
             
-        items.append(item_data)
-        
-        with open(self.inventory_file, 'w') as f:
-            json.dump(items, f)
+        self.storage.add_inventory_item(item_data)
             
     def update_inventory_item(self, item_data):
         """Update an inventory item"""
-        items = self.get_inventory()
+        item = self.storage.get_inventory_item(item_data['id'])
+        if item is None:
+            return
         
-        for i, item in enumerate(items):
-            if item['id'] == item_data['id']:
-                # Handle image if present and different
-                if 'image' in item_data and item_data['image']:
-                    if item_data['image'] != item.get('image'):
-                        # Remove old image if it exists
-                        if item.get('image') and os.path.exists(item['image']):
-                            os.remove(item['image'])
-                        
-                        # Copy new image
-                        image_ext = os.path.splitext(item_data['image'])[1]
-                        new_image_path = os.path.join(self.inventory_images_dir, f"{item_data['id']}{image_ext}")
-                        shutil.copy2(item_data['image'], new_image_path)
-                        item_data['image'] = new_image_path
-                
-                items[i] = item_data
-                break
+        # Handle image if present and different
+        if 'image' in item_data and item_data['image']:
+            if item_data['image'] != item.get('image'):
+                # Remove old image if it exists
+                if item.get('image') and os.path.exists(item['image']):
+                    os.remove(item['image'])
                 
-        with open(self.inventory_file, 'w') as f:
-            json.dump(items, f)
+                # Copy new image
+                item_data['image'] = self._copy_inventory_image(item_data['image'], item_data['id'])
+        
+        self.storage.update_inventory_item(item_data)
             
     def delete_inventory_item(self, item_id):
         """Delete an inventory item and its image"""
-        items = self.get_inventory()
+        item = self.storage.delete_inventory_item(item_id)
         
-        for item in items:
-            if item['id'] == item_id:
-                # Remove image if it exists
-                if item.get('image') and os.path.exists(item['image']):
-                    os.remove(item['image'])
-                items.remove(item)
-                break
-                
-        with open(self.inventory_file, 'w') as f:
-            json.dump(items, f)
+        # Remove image if it exists
+        if item and item.get('image') and os.path.exists(item['image']):
+            os.remove(item['image'])
 
     def get_years_from_expenses(self):
         """Get all years present in the expenses data"""
-        years = set()
-        expenses = self.get_expenses()
-        for expense in expenses:
-            date = datetime.strptime(expense['date'], '%Y-%m-%d')
-            years.add(date.year)
-        return sorted(list(years), reverse=True)
+        years = self.get_expenses_df()['date'].dt.year.unique()
+        return sorted(years.tolist(), reverse=True)
     
     def get_years_from_sales(self):
         """Get all years present in the sales data"""
-        years = set()
-        for filename in os.listdir(self.statements_dir):
-            if not filename.endswith('.csv'):
-                continue
-                
-            file_path = os.path.join(self.statements_dir, filename)
-            try:
-                df = pd.read_csv(file_path)
-                processed_df = self.process_statement_data(df)
-                if processed_df is not None:
-                    dates = pd.to_datetime(processed_df['Date'])
-                    years.update(dates.dt.year)
-            except Exception:
-                continue
-        return sorted(list(years), reverse=True)
+        return self.get_statement_manifest().get_years()
     
     def get_all_years(self):
         """Get all years present in both sales and expenses data"""
@@ -0,0 +1,163 @@
+import csv
+from collections import Counter
+from datetime import datetime
+
+# Date formats a file's dates are detected from when a profile does not name one, preferred in this order
+DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%d/%m/%Y', '%d-%b-%y', '%d %b %Y', '%B %d, %Y', '%b %d, %Y']
+
+# Column mapping of a bank or credit card CSV export
+DEFAULT_PROFILE = {
+    'name': 'Default',
+    'date_column': 'Date',
+    'description_column': 'Description',
+    'amount_column': 'Amount',
+    # Optional column holding only money going out; when set it is used instead of amount_column
+    'debit_column': '',
+    # Leave empty to detect the date format from the dates in the file
+    'date_format': '',
+    # True for bank exports where purchases are negative, False for card exports where they are positive
+    'expenses_negative': True
+}
+
+def read_header(file_path):
+    """Get the column names of a CSV file"""
+    with open(file_path, 'r', newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+def parse_amount(value):
+    """Convert an amount like '$1,234.56', '-12.00' or '(12.00)' to a float, or None if empty"""
+    text = str(value or '').replace('$', '').replace(',', '').strip()
+    if not text or text == '--':
+        return None
+    if text.startswith('(') and text.endswith(')'):
+        return -float(text[1:-1])
+    return float(text)
+
+def _matches(text, date_format):
+    try:
+        datetime.strptime(text, date_format)
+        return True
+    except ValueError:
+        return False
+
+def detect_date_format(file_path, profile):
+    """Get the date format of a CSV export's date column, or None if no format fits its first date
+
+    Starts from the formats that fit the first date and narrows them down
+    with the following ones, so a file of 03/05/2024 and 03/14/2024 is read
+    as month first. Dates that fit none of the remaining formats are left for
+    the import to report.
+    """
+    candidates = None
+    seen = set()
+    with open(file_path, 'r', newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            text = (row.get(profile['date_column']) or '').strip()
+            if not text or text in seen:
+                continue
+            seen.add(text)
+            matching = [date_format for date_format in (candidates or DATE_FORMATS) if _matches(text, date_format)]
+            if candidates is None:
+                if not matching:
+                    return None
+                candidates = matching
+            elif matching:
+                candidates = matching
+            if len(candidates) == 1:
+                break
+    return candidates[0] if candidates else None
+
+def _date_parser(date_format):
+    """Get a function turning a date string in one format into YYYY-MM-DD"""
+    # Exports repeat the same few hundred dates, so each is only parsed once
+    parsed = {}
+
+    def parse(text):
+        text = text.strip()
+        if text not in parsed:
+            try:
+                parsed[text] = datetime.strptime(text, date_format).strftime('%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f"Date '{text}' does not match the date format {date_format}")
+        return parsed[text]
+
+    return parse
+
+def read_transactions(file_path, profile):
+    """Stream the expenses in a CSV export as {'date', 'description', 'amount'} dicts
+
+    Rows that are not money going out (payments, refunds, blank amounts) are
+    left out. Amounts are returned positive. Every date must be in the
+    profile's date format, or the one detected from the file; rows in any
+    other format raise a ValueError listing their lines once the file is read.
+    """
+    date_format = profile.get('date_format') or detect_date_format(file_path, profile)
+    if not date_format:
+        raise ValueError("Could not detect the date format, set it in the column mapping")
+    parse_date = _date_parser(date_format)
+    mismatched = []
+    with open(file_path, 'r', newline='', encoding='utf-8-sig') as f:
+        # Line 1 is the header
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                if profile.get('debit_column'):
+                    amount = parse_amount(row.get(profile['debit_column']))
+                    amount = abs(amount) if amount else None
+                else:
+                    amount = parse_amount(row.get(profile['amount_column']))
+                    if amount is not None:
+                        amount = -amount if profile.get('expenses_negative', True) else amount
+                if amount is None or amount <= 0:
+                    continue
+            except ValueError as e:
+                raise ValueError(f"Line {line}: {str(e)}")
+            try:
+                date = parse_date(row.get(profile['date_column']) or '')
+            except ValueError:
+                mismatched.append(line)
+                continue
+
+            yield {
+                'date': date,
+                'description': ' '.join((row.get(profile['description_column']) or '').split()),
+                'amount': round(amount, 2)
+            }
+
+    if mismatched:
+        lines = ', '.join(str(line) for line in mismatched[:10]) + (', ...' if len(mismatched) > 10 else '')
+        raise ValueError(f"{len(mismatched):,} rows do not match the date format {date_format} (lines {lines})")
+
+def expense_key(expense):
+    """Get the (date, amount, description) key two copies of the same transaction share"""
+    return (expense['date'], round(float(expense['amount']), 2), expense['description'].strip().lower())
+
+def import_expenses(db, file_path, profile):
+    """Add the expenses in a CSV export that are not stored yet, in one batch
+
+    Duplicates are matched on expense_key against the stored expenses. Each
+    stored expense absorbs one matching row, so re-importing an overlapping
+    export adds nothing while identical purchases on the same day in a new
+    export are kept. Returns {'added': n, 'duplicates': n}.
+    """
+    transactions = list(read_transactions(file_path, profile))
+    if not transactions:
+        return {'added': 0, 'duplicates': 0}
+
+    # Only stored expenses within the dates of the export can be duplicates
+    dates = [expense['date'] for expense in transactions]
+    existing = Counter(expense_key(expense) for expense in db.get_expenses(min(dates), max(dates)))
+    new_expenses = []
+    duplicates = 0
+    for expense in transactions:
+        key = expense_key(expense)
+        if existing[key] > 0:
+            existing[key] -= 1
+            duplicates += 1
+        else:
+            new_expenses.append(expense)
+
+    with db.batch():
+        for expense in new_expenses:
+            db.add_expense(expense)
+
+    return {'added': len(new_expenses), 'duplicates': duplicates}
@@ -1,16 +1,15 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                            QLineEdit, QPushButton, QFileDialog, QDateEdit,
                            QTableWidget, QTableWidgetItem, QHeaderView,
-                           QMessageBox, QMenu, QComboBox)
-from PySide6.QtCore import Qt, QDate
+                           QMessageBox, QMenu, QComboBox, QDialog, QCheckBox)
+from PySide6.QtCore import Qt, QDate, QSettings
 from PySide6.QtGui import QCursor, QDesktopServices, QBrush, QColor, QIcon
 from qtawesome import icon
 import os
 import json
-import shutil
 from datetime import datetime
 import calendar
-import re
+from .expense_import import DEFAULT_PROFILE, read_header, import_expenses
 
 class ExpensesWidget(QWidget):
     def __init__(self, db):
@@ -85,6 +84,10 @@ class ExpensesWidget(QWidget):
         add_btn = QPushButton("Add Expense")
         add_btn.clicked.connect(self.add_expense)
         
+        # Bank/credit card CSV import button
+        import_btn = QPushButton("Import CSV")
+        import_btn.clicked.connect(self.import_expenses_csv)
+        
         form_layout.addWidget(date_label)
         form_layout.addWidget(self.date_edit)
         form_layout.addWidget(desc_label)
@@ -93,6 +96,7 @@ class ExpensesWidget(QWidget):
         form_layout.addWidget(self.amount_edit)
         form_layout.addWidget(self.upload_btn)
         form_layout.addWidget(add_btn)
+        form_layout.addWidget(import_btn)
         
         layout.addLayout(form_layout)
         
@@ -192,31 +196,19 @@ class ExpensesWidget(QWidget):
             except ValueError:
                 raise ValueError("Invalid amount")
             
-            # Add expense to database
+            # Store the receipt first, identical files are only kept once
+            receipt_file = None
+            if self.current_receipt_path:
+                receipt_file = self.db.store_receipt(self.current_receipt_path)
+            
+            # Add the expense with its receipt in a single write, nothing is kept if the receipt copy failed
             expense_data = {
                 'date': date,
                 'description': description,
-                'amount': amount
+                'amount': amount,
+                'receipt_file': receipt_file
             }
-            
-            # Add the expense first to get the ID
-            expense_id = self.db.add_expense(expense_data)
-            
-            # Handle receipt if one was selected
-            if self.current_receipt_path:
-                # Create descriptive filename using the same format as upload_receipt_for_expense
-                safe_description = re.sub(r'[^\w\s-]', '', description)  # Remove special chars
-                safe_description = re.sub(r'\s+', '_', safe_description.strip())    # Replace spaces with _
-                safe_description = safe_description[:50]  # Limit length
-                
-                new_filename = f"{date}_{safe_description}_id{expense_id}{self.current_receipt_ext}"
-                new_path = os.path.join(self.db.receipts_dir, new_filename)
-                
-                # Copy file to receipts directory
-                shutil.copy2(self.current_receipt_path, new_path)
-                
-                # Update expense with receipt file
-                self.db.update_expense(expense_id, new_filename)
+            self.db.add_expense(expense_data)
             
             # Clear form
             self.desc_edit.clear()
@@ -231,6 +223,33 @@ class ExpensesWidget(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Expense Error", str(e))
     
+    def import_expenses_csv(self):
+        """Import the expenses in a bank or credit card CSV export"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Select Bank or Credit Card Export",
+            "",
+            "CSV Files (*.csv);;All Files (*.*)"
+        )
+        if not file_path:
+            return
+        
+        try:
+            dialog = ExpenseImportDialog(file_path, self)
+            if not dialog.exec():
+                return
+            
+            result = import_expenses(self.db, file_path, dialog.get_profile())
+            self.refresh_table()
+            QMessageBox.information(
+                self,
+                "Import Complete",
+                f"Imported {result['added']:,} expenses.\n"
+                f"Skipped {result['duplicates']:,} already recorded."
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Import Error", f"Failed to import expenses: {str(e)}")
+    
     def show_context_menu(self, position):
         menu = QMenu(self)
         delete_action = menu.addAction(icon("fa5s.trash-alt"), "Delete")
@@ -296,29 +315,14 @@ class ExpensesWidget(QWidget):
             )
             
             if file_path:
-                # Get file extension
-                _, ext = os.path.splitext(file_path)
-                
-                # Get expense details for filename
-                expenses = self.db.get_expenses()
-                expense = next((e for e in expenses if e['id'] == expense_id), None)
+                expense = self.db.get_expense(expense_id)
                 
                 if expense:
-                    # Create descriptive filename:
-                    # Format: YYYY-MM-DD_description_expenseID.ext
-                    # Replace spaces and special characters in description with underscores
-                    safe_description = re.sub(r'[^\w\s-]', '', expense['description'])  # Remove special chars
-                    safe_description = re.sub(r'\s+', '_', safe_description.strip())    # Replace spaces with _
-                    safe_description = safe_description[:50]  # Limit length
-                    
-                    new_filename = f"{expense['date']}_{safe_description}_id{expense_id}{ext}"
-                    new_path = os.path.join(self.db.receipts_dir, new_filename)
-                    
-                    # Copy file to receipts directory
-                    shutil.copy2(file_path, new_path)
+                    # Store the receipt, identical files are only kept once
+                    receipt_file = self.db.store_receipt(file_path)
                     
                     # Update expense with receipt file
-                    self.db.update_expense(expense_id, new_filename)
+                    self.db.update_expense(expense_id, receipt_file)
                     
                     # Refresh table
                     self.refresh_table()
@@ -343,27 +347,24 @@ class ExpensesWidget(QWidget):
         # Clear table
         self.table.setRowCount(0)
         
-        # Load expenses
-        expenses = self.db.get_expenses()
-        
-        # Apply filters
-        filtered_expenses = []
         selected_year = self.year_filter.currentText()
         selected_month = self.month_filter.currentText()
         search_text = self.search_filter.text().lower()
         
+        # Load the expenses of the selected year and month
+        start_date = end_date = None
+        if selected_year != 'All Years':
+            year = int(selected_year)
+            start_date, end_date = datetime(year, 1, 1), datetime(year, 12, 31)
+            if selected_month != 'All Months':
+                month = list(calendar.month_name).index(selected_month)
+                start_date = datetime(year, month, 1)
+                end_date = datetime(year, month, calendar.monthrange(year, month)[1])
+        expenses = self.db.get_expenses(start_date, end_date)
+        
+        # Apply search filter
+        filtered_expenses = []
         for expense in expenses:
-            date = datetime.strptime(expense['date'], '%Y-%m-%d')
-            
-            # Year filter
-            if selected_year != 'All Years' and str(date.year) != selected_year:
-                continue
-                
-            # Month filter
-            if selected_month != 'All Months' and calendar.month_name[date.month] != selected_month:
-                continue
-                
-            # Search filter
             if search_text and search_text not in expense['description'].lower():
                 continue
                 
@@ -396,3 +397,101 @@ class ExpensesWidget(QWidget):
         else:
             self.month_filter.setEnabled(True)
         self.refresh_table()
+
+class ExpenseImportDialog(QDialog):
+    """Map the columns of a CSV export to expense fields, remembering the mapping as a profile"""
+    
+    PROFILES_KEY = 'expense_import_profiles'
+    
+    def __init__(self, file_path, parent=None):
+        super().__init__(parent)
+        self.columns = read_header(file_path)
+        self.settings = QSettings('EtsyTracker', 'EtsyTracker')
+        self.profiles = json.loads(self.settings.value(self.PROFILES_KEY, '{}'))
+        self.setup_ui()
+        
+    def setup_ui(self):
+        self.setWindowTitle("Import Expenses")
+        layout = QVBoxLayout()
+        
+        # Saved profiles
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("Profile:"))
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItems([DEFAULT_PROFILE['name']] + sorted(
+            name for name in self.profiles if name != DEFAULT_PROFILE['name']
+        ))
+        self.profile_combo.currentTextChanged.connect(self.load_profile)
+        profile_layout.addWidget(self.profile_combo)
+        layout.addLayout(profile_layout)
+        
+        # Column mapping
+        self.column_combos = {}
+        for key, label in [('date_column', "Date column:"),
+                           ('description_column', "Description column:"),
+                           ('amount_column', "Amount column:"),
+                           ('debit_column', "Debit column (optional):")]:
+            column_layout = QHBoxLayout()
+            column_layout.addWidget(QLabel(label))
+            combo = QComboBox()
+            combo.addItems(([''] if key == 'debit_column' else []) + self.columns)
+            column_layout.addWidget(combo)
+            layout.addLayout(column_layout)
+            self.column_combos[key] = combo
+        
+        # Date format
+        format_layout = QHBoxLayout()
+        format_layout.addWidget(QLabel("Date format:"))
+        self.date_format_input = QLineEdit()
+        self.date_format_input.setPlaceholderText("Detect automatically (e.g. %m/%d/%Y)")
+        format_layout.addWidget(self.date_format_input)
+        layout.addLayout(format_layout)
+        
+        self.negative_check = QCheckBox("Purchases are negative amounts")
+        layout.addWidget(self.negative_check)
+        
+        # Profile name the mapping is saved under
+        name_layout = QHBoxLayout()
+        name_layout.addWidget(QLabel("Save profile as:"))
+        self.name_input = QLineEdit()
+        name_layout.addWidget(self.name_input)
+        layout.addLayout(name_layout)
+        
+        # Buttons
+        button_layout = QHBoxLayout()
+        import_button = QPushButton("Import")
+        import_button.clicked.connect(self.save_and_accept)
+        button_layout.addWidget(import_button)
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(cancel_button)
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+        self.load_profile(self.profile_combo.currentText())
+    
+    def load_profile(self, name):
+        """Fill in the mapping of a saved profile"""
+        profile = {**DEFAULT_PROFILE, **self.profiles.get(name, {}), 'name': name}
+        for key, combo in self.column_combos.items():
+            if profile[key] in self.columns or profile[key] == '':
+                combo.setCurrentText(profile[key])
+        self.date_format_input.setText(profile['date_format'])
+        self.negative_check.setChecked(profile['expenses_negative'])
+        self.name_input.setText(name)
+    
+    def get_profile(self):
+        """Get the mapping entered in the dialog"""
+        profile = {key: combo.currentText() for key, combo in self.column_combos.items()}
+        profile.update({
+            'name': self.name_input.text().strip() or DEFAULT_PROFILE['name'],
+            'date_format': self.date_format_input.text().strip(),
+            'expenses_negative': self.negative_check.isChecked()
+        })
+        return profile
+    
+    def save_and_accept(self):
+        profile = self.get_profile()
+        self.profiles[profile['name']] = profile
+        self.settings.setValue(self.PROFILES_KEY, json.dumps(self.profiles))
+        self.accept()
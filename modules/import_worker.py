@@ -0,0 +1,49 @@
+from PySide6.QtCore import QThread, Signal
+
+class StatementImportWorker(QThread):
+    """Imports statements and reloads the sales off the UI thread
+
+    Call requestInterruption() to cancel; months that have already been
+    consolidated stay imported and the rest are left untouched.
+    """
+
+    progress = Signal(int, int)  # done, total
+    imported = Signal(list)  # imported months (YYYY_MM)
+    failed = Signal(str)
+
+    def __init__(self, db, statement_files_by_month, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.statement_files_by_month = statement_files_by_month
+
+    def run(self):
+        try:
+            imported_months = self.db.import_statements(
+                self.statement_files_by_month, self.progress.emit, self.isInterruptionRequested)
+            self.imported.emit(imported_months)
+        except Exception as e:
+            print(f"Error importing statements: {str(e)}")
+            self.failed.emit(str(e))
+
+class DataMigrationWorker(QThread):
+    """Copies the data directory to a new location off the UI thread
+
+    Call requestInterruption() to cancel; files already copied are kept and
+    the next migration to the same location resumes from them.
+    """
+
+    progress = Signal(int, int)  # done, total
+    migrated = Signal(bool)  # True when every file was copied, False when cancelled
+    failed = Signal(str)
+
+    def __init__(self, db, new_path, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.new_path = new_path
+
+    def run(self):
+        try:
+            self.migrated.emit(self.db.copy_data_to(self.new_path, self.progress.emit, self.isInterruptionRequested))
+        except Exception as e:
+            print(f"Error migrating data: {str(e)}")
+            self.failed.emit(str(e))
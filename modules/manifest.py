@@ -0,0 +1,146 @@
+import os
+import re
+import json
+from .rollup import build_monthly_rollup, sum_rollups
+
+def statement_month(file_name):
+    """Get the YYYY_MM month in a statement file name, or None if it has none"""
+    match = re.search(r'(\d{4})[_-](\d{1,2})', file_name)
+    return f"{match.group(1)}_{match.group(2).zfill(2)}" if match else None
+
+def summarize_statement(processed_df):
+    """Get the manifest summary of a consolidated statement
+
+    Holds the row count, first and last date, the total of every amount
+    column and the monthly rollup, or None if the statement could not be
+    processed.
+    """
+    if processed_df is None:
+        return None
+
+    dates = processed_df['Date'] if 'Date' in processed_df else None
+    has_dates = dates is not None and dates.notna().any()
+    return {
+        'rows': len(processed_df),
+        'min_date': dates.min().strftime('%Y-%m-%d') if has_dates else None,
+        'max_date': dates.max().strftime('%Y-%m-%d') if has_dates else None,
+        'totals': {
+            column: round(float(processed_df[column].sum()), 2)
+            for column in processed_df.select_dtypes('number').columns
+        },
+        'rollup': build_monthly_rollup(processed_df)
+    }
+
+class StatementManifest:
+    """Manifest of the statements directory
+
+    Records the month, content hash, row count, date range and amount totals
+    of every statement file along with its monthly rollup, so years, coverage
+    and totals can be answered without opening any CSV.
+    """
+
+    MANIFEST_FILENAME = 'manifest.json'
+    MANIFEST_VERSION = 2
+
+    def __init__(self, statements_dir):
+        self.manifest_file = os.path.join(statements_dir, self.MANIFEST_FILENAME)
+        self.statements, self.failed = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_file, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}, {}
+
+        # Older manifests are rebuilt from the statements on the next load
+        if manifest.get('version') != self.MANIFEST_VERSION:
+            return {}, {}
+        return manifest['statements'], manifest.get('failed', {})
+
+    def save(self):
+        """Write the manifest to disk"""
+        temp_file = self.manifest_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump({'version': self.MANIFEST_VERSION, 'statements': self.statements, 'failed': self.failed},
+                      f, indent=4)
+        os.replace(temp_file, self.manifest_file)
+
+    def names(self):
+        """Get the names of every statement file recorded, including the ones that failed to load"""
+        return set(self.statements) | set(self.failed)
+
+    def failed_hash(self, name):
+        """Get the content hash of a statement file that failed to load, or None if it did not fail"""
+        return self.failed.get(name)
+
+    def set_failed(self, name, sha256, save=True):
+        """Record a statement file that could not be loaded, so it is only retried once its content changes"""
+        self.statements.pop(name, None)
+        self.failed[name] = sha256
+        if save:
+            self.save()
+
+    def content_hash(self, name):
+        """Get the content hash a statement was recorded with, or None if it is not recorded"""
+        record = self.statements.get(name)
+        return record['sha256'] if record else None
+
+    def set_statement(self, name, sha256, summary, save=True):
+        """Record a statement file from its summarize_statement summary"""
+        record = {
+            'month': statement_month(name),
+            'file': name,
+            'sha256': sha256,
+            'rows': 0,
+            'min_date': None,
+            'max_date': None,
+            'totals': {},
+            'rollup': {}
+        }
+        if summary:
+            record.update(summary)
+        self.statements[name] = record
+        self.failed.pop(name, None)
+        if save:
+            self.save()
+
+    def remove_statement(self, name, save=True):
+        """Drop a statement file from the manifest"""
+        removed = self.statements.pop(name, None) is not None
+        removed = self.failed.pop(name, None) is not None or removed
+        if removed and save:
+            self.save()
+
+    def prune(self, names):
+        """Drop statements that are no longer present"""
+        stale = [name for name in self.names() if name not in names]
+        for name in stale:
+            self.statements.pop(name, None)
+            self.failed.pop(name, None)
+        if stale:
+            self.save()
+
+    def get_years(self):
+        """Get every year covered by a statement, newest first"""
+        years = set()
+        for record in self.statements.values():
+            if record['min_date'] and record['max_date']:
+                years.update(range(int(record['min_date'][:4]), int(record['max_date'][:4]) + 1))
+        return sorted(years, reverse=True)
+
+    def get_months(self):
+        """Get the YYYY_MM months that have a statement, oldest first"""
+        return sorted({record['month'] for record in self.statements.values() if record['month']})
+
+    def get_rollup(self, year=None, month=None):
+        """Get the rollup totals of every order in a year and/or month (all orders when None)"""
+        rows = []
+        for record in self.statements.values():
+            for order_month, row in record['rollup'].items():
+                if year is not None and int(order_month[:4]) != year:
+                    continue
+                if month is not None and int(order_month[5:]) != month:
+                    continue
+                rows.append(row)
+        return sum_rollups(rows)
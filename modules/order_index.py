@@ -0,0 +1,108 @@
+import os
+import json
+from .manifest import statement_month
+
+class OrderIndex:
+    """Persistent index of the Order IDs in every stored statement
+
+    Each statement file is recorded with its month, content hash and the row
+    of every order in its consolidated data. Lookups go through an in-memory
+    map from Order ID to the statements containing it, so duplicate checks
+    never have to read statement CSVs.
+    """
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self.sources = self._load_index()
+        self._locations = {}
+        for name, source in self.sources.items():
+            self._add_locations(name, source['orders'])
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Write the index to disk"""
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        temp_file = self.index_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(self.sources, f)
+        os.replace(temp_file, self.index_file)
+
+    def _add_locations(self, name, orders):
+        for order_id, row in orders.items():
+            self._locations.setdefault(order_id, {})[name] = row
+
+    def _remove_locations(self, name):
+        for order_id in self.sources[name]['orders']:
+            locations = self._locations.get(order_id)
+            if locations is not None:
+                locations.pop(name, None)
+                if not locations:
+                    del self._locations[order_id]
+
+    def __contains__(self, order_id):
+        return str(order_id) in self._locations
+
+    def __len__(self):
+        return len(self._locations)
+
+    def order_ids(self):
+        """Get a view of every indexed Order ID"""
+        return self._locations.keys()
+
+    def find(self, order_id):
+        """Get (month, file name, row) for each statement containing an order"""
+        return [
+            (self.sources[name]['month'], name, row)
+            for name, row in self._locations.get(str(order_id), {}).items()
+        ]
+
+    def source_hash(self, name):
+        """Get the content hash a statement was indexed with, or None if it is not indexed"""
+        source = self.sources.get(name)
+        return source['sha256'] if source else None
+
+    def set_source(self, name, sha256, order_ids, save=True):
+        """Replace the indexed orders of a statement file
+
+        order_ids lists the Order ID of each row of the consolidated statement,
+        rows without an order are None.
+        """
+        if name in self.sources:
+            self._remove_locations(name)
+
+        orders = {
+            str(order_id): row
+            for row, order_id in enumerate(order_ids)
+            if order_id is not None
+        }
+        self.sources[name] = {
+            'month': statement_month(name),
+            'sha256': sha256,
+            'orders': orders
+        }
+        self._add_locations(name, orders)
+        if save:
+            self.save()
+
+    def remove_source(self, name, save=True):
+        """Drop a statement file from the index"""
+        if name not in self.sources:
+            return
+        self._remove_locations(name)
+        del self.sources[name]
+        if save:
+            self.save()
+
+    def prune(self, names):
+        """Drop statements that are no longer present"""
+        stale = [name for name in self.sources if name not in names]
+        for name in stale:
+            self.remove_source(name, save=False)
+        if stale:
+            self.save()
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+class RangeIndex:
+    """Daily cumulative sums of some amount columns
+
+    The total of any column over an inclusive date range is the difference of
+    two cumulative sums, found by binary search on the sorted days.
+    """
+
+    def __init__(self, dates, columns):
+        """dates holds the date of each row, columns maps a name to the row values"""
+        days = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[D]')
+        valid = ~np.isnat(days)
+        self.days, inverse = np.unique(days[valid], return_inverse=True)
+        self.cumulative = {}
+        for name, values in columns.items():
+            values = np.nan_to_num(np.asarray(values, dtype=float)[valid])
+            daily = np.bincount(inverse, weights=values, minlength=len(self.days))
+            self.cumulative[name] = np.concatenate([[0.0], np.cumsum(daily)])
+
+    def _bounds(self, start_date, end_date):
+        start = 0
+        end = len(self.days)
+        if start_date is not None:
+            start = np.searchsorted(self.days, np.datetime64(pd.Timestamp(start_date).date(), 'D'), side='left')
+        if end_date is not None:
+            end = np.searchsorted(self.days, np.datetime64(pd.Timestamp(end_date).date(), 'D'), side='right')
+        return start, max(start, end)
+
+    def total(self, name, start_date=None, end_date=None):
+        """Get the total of a column between two dates (inclusive, open ended when None)"""
+        start, end = self._bounds(start_date, end_date)
+        cumulative = self.cumulative[name]
+        return float(cumulative[end] - cumulative[start])
+
+    def totals(self, start_date=None, end_date=None):
+        """Get the total of every column between two dates"""
+        start, end = self._bounds(start_date, end_date)
+        return {
+            name: float(cumulative[end] - cumulative[start])
+            for name, cumulative in self.cumulative.items()
+        }
@@ -0,0 +1,108 @@
+import os
+import time
+import hashlib
+import shutil
+import threading
+
+class ReceiptStore:
+    """Content-addressed receipt files
+
+    Receipts are stored once per distinct content under receipts/blobs, named
+    by their SHA-256 hash, and expenses reference them by that relative path.
+    Reference counts are derived from the expenses by Database; blobs no
+    expense references are removed by collect_garbage, skipping blobs stored
+    or reused within GC_GRACE_SECONDS so a receipt that is about to be
+    attached is never collected. Database collects after a receipt is
+    replaced or deleted, after a batch is rolled back and at startup, which
+    also picks up blobs that were still in their grace period earlier.
+    """
+
+    BLOB_DIR = 'blobs'
+    GC_GRACE_SECONDS = 3600
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, receipts_dir):
+        self.receipts_dir = receipts_dir
+        self.blobs_dir = os.path.join(receipts_dir, self.BLOB_DIR)
+        self._lock = threading.Lock()
+        self._collector = None
+        self._pending_referenced = None
+
+    @classmethod
+    def is_blob(cls, receipt_file):
+        """Check whether an expense's receipt_file refers to a stored blob"""
+        return bool(receipt_file) and receipt_file.replace('\\', '/').startswith(cls.BLOB_DIR + '/')
+
+    def _file_hash(self, file_path):
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def add(self, source_path):
+        """Store a receipt file and get the receipt_file to reference it by
+
+        Content that is already stored is not copied again.
+        """
+        digest = self._file_hash(source_path)
+        ext = os.path.splitext(source_path)[1].lower()
+        receipt_file = '/'.join([self.BLOB_DIR, digest[:2], digest + ext])
+        blob_path = os.path.join(self.receipts_dir, *receipt_file.split('/'))
+
+        with self._lock:
+            if os.path.exists(blob_path):
+                # Mark the blob as recently used so a running collection keeps it
+                os.utime(blob_path)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                temp_path = blob_path + '.tmp'
+                shutil.copyfile(source_path, temp_path)
+                os.replace(temp_path, blob_path)
+        return receipt_file
+
+    def collect_garbage(self, referenced):
+        """Remove the blobs not in referenced (a set of receipt_file values), returns how many were removed"""
+        if not os.path.isdir(self.blobs_dir):
+            return 0
+
+        removed = 0
+        cutoff = time.time() - self.GC_GRACE_SECONDS
+        for root, _, filenames in os.walk(self.blobs_dir):
+            for filename in filenames:
+                blob_path = os.path.join(root, filename)
+                receipt_file = os.path.relpath(blob_path, self.receipts_dir).replace(os.sep, '/')
+                if receipt_file in referenced:
+                    continue
+                with self._lock:
+                    try:
+                        if os.path.getmtime(blob_path) < cutoff:
+                            os.remove(blob_path)
+                            removed += 1
+                    except OSError as e:
+                        print(f"Error removing receipt {receipt_file}: {str(e)}")
+        return removed
+
+    def collect_garbage_async(self, referenced):
+        """Run collect_garbage on a background thread, again after the running one if there is one"""
+        with self._lock:
+            self._pending_referenced = set(referenced)
+            if self._collector is not None:
+                return
+            self._collector = threading.Thread(target=self._collect_pending, daemon=True)
+            self._collector.start()
+
+    def _collect_pending(self):
+        while True:
+            with self._lock:
+                referenced, self._pending_referenced = self._pending_referenced, None
+                if referenced is None:
+                    self._collector = None
+                    return
+            self.collect_garbage(referenced)
+
+    def close(self):
+        """Wait for a running collection to finish"""
+        collector = self._collector
+        if collector is not None:
+            collector.join()
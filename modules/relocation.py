@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Progress of an interrupted relocation, kept in the target directory
+RESUME_FILENAME = '.relocation.json'
+
+# Directories of content-addressed files that are never rewritten, so a copy may share them through a hard link
+LINKABLE_DIRS = (os.path.join('receipts', 'blobs'),)
+
+# Linux ioctl cloning a file's extents (copy-on-write) on Btrfs, XFS and similar
+FICLONE = 0x40049409
+
+COPY_WORKERS = 8
+CHUNK_SIZE = 1024 * 1024
+STATE_SAVE_INTERVAL = 0.5
+
+def list_files(source_dir, names):
+    """Get the paths (relative to source_dir) of the files among or under some entries of a directory"""
+    files = []
+    for name in names:
+        path = os.path.join(source_dir, name)
+        if os.path.isfile(path):
+            files.append(name)
+        elif os.path.isdir(path):
+            for root, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    files.append(os.path.relpath(os.path.join(root, filename), source_dir))
+    return [path for path in files if os.path.basename(path) != RESUME_FILENAME]
+
+def _is_linkable(relative_path):
+    return any(relative_path.startswith(directory + os.sep) for directory in LINKABLE_DIRS)
+
+def _same_device(source_dir, target_dir):
+    return os.stat(source_dir).st_dev == os.stat(target_dir).st_dev
+
+def _file_hash(file_path):
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def _reflink(source, target):
+    """Clone a file without copying its data, returns False where the filesystem cannot"""
+    if not sys.platform.startswith('linux'):
+        return False
+    import fcntl
+    try:
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+
+def _fsync(file_path):
+    """Wait until a file's data is on disk"""
+    with open(file_path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+def _copy_verified(source, target):
+    """Copy a file while hashing it, then check the copy against the hash once it is on disk"""
+    sha256 = hashlib.sha256()
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+            dst.write(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    if _file_hash(target) != sha256.hexdigest():
+        os.remove(target)
+        raise OSError(f"Checksum mismatch copying {source}")
+
+def _transfer(source, target, allow_link):
+    """Put a copy of source at target using the fastest safe method, returns the method used"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    # Build the copy under a temporary name so an interrupted copy is never taken for a finished one
+    part = target + '.part'
+    if os.path.exists(part):
+        os.remove(part)
+
+    # A hard link is the source file itself, so there is no second copy whose checksum could differ
+    if allow_link:
+        try:
+            os.link(source, part)
+            os.replace(part, target)
+            # Renaming onto another link of the same file leaves the temporary name in place
+            if os.path.exists(part):
+                os.remove(part)
+            return 'link'
+        except OSError:
+            pass
+
+    if _reflink(source, part):
+        _fsync(part)
+        if _file_hash(part) != _file_hash(source):
+            os.remove(part)
+            raise OSError(f"Checksum mismatch cloning {source}")
+        method = 'reflink'
+    else:
+        _copy_verified(source, part)
+        method = 'copy'
+    shutil.copystat(source, part)
+    os.replace(part, target)
+    return method
+
+class _ResumeState:
+    """Files already relocated from a source directory, saved in the target directory"""
+
+    def __init__(self, source_dir, target_dir):
+        self.source_dir = os.path.abspath(source_dir)
+        self.state_file = os.path.join(target_dir, RESUME_FILENAME)
+        self.done = {}
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            if state.get('source') == self.source_dir:
+                self.done = state['files']
+        except (OSError, ValueError):
+            pass
+
+    def is_done(self, relative_path, source, target):
+        """Check whether a file was relocated and has not changed since"""
+        record = self.done.get(relative_path)
+        if record is None or not os.path.exists(target):
+            return False
+        stat = os.stat(source)
+        return record == [stat.st_size, stat.st_mtime_ns] and os.path.getsize(target) == stat.st_size
+
+    def add(self, relative_path, source):
+        stat = os.stat(source)
+        self.done[relative_path] = [stat.st_size, stat.st_mtime_ns]
+
+    def save(self):
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump({'source': self.source_dir, 'files': self.done}, f)
+        os.replace(temp_file, self.state_file)
+
+    def clear(self):
+        if os.path.exists(self.state_file):
+            os.remove(self.state_file)
+
+def relocate(source_dir, target_dir, names, move=False, progress=None, is_cancelled=None):
+    """Copy or move files and directories from one data directory to another
+
+    names lists entries of source_dir. Moves within one filesystem are plain
+    renames. Otherwise files are hard linked (receipt blobs, copies only) or
+    cloned with a reflink where the filesystem supports it, or copied, on a
+    thread pool. Clones and copies are checked against the source's SHA-256
+    once on disk, and moved sources are removed once
+    every copy is in place. progress(done, total) is called as files finish
+    and is_cancelled() is polled to stop early; calling relocate again with
+    the same arguments resumes where it stopped.
+
+    Returns True when every file was relocated, False when cancelled.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    files = list_files(source_dir, names)
+    total = len(files)
+    if progress:
+        progress(0, total)
+
+    if move and _same_device(source_dir, target_dir):
+        for done, relative_path in enumerate(files, start=1):
+            if is_cancelled and is_cancelled():
+                return False
+            target = os.path.join(target_dir, relative_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(os.path.join(source_dir, relative_path), target)
+            if progress:
+                progress(done, total)
+        return True
+
+    state = _ResumeState(source_dir, target_dir)
+    pending = []
+    for relative_path in files:
+        if not state.is_done(relative_path, os.path.join(source_dir, relative_path),
+                             os.path.join(target_dir, relative_path)):
+            pending.append(relative_path)
+    done = total - len(pending)
+    if progress:
+        progress(done, total)
+
+    cancelled = False
+    last_save = time.monotonic()
+    futures = {}
+    try:
+        with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+            futures = {
+                executor.submit(
+                    _transfer,
+                    os.path.join(source_dir, relative_path),
+                    os.path.join(target_dir, relative_path),
+                    not move and _is_linkable(relative_path)
+                ): relative_path
+                for relative_path in pending
+            }
+            try:
+                while futures:
+                    finished, _ = wait(futures, timeout=0.1, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        relative_path = futures.pop(future)
+                        future.result()
+                        state.add(relative_path, os.path.join(source_dir, relative_path))
+                        done += 1
+                    if finished:
+                        if time.monotonic() - last_save > STATE_SAVE_INTERVAL:
+                            state.save()
+                            last_save = time.monotonic()
+                        if progress:
+                            progress(done, total)
+                    if is_cancelled and is_cancelled():
+                        cancelled = True
+                        break
+            finally:
+                # Drop the files not started yet, the pool waits for those being copied
+                for future in futures:
+                    future.cancel()
+    finally:
+        # Record the copies that finished while stopping so resuming skips them
+        for future, relative_path in futures.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                state.add(relative_path, os.path.join(source_dir, relative_path))
+        state.save()
+
+    if cancelled:
+        return False
+
+    if move:
+        for relative_path in files:
+            os.remove(os.path.join(source_dir, relative_path))
+    state.clear()
+    return True
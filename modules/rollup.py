@@ -0,0 +1,79 @@
+import pandas as pd
+
+# Rollup category -> consolidated statement column(s) it sums
+ROLLUP_COLUMNS = {
+    'sales': ['Sale Amount'],
+    'shipping': ['Shipping Fee'],
+    'tax': ['Sales Tax'],
+    'transaction_fees': ['Item Transaction Fee', 'Shipping Transaction Fee'],
+    'processing_fees': ['Processing Fee'],
+    'listing_fees': ['Listing Fee'],
+    'offsite_ads_fees': ['Offsite Ads Fee'],
+    'etsy_ads_fees': ['Etsy Ads Fee']
+}
+ROLLUP_CATEGORIES = list(ROLLUP_COLUMNS) + ['refunds', 'orders', 'rows']
+
+def empty_rollup():
+    """Get a rollup row with every category at zero"""
+    return {category: 0 for category in ROLLUP_CATEGORIES}
+
+def rollup_categories(processed_df):
+    """Get the rollup category values of each row of a consolidated statement
+
+    refunds is the positive amount of a refunded sale and orders is 1 for
+    rows with a positive sale.
+    """
+    sales = processed_df['Sale Amount'].fillna(0)
+    refunded = processed_df['Items'].astype(str).str.contains('[REFUNDED]', regex=False)
+    categories = pd.DataFrame({
+        category: sum(processed_df[column].fillna(0) for column in columns)
+        for category, columns in ROLLUP_COLUMNS.items()
+        if all(column in processed_df for column in columns)
+    })
+    categories['refunds'] = -sales.where(refunded, 0)
+    categories['orders'] = (sales > 0).astype(int)
+    categories['rows'] = 1
+    return categories
+
+def rollup_totals(processed_df):
+    """Get the rollup category totals of a consolidated frame
+
+    Also holds gross_sales, the total of the positive sales only.
+    """
+    totals = empty_rollup()
+    totals['gross_sales'] = 0.0
+    if processed_df is None or processed_df.empty:
+        return totals
+
+    totals.update({category: float(value) for category, value in rollup_categories(processed_df).sum().items()})
+    totals['orders'] = int(totals['orders'])
+    totals['rows'] = int(totals['rows'])
+    totals['gross_sales'] = float(processed_df['Sale Amount'].fillna(0).clip(lower=0).sum())
+    return totals
+
+def build_monthly_rollup(processed_df):
+    """Get the totals of a consolidated statement per calendar month of the order date
+
+    Returns {YYYY_MM: {category: total}}.
+    """
+    if processed_df is None or processed_df.empty:
+        return {}
+
+    dates = pd.to_datetime(processed_df['Date'])
+    monthly = rollup_categories(processed_df).groupby(dates.dt.strftime('%Y_%m')).sum()
+    rollup = {}
+    for month, totals in monthly.iterrows():
+        row = empty_rollup()
+        row.update({category: float(value) for category, value in totals.items()})
+        row['orders'] = int(row['orders'])
+        row['rows'] = int(row['rows'])
+        rollup[month] = row
+    return rollup
+
+def sum_rollups(rows):
+    """Add up rollup rows"""
+    total = empty_rollup()
+    for row in rows:
+        for category in ROLLUP_CATEGORIES:
+            total[category] += row.get(category, 0)
+    return total
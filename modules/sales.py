@@ -1,23 +1,31 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                           QPushButton, QTableWidget, QTableWidgetItem,
-                           QHeaderView, QComboBox, QFileDialog, QMessageBox, QCheckBox, QMenu, QApplication, QFrame, QGridLayout, QSizePolicy)
-from PySide6.QtCore import Qt, QDate, QUrl, QTimer, Signal
-from PySide6.QtGui import QDesktopServices, QBrush, QColor, QIcon
+                           QPushButton, QTableView,
+                           QHeaderView, QComboBox, QFileDialog, QMessageBox, QCheckBox, QMenu, QApplication, QFrame, QGridLayout, QSizePolicy,
+                           QProgressDialog, QLineEdit, QDialog)
+from PySide6.QtCore import Qt, QDate, QUrl, Signal
+from PySide6.QtGui import QDesktopServices, QIcon
 import pandas as pd
 import os
 import re
 import shutil
 from datetime import datetime, timedelta
 import calendar
+from .import_worker import StatementImportWorker
+from .sales_model import SalesTableModel
+from .rollup import rollup_totals
 
 class SalesWidget(QWidget):
     data_changed = Signal()  # Add signal for data changes
     
-    def __init__(self, db, theme_manager=None):
+    def __init__(self, db, theme_manager=None, data_watcher=None):
         super().__init__()
         self.db = db
         self.theme_manager = theme_manager
+        self.data_watcher = data_watcher
         self.app_icon = QIcon(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets', 'icon.png'))
+        self.import_worker = None
+        # Version of the sales the table was last built from
+        self.shown_version = None
         self.init_ui()
         
         # Connect to theme system if theme manager exists
@@ -26,10 +34,9 @@ class SalesWidget(QWidget):
             # Initialize with current theme
             self.on_theme_changed(self.theme_manager.is_dark_mode())
         
-        # Create a timer for auto-refresh (every 5 minutes)
-        self.refresh_timer = QTimer()
-        self.refresh_timer.timeout.connect(self.refresh_table)
-        self.refresh_timer.start(300000)  # 300000 ms = 5 minutes
+        # Refresh only when the sales change
+        if self.data_watcher:
+            self.data_watcher.changed.connect(self.on_data_changed)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -124,9 +131,14 @@ class SalesWidget(QWidget):
         right_controls.setSpacing(5)
         right_controls.setContentsMargins(0, 0, 0, 0)
         
-        import_btn = QPushButton("Import Statement")
-        import_btn.clicked.connect(self.import_statement)
-        right_controls.addWidget(import_btn)
+        self.import_btn = QPushButton("Import Statement")
+        self.import_btn.clicked.connect(self.import_statement)
+        right_controls.addWidget(self.import_btn)
+        
+        search_btn = QPushButton("Search History")
+        search_btn.setToolTip("Find orders by Order ID or item across every statement")
+        search_btn.clicked.connect(self.search_history)
+        right_controls.addWidget(search_btn)
         
         self.scan_downloads = QCheckBox("Scan Downloads Folder")
         self.scan_downloads.setToolTip("Automatically scan Downloads folder for new Etsy statement files")
@@ -168,24 +180,39 @@ class SalesWidget(QWidget):
         filter_layout.addWidget(self.month_filter)
         
         filter_layout.addStretch()
+        
+        # Table filters, applied to the rows of the selected period
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search order ID or items...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.apply_table_filter)
+        filter_layout.addWidget(self.search_input)
+        
+        self.min_net_input = QLineEdit()
+        self.min_net_input.setPlaceholderText("Min Net")
+        self.min_net_input.setFixedWidth(80)
+        self.min_net_input.textChanged.connect(self.apply_table_filter)
+        filter_layout.addWidget(self.min_net_input)
+        
+        self.max_net_input = QLineEdit()
+        self.max_net_input.setPlaceholderText("Max Net")
+        self.max_net_input.setFixedWidth(80)
+        self.max_net_input.textChanged.connect(self.apply_table_filter)
+        filter_layout.addWidget(self.max_net_input)
         layout.addLayout(filter_layout)
         
-        # Sales table
-        self.table = QTableWidget()
-        self.table.setColumnCount(13)  # Increased column count for new fee columns
-        self.table.setHorizontalHeaderLabels([
-            'Date', 'Order ID', 'Items', 'Sale Amount', 'Shipping', 'Tax',
-            'Ship Trans Fee', 'Item Trans Fee', 'Processing Fee', 'Listing Fee',
-            'Offsite Ads', 'Etsy Ads', 'Net'
-        ])
+        # Sales table, cells are formatted by the model only when shown
+        self.table = QTableView()
+        self.table_model = SalesTableModel(self)
+        self.table.setModel(self.table_model)
         
         # Set table properties
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.setSelectionMode(QTableView.SingleSelection)
         self.table.verticalHeader().setVisible(False)
         self.table.setShowGrid(True)
-        #self.table.setWordWrap(True)  # Enable word wrap
-        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)  # Auto-adjust row height
+        # Fixed row heights, sizing rows to their contents would measure every row
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         
         # Set column widths and resize modes
         header = self.table.horizontalHeader()
@@ -206,6 +233,10 @@ class SalesWidget(QWidget):
         self.table.setColumnWidth(11, 100)  # Etsy Ads Fee
         self.table.setColumnWidth(12, 100)  # Net
         
+        # Sort by clicking a header, starting in statement order
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        
         # Enable context menu
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self.show_context_menu)
@@ -242,202 +273,42 @@ class SalesWidget(QWidget):
     
     def get_filtered_data(self):
         """Get the filtered data based on current selections"""
-        # Process each statement file
-        data = []
-        for filename in os.listdir(self.db.statements_dir):
-            if not filename.endswith('.csv'):
-                continue
-                
-            file_path = os.path.join(self.db.statements_dir, filename)
-            try:
-                df = pd.read_csv(file_path)
-                
-                # Process the data
-                processed_df = self.db.process_statement_data(df)
-                if processed_df is None:
-                    continue
-                
-                # Convert date column to datetime
-                processed_df['Date'] = pd.to_datetime(processed_df['Date'])
-                
-                # Apply year filter
-                selected_year = self.year_filter.currentText()
-                if selected_year != 'All Years':
-                    processed_df = processed_df[processed_df['Date'].dt.year == int(selected_year)]
-                
-                # Apply month filter
-                selected_month = self.month_filter.currentText()
-                if selected_month != 'All Months':
-                    month_num = list(calendar.month_name).index(selected_month)
-                    processed_df = processed_df[processed_df['Date'].dt.month == month_num]
-                
-                # Skip if no data after filtering
-                if processed_df.empty:
-                    continue
-                
-                # Convert each row to dict and add to data list
-                for _, row in processed_df.iterrows():
-                    data.append({
-                        'Date': row['Date'],
-                        'Order ID': row['Order ID'],
-                        'Items': row['Items'],
-                        'Sale Amount': row['Sale Amount'],
-                        'Shipping Fee': row['Shipping Fee'],
-                        'Sales Tax': row['Sales Tax'],
-                        'Shipping Transaction Fee': row['Shipping Transaction Fee'],
-                        'Item Transaction Fee': row['Item Transaction Fee'],
-                        'Processing Fee': row['Processing Fee'],
-                        'Listing Fee': row['Listing Fee'],
-                        'Offsite Ads Fee': row.get('Offsite Ads Fee', 0),
-                        'Etsy Ads Fee': row.get('Etsy Ads Fee', 0),
-                        'Net': row['Net']
-                    })
-            except Exception as e:
-                print(f"Error processing {filename}: {str(e)}")
-                continue
-        
-        if not data:
+        year = None
+        selected_year = self.year_filter.currentText()
+        if selected_year != 'All Years':
+            year = int(selected_year)
+        
+        month = None
+        selected_month = self.month_filter.currentText()
+        if selected_month != 'All Months':
+            month = list(calendar.month_name).index(selected_month)
+        
+        df = self.db.sales_store.get_filtered(year=year, month=month)
+        if df.empty:
             return None
-        
-        # Convert list of dicts to DataFrame
-        return pd.DataFrame(data)
+        return df
+    
+    def on_data_changed(self, area):
+        """Rebuild the table when the sales changed since it was last built"""
+        if area == 'sales' and self.db.get_data_version('sales') != self.shown_version:
+            self.refresh_table()
     
     def refresh_table(self):
         """Refresh the sales table with current data"""
         try:
+            self.shown_version = self.db.get_data_version('sales')
             # Get filtered data
             df = self.get_filtered_data()
             if df is None or df.empty:
-                self.table.setRowCount(0)
+                self.table_model.set_sales(None)
                 # self.status_label.setText("No data available")
                 return
             
             # Update table
-            self.table.setRowCount(len(df))
-            
-            # Initialize totals
-            total_sales = 0
-            total_shipping = 0
-            total_transaction_fees = 0
-            total_listing_fees = 0
-            total_processing_fees = 0
-            total_tax = 0
-            total_refunds = 0
-            total_offsite_ads_fees = 0
-            total_etsy_ads_fees = 0
-            
-            # Format and display data
-            for i, row in df.iterrows():
-                # Date
-                date_item = QTableWidgetItem(row['Date'].strftime('%Y-%m-%d'))
-                self.table.setItem(i, 0, date_item)
-                
-                # Order ID
-                order_item = QTableWidgetItem(str(row['Order ID']))
-                self.table.setItem(i, 1, order_item)
-                
-                # Items
-                items_item = QTableWidgetItem(str(row['Items']))
-                self.table.setItem(i, 2, items_item)
-                
-                # Financial columns with right alignment
-                financial_cols = [
-                    ('Sale Amount', 3),
-                    ('Shipping Fee', 4),
-                    ('Sales Tax', 5),
-                    ('Shipping Transaction Fee', 6),
-                    ('Item Transaction Fee', 7),
-                    ('Processing Fee', 8),
-                    ('Listing Fee', 9)
-                ]
-                
-                # Calculate row net
-                row_net = float(row.get('Sale Amount', 0) or 0)
-                row_net += float(row.get('Shipping Fee', 0) or 0)
-                row_net += float(row.get('Sales Tax', 0) or 0)
-                row_net += float(row.get('Shipping Transaction Fee', 0) or 0)
-                row_net += float(row.get('Item Transaction Fee', 0) or 0)
-                row_net += float(row.get('Processing Fee', 0) or 0)
-                row_net += float(row.get('Listing Fee', 0) or 0)
-                row_net += float(row.get('Offsite Ads Fee', 0) or 0)
-                row_net += float(row.get('Etsy Ads Fee', 0) or 0)
-                
-                # Display financial columns
-                for col_name, col_idx in financial_cols:
-                    amount = row.get(col_name, 0)
-                    if pd.isna(amount):
-                        amount = 0
-                    amount = float(amount)
-                    
-                    item = QTableWidgetItem(f"${amount:.2f}")
-                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                    
-                    if amount < 0:
-                        item.setForeground(QBrush(QColor('red')))
-                    
-                    self.table.setItem(i, col_idx, item)
-                    
-                    # Update running totals
-                    if col_name == 'Sale Amount':
-                        if '[REFUNDED]' in str(row['Items']):
-                            item.setForeground(QBrush(QColor('red')))
-                            total_refunds -= amount
-                        if amount > 0:
-                            total_sales += amount
-                    elif col_name == 'Shipping Fee':
-                        if 'Label #' in str(row['Order ID']):
-                            item.setForeground(QBrush(QColor('red')))
-                        total_shipping += amount
-                    elif col_name == 'Sales Tax':
-                        total_tax += amount
-                    elif col_name == 'Shipping Transaction Fee' or col_name == 'Item Transaction Fee':
-                        total_transaction_fees += amount
-                    elif col_name == 'Processing Fee':
-                        total_processing_fees += amount
-                    elif col_name == 'Listing Fee':
-                        total_listing_fees += amount
-                
-                # Add Offsite Ads Fee column
-                offsite_ads_item = QTableWidgetItem(f"${row.get('Offsite Ads Fee', 0):.2f}")
-                offsite_ads_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.table.setItem(i, 10, offsite_ads_item)
-                total_offsite_ads_fees += float(row.get('Offsite Ads Fee', 0) or 0)
-                
-                # Add Etsy Ads Fee column
-                etsy_ads_item = QTableWidgetItem(f"${row.get('Etsy Ads Fee', 0):.2f}")
-                etsy_ads_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.table.setItem(i, 11, etsy_ads_item)
-                total_etsy_ads_fees += float(row.get('Etsy Ads Fee', 0) or 0)
-                
-                # Add Net column
-                net_item = QTableWidgetItem(f"${row_net:.2f}")
-                net_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                if row_net < 0:
-                    net_item.setForeground(QBrush(QColor('red')))
-                self.table.setItem(i, 12, net_item)
+            self.table_model.set_sales(df)
             
-            # Calculate net profit
-            net_profit = (total_sales + 
-                           total_shipping +
-                           total_transaction_fees + 
-                           total_listing_fees + 
-                           total_processing_fees +
-                           total_tax +
-                           total_refunds +
-                           total_offsite_ads_fees +
-                           total_etsy_ads_fees)  # Refunds are now properly negative
-            
-            # Update the sales stats labels
-            self.sales_label.setText(f"<b>Sales</b><br>${total_sales:,.2f}")
-            self.shipping_label.setText(f"<b>Shipping</b><br>${abs(total_shipping):,.2f}")
-            self.trans_fees_label.setText(f"<b>Transaction Fees</b><br>${abs(total_transaction_fees):,.2f}")
-            self.listing_fees_label.setText(f"<b>Listing Fees</b><br>${abs(total_listing_fees):,.2f}")
-            self.processing_fees_label.setText(f"<b>Processing Fees</b><br>${abs(total_processing_fees):,.2f}")
-            self.tax_label.setText(f"<b>Tax</b><br>${abs(total_tax):,.2f}")
-            self.offsite_ads_fees_label.setText(f"<b>Offsite Ads</b><br>${abs(total_offsite_ads_fees):,.2f}")
-            self.etsy_ads_fees_label.setText(f"<b>Etsy Ads</b><br>${abs(total_etsy_ads_fees):,.2f}")
-            self.refunds_label.setText(f"<b>Refunds</b><br>${abs(total_refunds):,.2f}")
-            self.net_profit_label.setText(f"<b>Net Profit</b><br>${net_profit:,.2f}")
+            # Update stats
+            self.update_stats(df)
             
             # Emit signal after data is refreshed
             self.data_changed.emit()
@@ -445,6 +316,54 @@ class SalesWidget(QWidget):
         except Exception as e:
             QMessageBox.critical(self, 'Error', f'Error refreshing table: {str(e)}')
     
+    def update_stats(self, df):
+        """Update the stats panel with the totals of the shown sales"""
+        totals = rollup_totals(df)
+        
+        # Calculate net profit, refunds are negative
+        net_profit = (totals['gross_sales'] +
+                      totals['shipping'] +
+                      totals['transaction_fees'] +
+                      totals['listing_fees'] +
+                      totals['processing_fees'] +
+                      totals['tax'] +
+                      totals['refunds'] +
+                      totals['offsite_ads_fees'] +
+                      totals['etsy_ads_fees'])
+        
+        # Update the sales stats labels
+        self.sales_label.setText(f"<b>Sales</b><br>${totals['gross_sales']:,.2f}")
+        self.shipping_label.setText(f"<b>Shipping</b><br>${abs(totals['shipping']):,.2f}")
+        self.trans_fees_label.setText(f"<b>Transaction Fees</b><br>${abs(totals['transaction_fees']):,.2f}")
+        self.listing_fees_label.setText(f"<b>Listing Fees</b><br>${abs(totals['listing_fees']):,.2f}")
+        self.processing_fees_label.setText(f"<b>Processing Fees</b><br>${abs(totals['processing_fees']):,.2f}")
+        self.tax_label.setText(f"<b>Tax</b><br>${abs(totals['tax']):,.2f}")
+        self.offsite_ads_fees_label.setText(f"<b>Offsite Ads</b><br>${abs(totals['offsite_ads_fees']):,.2f}")
+        self.etsy_ads_fees_label.setText(f"<b>Etsy Ads</b><br>${abs(totals['etsy_ads_fees']):,.2f}")
+        self.refunds_label.setText(f"<b>Refunds</b><br>${abs(totals['refunds']):,.2f}")
+        self.net_profit_label.setText(f"<b>Net Profit</b><br>${net_profit:,.2f}")
+    
+    def search_history(self):
+        """Open the search over the sales of every statement"""
+        dialog = SalesSearchDialog(self.db, self)
+        dialog.setWindowIcon(self.app_icon)
+        dialog.exec()
+    
+    def parse_net_bound(self, text):
+        """Get a Min/Max Net bound, None when empty or not a number"""
+        try:
+            return float(text.replace('$', '').replace(',', '').strip())
+        except ValueError:
+            return None
+    
+    def apply_table_filter(self):
+        """Filter the table rows by the search text and net range"""
+        self.table_model.set_filter(
+            self.search_input.text(),
+            self.parse_net_bound(self.min_net_input.text()),
+            self.parse_net_bound(self.max_net_input.text())
+        )
+    
     def on_year_changed(self, selected_year):
         """Handle year selection changes"""
         if selected_year == 'All Years':
@@ -530,35 +449,20 @@ class SalesWidget(QWidget):
                     msg.setWindowTitle("Import Statements")
                     msg.setIcon(QMessageBox.Information)
                     msg.setText(f"Found statement files for {len(statement_files_by_month)} month(s) in Downloads folder.")
-                    msg.setInformativeText("Would you like to import them? This will replace any existing statements for these months.")
+                    
+                    # Check which months are already covered using the statement manifest
+                    existing_months = set(self.db.get_statement_months())
+                    replaced_months = sorted(month for month in statement_files_by_month if month in existing_months)
+                    if replaced_months:
+                        msg.setInformativeText(f"Would you like to import them? This will replace the existing statements for {len(replaced_months)} of these months.")
+                    else:
+                        msg.setInformativeText("Would you like to import them?")
                     msg.setDetailedText("Latest files found:\n" + "\n".join(os.path.basename(f) for f in statement_files_by_month.values()))
                     msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
                     
                     if msg.exec_() == QMessageBox.Yes:
-                        # For each month's statement
-                        for year_month, file_path in statement_files_by_month.items():
-                            # Remove any existing statements for this month
-                            for existing_file in os.listdir(self.db.statements_dir):
-                                if existing_file.startswith(f"etsy_statement_{year_month}"):
-                                    os.remove(os.path.join(self.db.statements_dir, existing_file))
-                            
-                            # Copy the new statement
-                            base_name = f"etsy_statement_{year_month}.csv"
-                            dest_path = os.path.join(self.db.statements_dir, base_name)
-                            shutil.copy2(file_path, dest_path)
-                        
-                        # After all files are imported, then ask about cleanup
-                        if scan_downloads and statement_files_by_month:
-                            if QMessageBox.question(self, "Cleanup Downloads", "Remove imported files from Downloads?", 
-                                QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
-                                for file_path in statement_files_by_month.values():
-                                    try:
-                                        os.remove(file_path)
-                                    except Exception as e:
-                                        print(f"Failed to remove {file_path}: {str(e)}")
-
-                        # Refresh the table
-                        self.refresh_table()
+                        # Replace each month's statement, offering cleanup once the import finishes
+                        self.import_statement_files(statement_files_by_month, offer_cleanup=True)
                         return
                     
                 else:
@@ -590,22 +494,86 @@ class SalesWidget(QWidget):
                             selected_files_by_month[key] = file_path
                 
                 # Import each month's latest statement
-                for year_month, file_path in selected_files_by_month.items():
-                    # Remove any existing statements for this month
-                    for existing_file in os.listdir(self.db.statements_dir):
-                        if existing_file.startswith(f"etsy_statement_{year_month}"):
-                            os.remove(os.path.join(self.db.statements_dir, existing_file))
-                    
-                    # Copy the new statement
-                    base_name = f"etsy_statement_{year_month}.csv"
-                    dest_path = os.path.join(self.db.statements_dir, base_name)
-                    shutil.copy2(file_path, dest_path)
-                
-                self.refresh_table()
+                self.import_statement_files(selected_files_by_month)
                 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to import statement: {str(e)}")
 
+    def import_statement_files(self, statement_files_by_month, offer_cleanup=False):
+        """Import statements on a background worker while showing progress"""
+        if not statement_files_by_month:
+            return
+        
+        self.import_btn.setEnabled(False)
+        # Statements are replaced one by one, the table is rebuilt once they are all loaded
+        if self.data_watcher:
+            self.data_watcher.pause()
+        
+        self.import_progress = QProgressDialog("Processing statements...", "Cancel", 0, len(statement_files_by_month), self)
+        self.import_progress.setWindowTitle("Import Statements")
+        self.import_progress.setWindowIcon(self.app_icon)
+        # The event loop keeps running, but nothing else can clear or move the statements meanwhile
+        self.import_progress.setWindowModality(Qt.WindowModal)
+        self.import_progress.setMinimumDuration(0)
+        self.import_progress.setAutoClose(False)
+        self.import_progress.setAutoReset(False)
+        
+        self.import_worker = StatementImportWorker(self.db, statement_files_by_month, self)
+        self.import_worker.progress.connect(self.on_import_progress)
+        self.import_worker.imported.connect(
+            lambda imported_months: self.on_import_finished(statement_files_by_month, imported_months, offer_cleanup))
+        self.import_worker.failed.connect(self.on_import_failed)
+        self.import_worker.finished.connect(self.import_worker.deleteLater)
+        self.import_progress.canceled.connect(self.cancel_import)
+        self.import_worker.start()
+    
+    def cancel_import(self):
+        """Stop the running import after the statements already being processed"""
+        if self.import_worker is not None:
+            self.import_worker.requestInterruption()
+            self.import_progress.setLabelText("Cancelling...")
+    
+    def stop_import(self):
+        """Cancel a running import and wait for its worker to exit"""
+        if self.import_worker is not None:
+            self.import_worker.requestInterruption()
+            self.import_worker.wait()
+    
+    def on_import_progress(self, done, total):
+        """Update the import progress dialog"""
+        self.import_progress.setMaximum(total)
+        self.import_progress.setValue(done)
+    
+    def end_import(self):
+        """Close the progress dialog and re-enable importing"""
+        self.import_progress.close()
+        self.import_worker = None
+        self.import_btn.setEnabled(True)
+        if self.data_watcher:
+            self.data_watcher.resume()
+    
+    def on_import_finished(self, statement_files_by_month, imported_months, offer_cleanup):
+        """Show the imported statements and optionally remove them from Downloads"""
+        self.end_import()
+        
+        # Sales were already reloaded by the worker, this only rebuilds the table
+        self.refresh_table()
+        
+        if offer_cleanup and imported_months:
+            if QMessageBox.question(self, "Cleanup Downloads", "Remove imported files from Downloads?", 
+                QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
+                for file_path in (statement_files_by_month[month] for month in imported_months):
+                    try:
+                        os.remove(file_path)
+                    except Exception as e:
+                        print(f"Failed to remove {file_path}: {str(e)}")
+    
+    def on_import_failed(self, error):
+        """Report an import that stopped with an error"""
+        self.end_import()
+        self.refresh_table()
+        QMessageBox.critical(self, "Error", f"Failed to import statement: {error}")
+    
     def clear_sales_data(self):
         """Clear all sales data after confirmation"""
         reply = QMessageBox.question(
@@ -618,13 +586,15 @@ class SalesWidget(QWidget):
         
         if reply == QMessageBox.Yes:
             try:
+                # Statements must not be written while they are cleared
+                self.stop_import()
+                
                 # Clear the statements directory
-                for filename in os.listdir(self.db.statements_dir):
-                    if filename.endswith('.csv'):
-                        os.remove(os.path.join(self.db.statements_dir, filename))
+                if not self.db.clear_sales_data():
+                    raise Exception("Some statement files could not be removed")
                 
                 # Clear the table
-                self.table.setRowCount(0)
+                self.table_model.set_sales(None)
                 
                 # Clear the status label
                 # self.status_label.setText("")
@@ -656,11 +626,7 @@ class SalesWidget(QWidget):
     def copy_row_data(self, row):
         """Copy row data to clipboard in a formatted way"""
         try:
-            data = []
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item:
-                    data.append(f"{self.table.horizontalHeaderItem(col).text()}: {item.text()}")
+            data = [f"{header}: {text}" for header, text in self.table_model.row_text(row)]
             
             # Format data with line breaks
             formatted_data = '\n'.join(data)
@@ -671,3 +637,72 @@ class SalesWidget(QWidget):
             
         except Exception as e:
             print(f"Error copying row data: {e}")
+
+
+class SalesSearchDialog(QDialog):
+    """Search the sales of every statement through the search index, with totals for the matches"""
+    
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.setup_ui()
+    
+    def setup_ui(self):
+        self.setWindowTitle("Search Sales History")
+        self.resize(1000, 600)
+        layout = QVBoxLayout()
+        
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Order ID or item words, e.g. ceramic mug")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.run_search)
+        layout.addWidget(self.search_input)
+        
+        self.summary_label = QLabel()
+        self.summary_label.setTextFormat(Qt.RichText)
+        layout.addWidget(self.summary_label)
+        
+        self.table = QTableView()
+        self.table_model = SalesTableModel(self)
+        self.table.setModel(self.table_model)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table)
+        
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button, alignment=Qt.AlignRight)
+        
+        self.setLayout(layout)
+        self.run_search('')
+    
+    def run_search(self, query):
+        """Show the sales matching the query and their totals"""
+        try:
+            df = self.db.search_sales(query)
+            self.table_model.set_sales(df)
+            if not query.strip():
+                self.summary_label.setText("Type to search every imported statement")
+                return
+            
+            totals = rollup_totals(df)
+            fees = (totals['transaction_fees'] + totals['processing_fees'] + totals['listing_fees'] +
+                    totals['offsite_ads_fees'] + totals['etsy_ads_fees'])
+            net = sum(totals[category] for category in
+                      ['gross_sales', 'shipping', 'tax', 'refunds', 'transaction_fees', 'processing_fees',
+                       'listing_fees', 'offsite_ads_fees', 'etsy_ads_fees'])
+            self.summary_label.setText(
+                f"<b>{len(df)}</b> matches, <b>{totals['orders']}</b> orders &nbsp; "
+                f"<b>Sales</b> ${totals['gross_sales']:,.2f} &nbsp; "
+                f"<b>Fees</b> ${abs(fees):,.2f} &nbsp; "
+                f"<b>Refunds</b> ${abs(totals['refunds']):,.2f} &nbsp; "
+                f"<b>Net</b> ${net:,.2f}"
+            )
+        except Exception as e:
+            print(f"Error searching sales: {str(e)}")
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QBrush, QColor
+
+# (header, consolidated statement column) of each amount column after Date, Order ID and Items
+AMOUNT_COLUMNS = [
+    ('Sale Amount', 'Sale Amount'),
+    ('Shipping', 'Shipping Fee'),
+    ('Tax', 'Sales Tax'),
+    ('Ship Trans Fee', 'Shipping Transaction Fee'),
+    ('Item Trans Fee', 'Item Transaction Fee'),
+    ('Processing Fee', 'Processing Fee'),
+    ('Listing Fee', 'Listing Fee'),
+    ('Offsite Ads', 'Offsite Ads Fee'),
+    ('Etsy Ads', 'Etsy Ads Fee')
+]
+HEADERS = ['Date', 'Order ID', 'Items'] + [header for header, _ in AMOUNT_COLUMNS] + ['Net']
+FIRST_AMOUNT_COLUMN = 3
+NET_COLUMN = len(HEADERS) - 1
+
+class SalesTableModel(QAbstractTableModel):
+    """Table model over the consolidated sales frame
+
+    The frame's columns are kept as numpy arrays and cells are only formatted
+    when the view asks for them, so the cost of a refresh no longer grows
+    with the number of cells and only visible rows are ever formatted.
+
+    Sorting and filtering happen here rather than in a QSortFilterProxyModel,
+    whose per-row Python callbacks are far too slow for large statements: the
+    shown rows are a permutation of the frame rows, built with a numpy mask
+    and an argsort over sort keys computed once per column.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._red = QBrush(QColor('red'))
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+        self._filter = ('', None, None)
+        self.set_sales(None)
+
+    def set_sales(self, df):
+        """Show the rows of a consolidated sales frame (None or empty for no rows)"""
+        self.beginResetModel()
+        if df is None or df.empty:
+            self._dates = np.array([], dtype='datetime64[D]')
+            self._order_ids = np.array([], dtype=object)
+            self._items = np.array([], dtype=object)
+            self._amounts = np.zeros((0, NET_COLUMN - FIRST_AMOUNT_COLUMN + 1))
+            self._red_cells = np.zeros(self._amounts.shape, dtype=bool)
+        else:
+            order_ids = df['Order ID'].astype(str)
+            items = df['Items'].astype(str)
+            amounts = np.column_stack([
+                df[column].fillna(0).to_numpy(dtype=float) if column in df else np.zeros(len(df))
+                for _, column in AMOUNT_COLUMNS
+            ])
+            net = amounts.sum(axis=1)
+
+            # Negative amounts are red, except for the ads fees
+            red_cells = np.zeros((len(df), len(AMOUNT_COLUMNS) + 1), dtype=bool)
+            red_cells[:, :7] = amounts[:, :7] < 0
+            red_cells[:, 0] |= items.str.contains('[REFUNDED]', regex=False).to_numpy()
+            red_cells[:, 1] |= order_ids.str.contains('Label #', regex=False).to_numpy()
+            red_cells[:, -1] = net < 0
+
+            self._dates = pd.to_datetime(df['Date']).to_numpy(dtype='datetime64[D]')
+            self._order_ids = order_ids.to_numpy()
+            self._items = items.to_numpy()
+            self._amounts = np.column_stack([amounts, net])
+            self._red_cells = red_cells
+        self._sort_keys = {}
+        self._search_text = None
+        self._rows = self._shown_rows()
+        self.endResetModel()
+
+    def _sort_key(self, column):
+        """Get an array ordering the frame rows by a column, computed on first use"""
+        if column not in self._sort_keys:
+            if column == 0:
+                key = self._dates.astype('int64')
+            elif column < FIRST_AMOUNT_COLUMN:
+                # Rank the text once so sorting compares integers
+                values = self._order_ids if column == 1 else self._items
+                key = np.unique(values.astype(str), return_inverse=True)[1]
+            else:
+                key = self._amounts[:, column - FIRST_AMOUNT_COLUMN]
+            self._sort_keys[column] = key
+        return self._sort_keys[column]
+
+    def _shown_rows(self):
+        """Get the frame rows passing the filter, in the sort order"""
+        text, min_net, max_net = self._filter
+        mask = np.ones(len(self._dates), dtype=bool)
+        if text:
+            if self._search_text is None:
+                self._search_text = (pd.Series(self._order_ids, dtype=object) + '\n' +
+                                     pd.Series(self._items, dtype=object)).str.lower()
+            mask &= self._search_text.str.contains(text.lower(), regex=False).to_numpy()
+        net = self._amounts[:, -1]
+        if min_net is not None:
+            mask &= net >= min_net
+        if max_net is not None:
+            mask &= net <= max_net
+        rows = np.flatnonzero(mask)
+
+        if self._sort_column >= 0:
+            key = self._sort_key(self._sort_column)[rows]
+            # Stable in both directions, so equal keys keep their statement order
+            if self._sort_order == Qt.DescendingOrder:
+                rows = rows[::-1][np.argsort(key[::-1], kind='stable')[::-1]]
+            else:
+                rows = rows[np.argsort(key, kind='stable')]
+        return rows
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sort the rows by a column (-1 for the statement order)"""
+        self.beginResetModel()
+        self._sort_column = column
+        self._sort_order = order
+        self._rows = self._shown_rows()
+        self.endResetModel()
+
+    def set_filter(self, text='', min_net=None, max_net=None):
+        """Show only rows whose order ID or items contain text and whose net is within a range"""
+        self.beginResetModel()
+        self._filter = (text.strip(), min_net, max_net)
+        self._rows = self._shown_rows()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = self._rows[index.row()], index.column()
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return str(self._dates[row])
+            if column == 1:
+                return self._order_ids[row]
+            if column == 2:
+                return self._items[row]
+            return f"${self._amounts[row, column - FIRST_AMOUNT_COLUMN]:.2f}"
+        if column < FIRST_AMOUNT_COLUMN:
+            return None
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.ForegroundRole and self._red_cells[row, column - FIRST_AMOUNT_COLUMN]:
+            return self._red
+        return None
+
+    def row_text(self, row):
+        """Get the displayed text of every column of a row as (header, text) pairs"""
+        return [(HEADERS[column], self.data(self.index(row, column))) for column in range(len(HEADERS))]
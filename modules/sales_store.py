@@ -0,0 +1,125 @@
+import threading
+import numpy as np
+import pandas as pd
+from .rollup import rollup_categories
+from .range_index import RangeIndex
+
+class SalesStore:
+    """Consolidated sales from every statement, loaded once and shared by all pages
+
+    The frame is built on first use and kept until invalidate() is called,
+    which Database does whenever statements are imported or cleared.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._sales = None
+        self._statement_offsets = {}
+        self._signature = None
+        self._range_index = None
+        self._lock = threading.RLock()
+
+    def invalidate(self):
+        """Drop the loaded sales so the next request reloads the statements"""
+        with self._lock:
+            self._sales = None
+            self._statement_offsets = {}
+            self._signature = None
+            self._range_index = None
+
+    def get_sales(self):
+        """Get all consolidated sales (shared, do not modify the returned frame)"""
+        with self._lock:
+            if self._sales is None:
+                self._sales, self._statement_offsets, self._signature = self._load()
+            return self._sales
+
+    def reload(self):
+        """Load the sales again and swap them in once complete
+
+        Readers keep getting the previous frame until the new one is ready, so
+        this can run on a worker thread without blocking the pages. Returns
+        True when the statement files differ from the ones loaded before.
+        """
+        sales, statement_offsets, signature = self._load()
+        with self._lock:
+            changed = signature != self._signature
+            self._sales = sales
+            self._statement_offsets = statement_offsets
+            self._signature = signature
+            self._range_index = None
+        return changed
+
+    def get_range_index(self):
+        """Get the daily cumulative sums of the rollup categories, for date range totals"""
+        with self._lock:
+            if self._range_index is None:
+                sales = self.get_sales()
+                if sales.empty:
+                    self._range_index = RangeIndex([], {})
+                else:
+                    categories = rollup_categories(sales)
+                    self._range_index = RangeIndex(sales['Date'], {
+                        category: categories[category].to_numpy() for category in categories
+                    })
+            return self._range_index
+
+    def is_current(self):
+        """Check whether the loaded sales still match the statement files (True when none are loaded)"""
+        with self._lock:
+            return self._sales is None or self._signature == self.db.get_statement_signature()
+
+    def _load(self):
+        """Get the sales frame, the row each statement file starts at in it and the statement files' signature"""
+        # Taken first, so a statement changing while loading makes the sales stale
+        signature = self.db.get_statement_signature()
+        statements = self.db.load_statements()
+        if not statements:
+            return pd.DataFrame({'Date': pd.Series(dtype='datetime64[ns]')}), {}, signature
+
+        statement_offsets = {}
+        offset = 0
+        for name, processed_df in statements:
+            statement_offsets[name] = offset
+            offset += len(processed_df)
+        sales = pd.concat([processed_df for _, processed_df in statements], ignore_index=True)
+        sales['Date'] = pd.to_datetime(sales['Date'])
+        return sales, statement_offsets, signature
+
+    def get_statement_rows(self, rows):
+        """Get the sales at some rows of the consolidated statements
+
+        rows maps statement file names to row numbers within that statement,
+        statements that are not loaded are skipped.
+        """
+        with self._lock:
+            sales = self.get_sales()
+            positions = [
+                np.asarray(statement_rows) + self._statement_offsets[name]
+                for name, statement_rows in rows.items()
+                if name in self._statement_offsets
+            ]
+        if not positions:
+            return sales.iloc[:0]
+        return sales.iloc[np.sort(np.concatenate(positions))].reset_index(drop=True)
+
+    def get_filtered(self, year=None, month=None, start_date=None, end_date=None):
+        """Get the sales for a year, a month of that year and/or an inclusive date range"""
+        sales = self.get_sales()
+        mask = pd.Series(True, index=sales.index)
+        if year is not None:
+            mask &= sales['Date'].dt.year == year
+        if month is not None:
+            mask &= sales['Date'].dt.month == month
+        if start_date is not None:
+            mask &= sales['Date'] >= pd.Timestamp(start_date).normalize()
+        if end_date is not None:
+            mask &= sales['Date'] < pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+        return sales[mask].reset_index(drop=True)
+
+    def get_years(self):
+        """Get all years with sales, newest first"""
+        sales = self.get_sales()
+        if sales.empty:
+            return []
+        return sorted(sales['Date'].dt.year.unique().tolist(), reverse=True)
@@ -0,0 +1,160 @@
+import os
+import re
+import json
+import bisect
+from .manifest import statement_month
+
+TOKEN_PATTERN = r'\w+'
+
+def tokenize(text):
+    """Get the lowercase word tokens of a search query or statement text"""
+    return re.findall(TOKEN_PATTERN, str(text).lower())
+
+def statement_search_tokens(processed_df):
+    """Get the rows of a consolidated statement containing each token of its Order IDs and Items
+
+    Returns {token: [row, ...]} with rows in ascending order.
+    """
+    if processed_df is None or processed_df.empty:
+        return {}
+
+    columns = [column for column in ('Order ID', 'Items') if column in processed_df]
+    if not columns:
+        return {}
+
+    text = processed_df[columns[0]].fillna('').astype(str)
+    for column in columns[1:]:
+        text = text + ' ' + processed_df[column].fillna('').astype(str)
+    text = text.reset_index(drop=True)
+    tokens = text.str.lower().str.findall(TOKEN_PATTERN).explode().dropna()
+    pairs = tokens.rename('token').rename_axis('row').reset_index().drop_duplicates()
+    return {token: rows.tolist() for token, rows in pairs.groupby('token')['row']}
+
+class SearchIndex:
+    """Persistent inverted index of the words in the Order IDs and Items of every statement
+
+    Each statement file is recorded with its month, content hash, the
+    version of the statement parser that numbered its rows and the rows
+    containing each token, and is replaced whenever the statement or the
+    parser changes. Searches match every query word as a prefix of an indexed token
+    through a sorted vocabulary, so they never have to read statement CSVs.
+    """
+
+    INDEX_FILENAME = 'search_index.json'
+    INDEX_VERSION = 1
+
+    def __init__(self, statements_dir, parser_version):
+        self.index_file = os.path.join(statements_dir, self.INDEX_FILENAME)
+        self.parser_version = parser_version
+        self.sources = self._load_index()
+        self._postings = {}
+        self._vocabulary = None
+        for name, source in self.sources.items():
+            self._add_postings(name, source['tokens'])
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        # Indexes built with another tokenizer are rebuilt from the statements on the next load
+        if index.get('version') != self.INDEX_VERSION:
+            return {}
+        return index['sources']
+
+    def save(self):
+        """Write the index to disk"""
+        temp_file = self.index_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump({'version': self.INDEX_VERSION, 'sources': self.sources}, f)
+        os.replace(temp_file, self.index_file)
+
+    def _add_postings(self, name, tokens):
+        for token, rows in tokens.items():
+            self._postings.setdefault(token, {})[name] = rows
+        self._vocabulary = None
+
+    def _remove_postings(self, name):
+        for token in self.sources[name]['tokens']:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(name, None)
+                if not postings:
+                    del self._postings[token]
+        self._vocabulary = None
+
+    def source_hash(self, name):
+        """Get the content hash a statement was indexed with, or None if it is not indexed by the current parser"""
+        source = self.sources.get(name)
+        if source is None or source.get('parser_version') != self.parser_version:
+            return None
+        return source['sha256']
+
+    def set_source(self, name, sha256, tokens, save=True):
+        """Replace the indexed tokens of a statement file (as from statement_search_tokens)"""
+        if name in self.sources:
+            self._remove_postings(name)
+
+        self.sources[name] = {
+            'month': statement_month(name),
+            'sha256': sha256,
+            'parser_version': self.parser_version,
+            'tokens': tokens
+        }
+        self._add_postings(name, tokens)
+        if save:
+            self.save()
+
+    def remove_source(self, name, save=True):
+        """Drop a statement file from the index"""
+        if name not in self.sources:
+            return
+        self._remove_postings(name)
+        del self.sources[name]
+        if save:
+            self.save()
+
+    def prune(self, names):
+        """Drop statements that are no longer present"""
+        stale = [name for name in self.sources if name not in names]
+        for name in stale:
+            self.remove_source(name, save=False)
+        if stale:
+            self.save()
+
+    def _prefix_rows(self, prefix):
+        """Get the rows per statement containing a token starting with prefix"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+
+        rows = {}
+        position = bisect.bisect_left(self._vocabulary, prefix)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            token = self._vocabulary[position]
+            position += 1
+            for name, token_rows in self._postings[token].items():
+                rows.setdefault(name, set()).update(token_rows)
+        return rows
+
+    def search(self, query):
+        """Get the rows of each statement matching every word of a query
+
+        Returns {file name: [row, ...]}, empty when the query has no words.
+        """
+        matches = None
+        # Longer words match fewer rows, so starting with them keeps the intersections small
+        for word in sorted(set(tokenize(query)), key=len, reverse=True):
+            rows = self._prefix_rows(word)
+            if matches is None:
+                matches = rows
+            else:
+                matches = {
+                    name: matches[name] & rows[name]
+                    for name in matches.keys() & rows.keys()
+                }
+            matches = {name: name_rows for name, name_rows in matches.items() if name_rows}
+            if not matches:
+                break
+        return {name: sorted(rows) for name, rows in (matches or {}).items()}
@@ -1,14 +1,14 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                            QPushButton, QFileDialog, QMessageBox, QFrame,
                            QComboBox, QTextEdit, QLineEdit, QSizePolicy, QGridLayout,
-                           QScrollArea)
+                           QScrollArea, QCheckBox, QProgressDialog)
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QIcon
 import os
-import shutil
 import webbrowser
 import urllib.parse
 from .version import VersionChecker
+from .import_worker import DataMigrationWorker
 
 class SettingsWidget(QWidget):
     storage_location_changed = Signal(str)
@@ -19,6 +19,7 @@ class SettingsWidget(QWidget):
         self.app_icon = QIcon(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets', 'icon.png'))
         self.settings = settings
         self.db = db
+        self.migration_worker = None
         
         # Create main scroll area that wraps everything
         scroll_area = QScrollArea(self)
@@ -114,6 +115,13 @@ class SettingsWidget(QWidget):
         
         storage_section_layout.addLayout(buttons_layout)
         
+        # Storage backend
+        self.sqlite_checkbox = QCheckBox("Store expenses and inventory in an SQLite database")
+        self.sqlite_checkbox.setToolTip("Faster with many expenses; existing data is moved over automatically")
+        self.sqlite_checkbox.setChecked(self.db.storage.backend == 'sqlite')
+        self.sqlite_checkbox.toggled.connect(self.toggle_sqlite_storage)
+        storage_section_layout.addWidget(self.sqlite_checkbox)
+        
         # Add some spacing
         storage_section_layout.addSpacing(20)
         
@@ -334,6 +342,19 @@ class SettingsWidget(QWidget):
         if self.theme_manager:
             self.theme_manager.toggle_theme()
     
+    def toggle_sqlite_storage(self, enabled):
+        backend = 'sqlite' if enabled else 'json'
+        try:
+            self.db.switch_storage_backend(backend)
+            self.settings.setValue('storage_backend', backend)
+        except Exception as e:
+            # Show the backend still in use, without toggling back through this handler
+            self.sqlite_checkbox.blockSignals(True)
+            self.sqlite_checkbox.setChecked(self.db.storage.backend == 'sqlite')
+            self.sqlite_checkbox.blockSignals(False)
+            QMessageBox.critical(self, "Storage Error", 
+                f"Failed to switch storage backend: {str(e)}")
+    
     def change_storage_location(self):
         dialog = QFileDialog()
         dialog.setFileMode(QFileDialog.FileMode.Directory)
@@ -354,8 +375,13 @@ class SettingsWidget(QWidget):
             msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
             
             if msg.exec() == QMessageBox.StandardButton.Yes:
+                try:
+                    self.db.update_storage_location(new_path)
+                except Exception as e:
+                    QMessageBox.critical(self, "Storage Error", 
+                        f"Failed to change storage location: {str(e)}")
+                    return
                 self.settings.setValue('storage_location', new_path)
-                self.db.update_storage_location(new_path)
                 
                 # Update the displayed location
                 self.refresh_ui()
@@ -380,43 +406,75 @@ class SettingsWidget(QWidget):
                     "New location is the same as the current location.")
                 return
             
-            try:
-                # Create new directories
-                os.makedirs(os.path.join(new_path, 'receipts'), exist_ok=True)
-                os.makedirs(os.path.join(new_path, 'statements'), exist_ok=True)
-                
-                # Copy expenses file
-                if os.path.exists(self.db.expenses_file):
-                    shutil.copy2(
-                        self.db.expenses_file,
-                        os.path.join(new_path, 'expenses.json')
-                    )
-                
-                # Copy all receipts
-                for item in os.listdir(self.db.receipts_dir):
-                    src = os.path.join(self.db.receipts_dir, item)
-                    if os.path.isfile(src):
-                        shutil.copy2(src, os.path.join(new_path, 'receipts', item))
-                
-                # Copy all statements
-                for item in os.listdir(self.db.statements_dir):
-                    src = os.path.join(self.db.statements_dir, item)
-                    if os.path.isfile(src):
-                        shutil.copy2(src, os.path.join(new_path, 'statements', item))
-                
-                # Update settings and database
-                self.settings.setValue('storage_location', new_path)
-                self.db.update_storage_location(new_path)
-                
-                # Update the displayed location
-                self.refresh_ui()
-                
-                QMessageBox.information(self, "Storage Location Changed", 
-                    "All data has been migrated to the new location successfully.")
-                
-            except Exception as e:
-                QMessageBox.critical(self, "Storage Location Error", 
-                    f"Failed to migrate data: {str(e)}")
+            # Copy in the background; the modal progress dialog keeps data from changing meanwhile
+            self.migration_progress = QProgressDialog("Copying data...", "Cancel", 0, 0, self)
+            self.migration_progress.setWindowTitle("Migrate Data")
+            self.migration_progress.setWindowIcon(self.app_icon)
+            self.migration_progress.setWindowModality(Qt.WindowModal)
+            self.migration_progress.setMinimumDuration(0)
+            self.migration_progress.setAutoClose(False)
+            self.migration_progress.setAutoReset(False)
+            
+            self.migration_worker = DataMigrationWorker(self.db, new_path, self)
+            self.migration_worker.progress.connect(self.on_migration_progress)
+            self.migration_worker.migrated.connect(
+                lambda completed: self.on_migration_finished(new_path, completed))
+            self.migration_worker.failed.connect(self.on_migration_failed)
+            self.migration_worker.finished.connect(self.migration_worker.deleteLater)
+            self.migration_progress.canceled.connect(self.cancel_migration)
+            self.migration_worker.start()
+    
+    def cancel_migration(self):
+        """Stop the running migration after the files already being copied"""
+        if self.migration_worker is not None:
+            self.migration_worker.requestInterruption()
+            self.migration_progress.setLabelText("Cancelling...")
+    
+    def stop_migration(self):
+        """Cancel a running migration and wait for its worker to exit"""
+        if self.migration_worker is not None:
+            self.migration_worker.requestInterruption()
+            self.migration_worker.wait()
+    
+    def on_migration_progress(self, done, total):
+        """Update the migration progress dialog"""
+        self.migration_progress.setMaximum(total)
+        self.migration_progress.setValue(done)
+        self.migration_progress.setLabelText(f"Copying data... ({done:,} of {total:,} files)")
+    
+    def end_migration(self):
+        """Close the migration progress dialog"""
+        self.migration_progress.close()
+        self.migration_worker = None
+    
+    def on_migration_finished(self, new_path, completed):
+        """Switch to the new location once all data has been copied"""
+        self.end_migration()
+        if not completed:
+            QMessageBox.information(self, "Migration Cancelled", 
+                "Data migration was cancelled. Migrate to the same location again to resume.")
+            return
+        
+        try:
+            # Update settings and database
+            self.settings.setValue('storage_location', new_path)
+            self.db.update_storage_location(new_path)
+            
+            # Update the displayed location
+            self.refresh_ui()
+            
+            QMessageBox.information(self, "Storage Location Changed", 
+                "All data has been migrated to the new location successfully.")
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Storage Location Error", 
+                f"Failed to migrate data: {str(e)}")
+    
+    def on_migration_failed(self, error):
+        """Report a migration that stopped with an error"""
+        self.end_migration()
+        QMessageBox.critical(self, "Storage Location Error", 
+            f"Failed to migrate data: {error}")
     
     def refresh_ui(self):
         # Recreate the UI to show updated values
@@ -0,0 +1,172 @@
+import os
+import io
+import sys
+import json
+import uuid
+import hashlib
+import pandas as pd
+
+def local_cache_dir(storage_path):
+    """Get the per-user local directory caching the statements of a data directory
+
+    Cached statements are pickles, which can run code when loaded, so they
+    are never kept in the data directory: it is often synced or shared.
+    """
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    elif sys.platform == 'darwin':
+        base = os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    key = hashlib.sha256(os.path.abspath(storage_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(base, 'EtsyTrackr', 'statements', key)
+
+def build_cached_statement(file_path, cache_path, process):
+    """Consolidate one statement file and write its cache file
+
+    Returns (entry, processed_df), where entry describes the statement for the
+    cache index. Only touches cache_path, so it is safe to run in a worker
+    process while the parent owns the index.
+    """
+    # Describe the bytes actually read: the mtime is taken first, so a write
+    # during the read leaves it older than the file and the entry is rechecked
+    with open(file_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        content = f.read()
+    processed_df = process(pd.read_csv(io.BytesIO(content)))
+
+    if processed_df is not None:
+        processed_df.to_pickle(cache_path)
+    entry = {
+        'size': len(content),
+        'mtime': stat.st_mtime_ns,
+        'sha256': hashlib.sha256(content).hexdigest(),
+        'cached': processed_df is not None
+    }
+    return entry, processed_df
+
+class StatementCache:
+    """On-disk cache of consolidated statements
+
+    Each statement CSV is consolidated once and the resulting DataFrame is
+    stored as a pickle next to a small JSON index. An entry is reused while the
+    statement's size and mtime are unchanged (or its content hash still
+    matches) and it was produced by the current parser version.
+    """
+
+    INDEX_FILENAME = 'index.json'
+
+    def __init__(self, cache_dir, parser_version):
+        self.cache_dir = cache_dir
+        self.parser_version = parser_version
+        self.index_file = os.path.join(cache_dir, self.INDEX_FILENAME)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+        self._remove_build_files()
+
+    def _remove_build_files(self):
+        """Remove cache files left by consolidations that were cancelled or crashed"""
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.part'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, filename))
+                except OSError:
+                    pass
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        temp_file = self.index_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(temp_file, self.index_file)
+
+    def cache_path(self, file_path):
+        """Path of the cache file for a statement"""
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        return os.path.join(self.cache_dir, name + '.pkl')
+
+    def build_path(self, file_path):
+        """Get a new path to build a statement's cache file at before record() moves it into place"""
+        return f"{self.cache_path(file_path)}.{uuid.uuid4().hex}.part"
+
+    def is_current(self, file_path):
+        """Check whether the cache entry for a statement can be used as is"""
+        name = os.path.basename(file_path)
+        entry = self.index.get(name)
+        try:
+            stat = os.stat(file_path)
+            if not entry or entry['parser_version'] != self.parser_version or entry['size'] != stat.st_size:
+                return False
+            if entry['cached'] and not os.path.exists(self.cache_path(file_path)):
+                return False
+            if entry['mtime'] == stat.st_mtime_ns:
+                return True
+
+            # Touched but possibly unchanged, compare contents before reprocessing
+            with open(file_path, 'rb') as f:
+                content = f.read()
+            if hashlib.sha256(content).hexdigest() != entry['sha256']:
+                return False
+            entry['mtime'] = stat.st_mtime_ns
+            self._save_index()
+            return True
+        except (OSError, KeyError) as e:
+            print(f"Error checking cached statement {name}: {e}")
+            return False
+
+    def content_hash(self, file_path):
+        """Get the content hash recorded for a statement, or None if it has no entry"""
+        entry = self.index.get(os.path.basename(file_path))
+        return entry['sha256'] if entry else None
+
+    def record(self, file_path, entry, build_path=None):
+        """Add the index entry produced by build_cached_statement
+
+        build_path is where build_cached_statement wrote the cache file, if not
+        at cache_path; the file is moved into place along with the entry.
+        """
+        if build_path is not None and entry['cached']:
+            os.replace(build_path, self.cache_path(file_path))
+        self.index[os.path.basename(file_path)] = dict(entry, parser_version=self.parser_version)
+        self._save_index()
+
+    def load(self, file_path, process):
+        """Get the consolidated frame for a statement file
+
+        process(raw_df) is only called when there is no current cache entry.
+        Returns None if the statement could not be processed.
+        """
+        if self.is_current(file_path):
+            entry = self.index[os.path.basename(file_path)]
+            if not entry['cached']:
+                return None
+            try:
+                return pd.read_pickle(self.cache_path(file_path))
+            except Exception as e:
+                print(f"Error reading cached statement {os.path.basename(file_path)}: {e}")
+
+        build_path = self.build_path(file_path)
+        try:
+            entry, processed_df = build_cached_statement(file_path, build_path, process)
+            self.record(file_path, entry, build_path)
+        finally:
+            if os.path.exists(build_path):
+                os.remove(build_path)
+        return processed_df
+
+    def prune(self, names):
+        """Drop cache entries for statements that are no longer present"""
+        stale = [name for name in self.index if name not in names]
+        for name in stale:
+            del self.index[name]
+            cache_path = self.cache_path(name)
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+        if stale:
+            self._save_index()
@@ -0,0 +1,611 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+SQLITE_FILENAME = 'etsytrackr.db'
+
+def _format_date(value):
+    return value.strftime('%Y-%m-%d')
+
+def _file_key(file_path):
+    """Get the (mtime, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class JsonStorage:
+    """Expenses and inventory kept in flat files in the data directory
+
+    Expenses are a snapshot (expenses.json) plus an append-only journal of
+    add/update/delete events (expenses.journal), replayed into memory when
+    either file changes. Each change appends one line to the journal; once it
+    grows past JOURNAL_COMPACT_BYTES a background thread folds it into the
+    snapshot. A line cut short by a crash is skipped when replaying and the
+    next change starts on a line of its own. Inventory is kept in memory by id; changes are coalesced and
+    inventory.json is rewritten once they stop for INVENTORY_WRITE_DELAY
+    seconds, or on flush/close. Files are replaced atomically, both are reread
+    when changed on disk and new ids come from a counter set when they are
+    loaded. The snapshot records the next expense id, every journaled add
+    carries the id it took and inventory.json records the next item id, so
+    ids of deleted records are never handed out again.
+    """
+
+    backend = 'json'
+    JOURNAL_COMPACT_BYTES = 256 * 1024
+    INVENTORY_WRITE_DELAY = 0.5
+
+    def __init__(self, storage_path):
+        self.expenses_file = os.path.join(storage_path, 'expenses.json')
+        self.journal_file = os.path.join(storage_path, 'expenses.journal')
+        self.inventory_file = os.path.join(storage_path, 'inventory.json')
+        self._expenses = None
+        self._files_key = None
+        self._next_expense_id = 1
+        self._inventory = None
+        self._inventory_key = None
+        self._next_inventory_id = 1
+        self._inventory_dirty = False
+        self._inventory_timer = None
+        self._batch_depth = 0
+        self._batch_events = []
+        self._version = 0
+        self._lock = threading.RLock()
+        self._compactor = None
+
+        if not os.path.exists(self.expenses_file):
+            self._write_expenses([], 1)
+        if not os.path.exists(self.inventory_file):
+            self._write_inventory_file([], 1)
+
+    def _read(self, file_path):
+        with open(file_path, 'r') as f:
+            return json.load(f)
+
+    def _write(self, file_path, records, indent=None):
+        """Write records through a temp file so a crash never leaves a truncated file"""
+        temp_file = file_path + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(records, f, indent=indent)
+        os.replace(temp_file, file_path)
+
+    def _read_expenses(self):
+        """Get the snapshot's expenses and next expense id"""
+        snapshot = self._read(self.expenses_file)
+        # Snapshots written before the next id was recorded are a plain list
+        if isinstance(snapshot, list):
+            return snapshot, 1
+        return snapshot['expenses'], snapshot['next_id']
+
+    def _write_expenses(self, expenses, next_id):
+        self._write(self.expenses_file, {'next_id': next_id, 'expenses': expenses})
+
+    def _read_inventory(self):
+        """Get the inventory items and the next item id"""
+        snapshot = self._read(self.inventory_file)
+        # Files written before the next id was recorded are a plain list
+        if isinstance(snapshot, list):
+            return snapshot, 1
+        return snapshot['items'], snapshot['next_id']
+
+    def _write_inventory_file(self, items, next_id):
+        self._write(self.inventory_file, {'next_id': next_id, 'items': items})
+
+    def _expense_files_key(self):
+        return (_file_key(self.expenses_file), _file_key(self.journal_file))
+
+    def _load_expenses(self):
+        """Get the expenses by id, replaying the snapshot and journal if they changed on disk"""
+        with self._lock:
+            # Inside a batch the in-memory expenses are ahead of the files
+            if self._batch_depth and self._expenses is not None:
+                return self._expenses
+            key = self._expense_files_key()
+            if self._expenses is None or key != self._files_key:
+                snapshot, next_id = self._read_expenses()
+                expenses = {expense['id']: expense for expense in snapshot}
+                next_id = max(next_id, max(expenses, default=0) + 1)
+                if os.path.exists(self.journal_file):
+                    with open(self.journal_file, 'r') as f:
+                        for line_number, line in enumerate(f, 1):
+                            if not line.strip():
+                                continue
+                            try:
+                                event = json.loads(line)
+                                self._apply(expenses, event)
+                                if event['op'] == 'add':
+                                    next_id = max(next_id, event['expense']['id'] + 1)
+                            except (ValueError, KeyError, TypeError) as e:
+                                # A write cut short by a crash; the events after it were still committed
+                                print(f"Error replaying expense journal line {line_number}: {str(e)}")
+                self._expenses = expenses
+                self._files_key = key
+                self._next_expense_id = next_id
+                self._version += 1
+            return self._expenses
+
+    @staticmethod
+    def _apply(expenses, event):
+        """Apply a journal event; replaying events already in the snapshot leaves it unchanged"""
+        if event['op'] == 'add':
+            expenses[event['expense']['id']] = event['expense']
+        elif event['op'] == 'update':
+            if event['id'] in expenses:
+                expenses[event['id']] = {**expenses[event['id']], **event['fields']}
+        elif event['op'] == 'delete':
+            expenses.pop(event['id'], None)
+
+    def _log(self, event):
+        """Apply an event in memory and append it to the journal (at the end of a batch)"""
+        with self._lock:
+            expenses = self._load_expenses()
+            self._apply(expenses, event)
+            self._version += 1
+            if self._batch_depth:
+                self._batch_events.append(event)
+            else:
+                self._append_journal([event])
+
+    def _journal_needs_newline(self):
+        """Check whether the journal ends in a line cut short, which the next event must not be glued to"""
+        try:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b'\n'
+        except FileNotFoundError:
+            return False
+
+    def _append_journal(self, events):
+        with self._lock:
+            # The journal only ever grows between compactions, a running one copies its tail by offset
+            lines = ''.join(json.dumps(event) + '\n' for event in events)
+            if self._journal_needs_newline():
+                lines = '\n' + lines
+            with open(self.journal_file, 'a') as f:
+                f.write(lines)
+            self._files_key = self._expense_files_key()
+
+            journal_size = self._files_key[1][1]
+            if journal_size > self.JOURNAL_COMPACT_BYTES and not (self._compactor and self._compactor.is_alive()):
+                self._compactor = threading.Thread(target=self.compact, daemon=True)
+                self._compactor.start()
+
+    def compact(self):
+        """Fold the journal into the snapshot"""
+        with self._lock:
+            expenses = list(self._load_expenses().values())
+            next_id = self._next_expense_id
+            journal_size = self._files_key[1][1] if self._files_key[1] else 0
+
+        # Writing the snapshot is the slow part, so changes may keep coming in meanwhile
+        self._write_expenses(expenses, next_id)
+
+        with self._lock:
+            # Keep only the events logged after the snapshot was taken
+            tail = ''
+            if os.path.exists(self.journal_file):
+                with open(self.journal_file, 'r') as f:
+                    f.seek(journal_size)
+                    tail = f.read()
+            temp_file = self.journal_file + '.tmp'
+            with open(temp_file, 'w') as f:
+                f.write(tail)
+            os.replace(temp_file, self.journal_file)
+            self._files_key = self._expense_files_key()
+
+    def expenses_version(self):
+        """Get a value that changes whenever the expenses change"""
+        with self._lock:
+            self._load_expenses()
+            return (self.expenses_file, self._version)
+
+    def get_expenses(self, start_date=None, end_date=None):
+        """Get the expenses in id order (the stored dicts, do not modify them)"""
+        expenses = list(self._load_expenses().values())
+
+        if start_date and end_date:
+            return [
+                exp for exp in expenses
+                if start_date <= datetime.fromisoformat(exp['date']).date() <= end_date
+            ]
+        return expenses
+
+    def add_expense(self, expense):
+        """Store a new expense under the next free id and return that id"""
+        with self._lock:
+            expenses = self._load_expenses()
+            expense_id = self._next_expense_id
+            self._next_expense_id += 1
+            self._log({'op': 'add', 'expense': {'id': expense_id, **expense}})
+            return expense_id
+
+    def update_expense(self, expense_id, fields):
+        """Change some fields of an expense, returns False if it does not exist"""
+        with self._lock:
+            if expense_id not in self._load_expenses():
+                return False
+            self._log({'op': 'update', 'id': expense_id, 'fields': fields})
+            return True
+
+    def delete_expense(self, expense_id):
+        """Remove an expense and return it, or None if it does not exist"""
+        with self._lock:
+            expense = self._load_expenses().get(expense_id)
+            if expense is None:
+                return None
+            self._log({'op': 'delete', 'id': expense_id})
+            return expense
+
+    def _load_inventory(self):
+        """Get the inventory items by id, rereading inventory.json if it changed on disk"""
+        with self._lock:
+            key = _file_key(self.inventory_file)
+            # Unwritten changes win over the file on disk
+            if self._inventory is None or (key != self._inventory_key and not self._inventory_dirty):
+                items, next_id = self._read_inventory()
+                self._inventory = {item['id']: item for item in items}
+                self._inventory_key = key
+                self._next_inventory_id = max(next_id, max(self._inventory, default=0) + 1)
+            return self._inventory
+
+    def _save_inventory(self):
+        """Write inventory.json once the changes stop for INVENTORY_WRITE_DELAY seconds"""
+        self._inventory_dirty = True
+        if self._batch_depth:
+            return
+        if self._inventory_timer is not None:
+            self._inventory_timer.cancel()
+        self._inventory_timer = threading.Timer(self.INVENTORY_WRITE_DELAY, self._write_inventory)
+        self._inventory_timer.daemon = True
+        self._inventory_timer.start()
+
+    def _write_inventory(self):
+        """Write pending inventory changes to inventory.json"""
+        with self._lock:
+            if self._inventory_timer is not None:
+                self._inventory_timer.cancel()
+                self._inventory_timer = None
+            if self._inventory_dirty:
+                self._write_inventory_file(list(self._inventory.values()), self._next_inventory_id)
+                self._inventory_key = _file_key(self.inventory_file)
+                self._inventory_dirty = False
+
+    def get_inventory(self):
+        """Get copies of the inventory items in the order they were added"""
+        with self._lock:
+            return [dict(item) for item in self._load_inventory().values()]
+
+    def get_inventory_item(self, item_id):
+        with self._lock:
+            item = self._load_inventory().get(item_id)
+            return dict(item) if item is not None else None
+
+    def next_inventory_id(self):
+        """Reserve the id of a new inventory item"""
+        with self._lock:
+            self._load_inventory()
+            item_id = self._next_inventory_id
+            self._next_inventory_id += 1
+            return item_id
+
+    def add_inventory_item(self, item):
+        with self._lock:
+            items = self._load_inventory()
+            items[item['id']] = dict(item)
+            self._next_inventory_id = max(self._next_inventory_id, item['id'] + 1)
+            self._save_inventory()
+
+    def update_inventory_item(self, item):
+        """Replace the stored item with the same id, returns False if there is none"""
+        with self._lock:
+            items = self._load_inventory()
+            if item['id'] not in items:
+                return False
+            items[item['id']] = dict(item)
+            self._save_inventory()
+            return True
+
+    def delete_inventory_item(self, item_id):
+        """Remove an item and return it, or None if it does not exist"""
+        with self._lock:
+            item = self._load_inventory().pop(item_id, None)
+            if item is not None:
+                self._save_inventory()
+            return item
+
+    @contextmanager
+    def batch(self):
+        """Group changes so they are written once when the block ends
+
+        If the block raises, every change made in it is undone. Batches can be
+        nested; only the outermost one writes.
+        """
+        with self._lock:
+            if self._batch_depth:
+                self._batch_depth += 1
+                try:
+                    yield
+                finally:
+                    self._batch_depth -= 1
+                return
+
+            backup = (dict(self._load_expenses()), self._next_expense_id,
+                      dict(self._load_inventory()), self._next_inventory_id, self._inventory_dirty)
+            self._batch_depth = 1
+            try:
+                yield
+            except BaseException:
+                (self._expenses, self._next_expense_id,
+                 self._inventory, self._next_inventory_id, self._inventory_dirty) = backup
+                self._version += 1
+                raise
+            finally:
+                self._batch_depth = 0
+                events, self._batch_events = self._batch_events, []
+
+            if events:
+                self._append_journal(events)
+            self._write_inventory()
+
+    def replace_all(self, expenses, inventory):
+        """Overwrite all expenses and inventory, used when switching backends"""
+        self.close()
+        with self._lock:
+            self._write_expenses(expenses, max((expense['id'] for expense in expenses), default=0) + 1)
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self._expenses = None
+            self._write_inventory_file(inventory, max((item['id'] for item in inventory), default=0) + 1)
+            self._inventory = None
+
+    def flush(self):
+        """Write pending inventory changes and fold any journaled changes into expenses.json"""
+        self.close()
+        with self._lock:
+            if os.path.exists(self.journal_file) and os.path.getsize(self.journal_file) > 0:
+                self.compact()
+
+    def data_files(self):
+        """Get the files holding this backend's data, with the journal folded into the snapshot"""
+        self.flush()
+        return [self.expenses_file, self.inventory_file]
+
+    def close(self):
+        """Write pending inventory changes and wait for a running compaction to finish"""
+        self._write_inventory()
+        if self._compactor is not None:
+            self._compactor.join()
+
+class SqliteStorage:
+    """Expenses and inventory kept in an SQLite database (etsytrackr.db)
+
+    Uses WAL journaling and keys both tables on id, so single record changes
+    do not touch the other records. There is no date index: Database keeps
+    the expenses sorted by date in memory and answers date ranges from
+    there, so an index would only slow down writes. The JSON files are
+    imported once when the database is first created.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, storage_path):
+        self.db_file = os.path.join(storage_path, SQLITE_FILENAME)
+        self.expenses_file = os.path.join(storage_path, 'expenses.json')
+        self.inventory_file = os.path.join(storage_path, 'inventory.json')
+        self._version = 0
+        self._batch_depth = 0
+        self._lock = threading.RLock()
+
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            self.conn.executescript('''
+                CREATE TABLE IF NOT EXISTS expenses (
+                    id INTEGER PRIMARY KEY,
+                    date TEXT NOT NULL,
+                    description TEXT,
+                    amount REAL NOT NULL,
+                    receipt_file TEXT
+                );
+                DROP INDEX IF EXISTS idx_expenses_date;
+                CREATE TABLE IF NOT EXISTS inventory (
+                    id INTEGER PRIMARY KEY,
+                    item TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            ''')
+        self._migrate_json()
+
+    def _migrate_json(self):
+        """Import expenses.json and inventory.json the first time the database is opened"""
+        with self._transaction():
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                return
+
+            json_storage = JsonStorage(os.path.dirname(self.db_file))
+            self._insert_all(json_storage.get_expenses(), json_storage.get_inventory())
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+                              (datetime.now().isoformat(),))
+        self._version += 1
+
+    @contextmanager
+    def _transaction(self):
+        """Commit the statements run inside, unless a batch will commit them"""
+        with self._lock:
+            if self._batch_depth:
+                yield
+            else:
+                with self.conn:
+                    yield
+
+    @contextmanager
+    def batch(self):
+        """Run changes in one transaction, rolled back if the block raises"""
+        with self._lock:
+            with self._transaction():
+                self._batch_depth += 1
+                try:
+                    yield
+                except BaseException:
+                    self._version += 1
+                    raise
+                finally:
+                    self._batch_depth -= 1
+
+    def _insert_all(self, expenses, inventory):
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO expenses (id, date, description, amount, receipt_file) VALUES (?, ?, ?, ?, ?)',
+            [(exp['id'], exp['date'], exp.get('description'), exp['amount'], exp.get('receipt_file'))
+             for exp in expenses]
+        )
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO inventory (id, item) VALUES (?, ?)',
+            [(item['id'], json.dumps(item)) for item in inventory]
+        )
+
+    def _expense(self, row):
+        return {
+            'id': row['id'],
+            'date': row['date'],
+            'description': row['description'],
+            'amount': row['amount'],
+            'receipt_file': row['receipt_file']
+        }
+
+    def expenses_version(self):
+        """Get a value that changes whenever the expenses change"""
+        return (self.db_file, self._version)
+
+    def get_expenses(self, start_date=None, end_date=None):
+        with self._lock:
+            if start_date and end_date:
+                rows = self.conn.execute(
+                    'SELECT * FROM expenses WHERE date BETWEEN ? AND ? ORDER BY id',
+                    (_format_date(start_date), _format_date(end_date))
+                ).fetchall()
+            else:
+                rows = self.conn.execute('SELECT * FROM expenses ORDER BY id').fetchall()
+        return [self._expense(row) for row in rows]
+
+    def add_expense(self, expense):
+        """Store a new expense under the next free id and return that id"""
+        with self._transaction():
+            expense_id = self._next_id('expenses', 'next_expense_id')
+            self.conn.execute(
+                'INSERT INTO expenses (id, date, description, amount, receipt_file) VALUES (?, ?, ?, ?, ?)',
+                (expense_id, expense['date'], expense.get('description'), expense['amount'],
+                 expense.get('receipt_file'))
+            )
+            self._version += 1
+            return expense_id
+
+    def update_expense(self, expense_id, fields):
+        """Change some fields of an expense, returns False if it does not exist"""
+        columns = [column for column in ('date', 'description', 'amount', 'receipt_file') if column in fields]
+        if not columns:
+            return self.conn.execute('SELECT 1 FROM expenses WHERE id = ?', (expense_id,)).fetchone() is not None
+        with self._transaction():
+            cursor = self.conn.execute(
+                f"UPDATE expenses SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+                [fields[column] for column in columns] + [expense_id]
+            )
+            self._version += 1
+            return cursor.rowcount > 0
+
+    def delete_expense(self, expense_id):
+        """Remove an expense and return it, or None if it does not exist"""
+        with self._transaction():
+            row = self.conn.execute('SELECT * FROM expenses WHERE id = ?', (expense_id,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
+            self._version += 1
+            return self._expense(row)
+
+    def get_inventory(self):
+        with self._lock:
+            rows = self.conn.execute('SELECT item FROM inventory ORDER BY id').fetchall()
+        return [json.loads(row['item']) for row in rows]
+
+    def get_inventory_item(self, item_id):
+        with self._lock:
+            row = self.conn.execute('SELECT item FROM inventory WHERE id = ?', (item_id,)).fetchone()
+        return json.loads(row['item']) if row else None
+
+    def _next_id(self, table, key):
+        """Take the next id of a table from its counter in meta, so ids of deleted records are not reused"""
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        max_id = self.conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+        next_id = max(int(row['value']) if row else 1, max_id + 1)
+        self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(next_id + 1)))
+        return next_id
+
+    def next_inventory_id(self):
+        """Reserve the id of a new inventory item"""
+        with self._transaction():
+            return self._next_id('inventory', 'next_inventory_id')
+
+    def add_inventory_item(self, item):
+        with self._transaction():
+            self.conn.execute('INSERT INTO inventory (id, item) VALUES (?, ?)', (item['id'], json.dumps(item)))
+
+    def update_inventory_item(self, item):
+        """Replace the stored item with the same id, returns False if there is none"""
+        with self._transaction():
+            cursor = self.conn.execute('UPDATE inventory SET item = ? WHERE id = ?', (json.dumps(item), item['id']))
+            return cursor.rowcount > 0
+
+    def delete_inventory_item(self, item_id):
+        """Remove an item and return it, or None if it does not exist"""
+        with self._transaction():
+            row = self.conn.execute('SELECT item FROM inventory WHERE id = ?', (item_id,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute('DELETE FROM inventory WHERE id = ?', (item_id,))
+            return json.loads(row['item'])
+
+    def replace_all(self, expenses, inventory):
+        """Overwrite all expenses and inventory, used when switching backends"""
+        with self._transaction():
+            self.conn.execute('DELETE FROM expenses')
+            self.conn.execute('DELETE FROM inventory')
+            self._insert_all(expenses, inventory)
+            self._version += 1
+
+    def flush(self):
+        """Fold the WAL into the database file"""
+        with self._lock:
+            self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def data_files(self):
+        """Get the files holding this backend's data, after folding the WAL into the database"""
+        self.flush()
+        return [self.db_file]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+def open_storage(storage_path, backend=None):
+    """Open the expense and inventory storage in a data directory
+
+    backend is 'json' or 'sqlite'; when None, SQLite is used if the directory
+    already has a database.
+    """
+    if backend is None:
+        backend = 'sqlite' if os.path.exists(os.path.join(storage_path, SQLITE_FILENAME)) else 'json'
+    if backend == 'sqlite':
+        return SqliteStorage(storage_path)
+    return JsonStorage(storage_path)
@@ -0,0 +1,14 @@
+import os
+import sys
+import pytest
+
+# Tests import the app modules the way main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def local_cache(tmp_path, monkeypatch):
+    """Keep statement caches of the tests out of the user's cache directory"""
+    cache_home = tmp_path / 'local-cache'
+    monkeypatch.setenv('XDG_CACHE_HOME', str(cache_home))
+    monkeypatch.setenv('LOCALAPPDATA', str(cache_home))
+    return cache_home
@@ -0,0 +1,203 @@
+"""Row-by-row statement consolidation as it was before it was vectorized
+
+Kept verbatim as the reference the vectorized consolidate_statement is
+checked against.
+"""
+import pandas as pd
+
+class LegacyConsolidation:
+    def clean_amount(self, amount_str):
+        """Convert currency string to float"""
+        if isinstance(amount_str, float):
+            return amount_str
+        if pd.isna(amount_str) or amount_str == '--':
+            return 0.0
+        # Remove $ and any spaces, then convert to float
+        return float(str(amount_str).replace('$', '').replace(',', '').strip())
+
+    def process_statement_data(self, df):
+        """Process statement data to consolidate transactions by Order ID"""
+        # Replace '--' with NaN
+        df = df.replace('--', pd.NA)
+        
+        # Try different date formats
+        for date_format in ['%d-%b-%y', '%B %d, %Y', '%Y-%m-%d']:
+            try:
+                df['Date'] = pd.to_datetime(df['Date'], format=date_format)
+                break
+            except:
+                continue
+        
+        if pd.api.types.is_datetime64_any_dtype(df['Date']) == False:
+            print("Failed to parse dates")
+            return None
+        
+        # Initialize order data dictionary
+        orders = {}
+        
+        # First pass: Process sales, refunds, and fees
+        for _, row in df.iterrows():
+            # Extract order ID from Title or Info if present
+            order_id = None
+            if 'Order #' in str(row['Title']):
+                order_id = row['Title'].split('Order #')[-1].split()[0]
+            elif 'Order #' in str(row['Info']):
+                order_id = row['Info'].split('Order #')[-1].split()[0]
+            
+            # Handle listing fees (create new entry)
+            if row['Type'] == 'Fee' and ('Listing fee' in str(row['Title']) or 'Credit for listing fee' in str(row['Title'])):
+                listing_id = None
+                if 'Listing #' in str(row['Info']):
+                    listing_id = row['Info'].split('Listing #')[-1].split()[0]
+                if listing_id:
+                    key = f"Listing_{listing_id}"
+                    if key not in orders:
+                        orders[key] = {
+                            'Date': row['Date'],
+                            'Order ID': f"Listing #{listing_id}",
+                            'Items': 'Listing Fee',
+                            'Sale Amount': 0.0,
+                            'Shipping Fee': 0.0,
+                            'Sales Tax': 0.0,
+                            'Shipping Transaction Fee': 0.0,
+                            'Item Transaction Fee': 0.0,
+                            'Processing Fee': 0.0,
+                            'Listing Fee': 0.0,
+                            'Offsite Ads Fee': 0.0,
+                            'Etsy Ads Fee': 0.0,
+                            'Net': 0.0
+                        }
+                    # Add the fee or credit
+                    fee_amount = self.clean_amount(row['Net'])
+                    orders[key]['Listing Fee'] += fee_amount
+                    orders[key]['Net'] += fee_amount
+                continue
+            
+            # Handle shipping labels (create new entry)
+            if row['Type'] == 'Shipping' and 'shipping label' in str(row['Title'].lower()):
+                label_id = None
+                if 'Label #' in str(row['Info']):
+                    label_id = row['Info'].split('Label #')[-1].split()[0]
+                if label_id:
+                    orders[f"Label_{label_id}"] = {
+                        'Date': row['Date'],
+                        'Order ID': f"Label #{label_id}",
+                        'Items': 'Shipping Label',
+                        'Sale Amount': 0.0,
+                        'Shipping Fee': self.clean_amount(row['Net']),
+                        'Sales Tax': 0.0,
+                        'Shipping Transaction Fee': 0.0,
+                        'Item Transaction Fee': 0.0,
+                        'Processing Fee': 0.0,
+                        'Listing Fee': 0.0,
+                        'Offsite Ads Fee': 0.0,
+                        'Etsy Ads Fee': 0.0,
+                        'Net': self.clean_amount(row['Net'])
+                    }
+                continue
+            
+            # Initialize order if not exists (for regular transactions)
+            if order_id and order_id not in orders:
+                orders[order_id] = {
+                    'Date': row['Date'],
+                    'Order ID': order_id,
+                    'Items': '',
+                    'Sale Amount': 0.0,
+                    'Shipping Fee': 0.0,
+                    'Sales Tax': 0.0,
+                    'Shipping Transaction Fee': 0.0,
+                    'Item Transaction Fee': 0.0,
+                    'Processing Fee': 0.0,
+                    'Listing Fee': 0.0,
+                    'Offsite Ads Fee': 0.0,
+                    'Etsy Ads Fee': 0.0,
+                    'Net': 0.0
+                }
+            
+            # Handle different transaction types
+            if order_id:
+                if row['Type'] == 'Sale':
+                    amount = self.clean_amount(row['Amount'])
+                    orders[order_id]['Sale Amount'] = amount
+                    orders[order_id]['Net'] = amount
+                
+                elif row['Type'] == 'Refund':
+                    amount = self.clean_amount(row['Amount'])
+                    orders[order_id]['Sale Amount'] = amount  # This will be negative
+                    orders[order_id]['Net'] = amount
+                    # Mark the items as refunded
+                    if orders[order_id]['Items']:
+                        orders[order_id]['Items'] = '[REFUNDED] ' + orders[order_id]['Items']
+                    else:
+                        orders[order_id]['Items'] = '[REFUNDED] Order'
+                
+                elif row['Type'] == 'Fee':
+                    fee_amount = self.clean_amount(row['Net'])
+                    if 'Transaction fee: Shipping' in row['Title'] or 'Credit for transaction fee on shipping' in row['Title']:
+                        orders[order_id]['Shipping Transaction Fee'] += fee_amount
+                        orders[order_id]['Net'] += fee_amount
+                    elif 'Transaction fee:' in row['Title'] or 'Credit for transaction fee on' in row['Title']:
+                        orders[order_id]['Item Transaction Fee'] += fee_amount
+                        orders[order_id]['Net'] += fee_amount
+                        # Extract item name from transaction fee if not already set
+                        if not orders[order_id]['Items']:
+                            if 'Transaction fee:' in row['Title']:
+                                item_name = row['Title'].split('Transaction fee:')[-1].strip()
+                            else:
+                                item_name = row['Title'].split('Credit for transaction fee on')[-1].strip()
+                            if item_name:
+                                orders[order_id]['Items'] = item_name
+                    elif 'Processing fee' in row['Title'] or 'Credit for processing fee' in row['Title']:
+                        orders[order_id]['Processing Fee'] += fee_amount
+                        orders[order_id]['Net'] += fee_amount
+                elif row['Type'] == 'Marketing':
+                    if 'Fee for sale made through Offsite Ads' in row['Title']:
+                        fee_amount = self.clean_amount(row['Net'])
+                        # Extract order ID from Info field for Offsite Ads
+                        if 'Order #' in str(row['Info']):
+                            order_id = row['Info'].split('Order #')[-1].split()[0]
+                            if order_id in orders:
+                                orders[order_id]['Offsite Ads Fee'] = fee_amount
+                                orders[order_id]['Net'] += fee_amount
+                elif row['Type'] == 'Tax':
+                    tax_amount = self.clean_amount(row['Net'])
+                    # Extract order ID from Info field for tax
+                    if 'Order #' in str(row['Info']):
+                        order_id = row['Info'].split('Order #')[-1].split()[0]
+                        if order_id in orders:
+                            orders[order_id]['Sales Tax'] = tax_amount
+                            orders[order_id]['Net'] += tax_amount
+        
+        # Handle standalone Etsy Ads fees (not associated with orders)
+        for _, row in df.iterrows():
+            if row['Type'] == 'Marketing' and 'Etsy Ads' in row['Title']:
+                fee_amount = self.clean_amount(row['Net'])
+                # Create a unique key for this Etsy Ads charge
+                ads_date = row['Date'].strftime('%Y-%m-%d')
+                key = f"EtsyAds_{ads_date}"
+                
+                orders[key] = {
+                    'Date': row['Date'],
+                    'Order ID': 'Etsy Ads',
+                    'Items': f"Ad clicks on {ads_date}",
+                    'Sale Amount': 0.0,
+                    'Shipping Fee': 0.0,
+                    'Sales Tax': 0.0,
+                    'Shipping Transaction Fee': 0.0,
+                    'Item Transaction Fee': 0.0,
+                    'Processing Fee': 0.0,
+                    'Listing Fee': 0.0,
+                    'Offsite Ads Fee': 0.0,
+                    'Etsy Ads Fee': fee_amount,
+                    'Net': fee_amount
+                }
+        
+        # Convert orders to DataFrame
+        orders_list = list(orders.values())
+        result_df = pd.DataFrame(orders_list)
+        
+        # Sort by date
+        result_df = result_df.sort_values('Date', ascending=False)
+        
+        return result_df
+
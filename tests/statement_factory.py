@@ -0,0 +1,78 @@
+"""Generated Etsy monthly statements for tests and benchmarks"""
+import io
+import numpy as np
+import pandas as pd
+
+STATEMENT_COLUMNS = ['Date', 'Type', 'Title', 'Info', 'Currency', 'Amount', 'Fees & Taxes', 'Net', 'Tax Details']
+ITEMS = ['Ceramic Mug', 'Blue Glazed Bowl', 'Handmade Vase, large', 'Coaster set', 'Planter']
+
+def _money(value):
+    return ('-' if value < 0 else '') + '$' + f"{abs(value):,.2f}"
+
+def make_statement(n_rows, seed=0, date_format='%B %d, %Y', start='2024-03-01'):
+    """Get a raw statement frame as read from a downloaded CSV
+
+    Holds sales with their fees and taxes in shuffled order, refunds with fee
+    credits, listing fees and credits, shipping labels, Etsy Ads, deposits and
+    rows with blank Info (no order ID).
+    """
+    rng = np.random.default_rng(seed)
+    base = pd.Timestamp(start)
+    order_id = 3000000000
+    rows = []
+    while len(rows) < n_rows:
+        kind = rng.random()
+        day = (base + pd.Timedelta(days=int(rng.integers(0, base.days_in_month)))).strftime(date_format)
+        if kind < 0.55:
+            order_id += int(rng.integers(1, 5))
+            order = str(order_id)
+            price = float(rng.integers(500, 150000)) / 100
+            item = ITEMS[int(rng.integers(len(ITEMS)))]
+            events = [
+                ('Sale', f'Payment for Order #{order}', '', _money(price), '--', _money(price)),
+                ('Fee', f'Transaction fee: {item}', f'Order #{order}', '--', _money(-price * 0.065), _money(-price * 0.065)),
+                ('Fee', 'Transaction fee: Shipping', f'Order #{order}', '--', _money(-0.39), _money(-0.39)),
+                ('Fee', 'Processing fee', f'Order #{order}', '--', _money(-0.25 - price * 0.03), _money(-0.25 - price * 0.03)),
+                ('Tax', 'Sales tax paid by buyer', f'Order #{order}', '--', _money(-price * 0.07), _money(-price * 0.07)),
+            ]
+            if rng.random() < 0.2:
+                events.append(('Marketing', 'Fee for sale made through Offsite Ads', f'Order #{order}', '--',
+                               _money(-price * 0.15), _money(-price * 0.15)))
+            if rng.random() < 0.08:
+                events.append(('Refund', f'Refund to buyer for Order #{order}', '', _money(-price), '--', _money(-price)))
+                events.append(('Fee', f'Credit for transaction fee on {item}', f'Order #{order}', '--',
+                               _money(price * 0.065), _money(price * 0.065)))
+                events.append(('Fee', 'Credit for processing fee', f'Order #{order}', '--', _money(0.2), _money(0.2)))
+            for index in rng.permutation(len(events)):
+                row_type, title, info, amount, fees, net = events[index]
+                rows.append([day, row_type, title, info, 'USD', amount, fees, net, '--'])
+        elif kind < 0.72:
+            listing = int(rng.integers(1000, 1100))
+            title = 'Listing fee' if rng.random() < 0.9 else 'Credit for listing fee'
+            value = -0.2 if title == 'Listing fee' else 0.2
+            rows.append([day, 'Fee', title, f'Listing #{listing}', 'USD', '--', _money(value), _money(value), '--'])
+        elif kind < 0.82:
+            label = int(rng.integers(5000, 5200))
+            value = -float(rng.integers(300, 1500)) / 100
+            rows.append([day, 'Shipping', 'USPS shipping label', f'Label #{label}', 'USD', '--', _money(value), _money(value), '--'])
+        elif kind < 0.89:
+            value = -float(rng.integers(10, 500)) / 100
+            rows.append([day, 'Marketing', 'Etsy Ads', 'Etsy Ads', 'USD', '--', _money(value), _money(value), '--'])
+        elif kind < 0.94:
+            # Fees without an order: blank Info, so no order ID
+            value = -float(rng.integers(10, 200)) / 100
+            rows.append([day, 'Fee', 'Processing fee', '', 'USD', '--', _money(value), _money(value), '--'])
+        else:
+            rows.append([day, 'Deposit', f'{_money(100)} sent to your bank account', '--', 'USD', '--', '--', '--', '--'])
+    return read_statement(pd.DataFrame(rows[:n_rows], columns=STATEMENT_COLUMNS))
+
+def read_statement(df):
+    """Round-trip a statement frame through CSV so it has the types of a downloaded statement"""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    buffer.seek(0)
+    return pd.read_csv(buffer)
+
+def write_statement(path, n_rows, seed=0, **kwargs):
+    """Write a generated statement CSV"""
+    make_statement(n_rows, seed, **kwargs).to_csv(path, index=False)
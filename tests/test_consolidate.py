@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+from modules.database import consolidate_statement
+from tests.legacy_consolidate import LegacyConsolidation
+from tests.statement_factory import STATEMENT_COLUMNS, make_statement, read_statement
+
+@pytest.mark.parametrize('n_rows, seed, date_format', [
+    (50, 0, '%B %d, %Y'),
+    (500, 1, '%d-%b-%y'),
+    (3000, 2, '%Y-%m-%d'),
+    (3000, 3, '%B %d, %Y'),
+])
+def test_matches_row_by_row_consolidation(n_rows, seed, date_format):
+    raw = make_statement(n_rows, seed, date_format)
+    expected = LegacyConsolidation().process_statement_data(raw.copy())
+    pd.testing.assert_frame_equal(consolidate_statement(raw.copy()), expected, check_exact=True)
+
+def test_statement_has_refunds_labels_and_rows_without_order():
+    raw = make_statement(3000, 3)
+    result = consolidate_statement(raw.copy())
+    assert result['Items'].str.startswith('[REFUNDED]').any()
+    assert result['Order ID'].str.startswith('Label #').any()
+    assert result['Order ID'].str.startswith('Listing #').any()
+    assert raw['Info'].isna().any()
+
+def test_refund_before_item_name():
+    raw = read_statement(pd.DataFrame([
+        ['March 2, 2024', 'Refund', 'Refund to buyer for Order #100', '', 'USD', '-$10.00', '--', '-$10.00', '--'],
+        ['March 1, 2024', 'Sale', 'Payment for Order #100', '', 'USD', '$10.00', '--', '$10.00', '--'],
+        ['March 1, 2024', 'Fee', 'Transaction fee: Ceramic Mug', 'Order #100', 'USD', '--', '-$0.65', '-$0.65', '--'],
+        ['March 3, 2024', 'Fee', 'Processing fee', None, 'USD', '--', '-$0.30', '-$0.30', '--'],
+    ], columns=STATEMENT_COLUMNS))
+    expected = LegacyConsolidation().process_statement_data(raw.copy())
+    result = consolidate_statement(raw.copy())
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+    assert result['Items'].tolist() == ['[REFUNDED] Order']
+
+def test_empty_statement():
+    # The row-by-row version raised a KeyError here, an empty frame keeps the columns
+    result = consolidate_statement(pd.DataFrame(columns=STATEMENT_COLUMNS))
+    assert result.empty
+    assert {'Date', 'Order ID', 'Items', 'Net'} <= set(result.columns)
@@ -0,0 +1,43 @@
+import os
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+QtWidgets = pytest.importorskip('PySide6.QtWidgets')
+
+from modules.database import Database
+from modules.dashboard import DashboardWidget
+from tests.statement_factory import write_statement
+
+@pytest.fixture(scope='module')
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+def test_dashboard_is_only_rebuilt_when_its_data_or_filters_change(app, tmp_path, monkeypatch):
+    data_dir = tmp_path / 'data'
+    os.makedirs(data_dir / 'statements')
+    write_statement(data_dir / 'statements' / 'etsy_statement_2024_01.csv', 200, seed=0, start='2024-01-01')
+    db = Database(str(data_dir))
+    widget = DashboardWidget(db, None, None)
+    builds = []
+    update_metrics = widget.update_metrics
+    def counting_update(rollup):
+        builds.append(1)
+        return update_metrics(rollup)
+    monkeypatch.setattr(widget, 'update_metrics', counting_update)
+
+    widget.year_filter.setCurrentText('2024')
+    widget.month_filter.setCurrentText('January')
+    assert len(builds) == 1
+    for _ in range(3):
+        widget.refresh_dashboard()
+        widget.on_data_changed('sales')
+    assert len(builds) == 1
+
+    db.add_expense({'date': '2024-01-05', 'description': 'Clay', 'amount': 12.0, 'receipt_file': None})
+    widget.on_data_changed('expenses')
+    widget.on_data_changed('expenses')
+    assert len(builds) == 2
+
+    # The refresh button always rebuilds
+    widget.refresh_btn.click()
+    assert len(builds) == 3
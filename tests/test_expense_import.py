@@ -0,0 +1,64 @@
+import pytest
+from modules.database import Database
+from modules.expense_import import DEFAULT_PROFILE, detect_date_format, import_expenses, read_transactions
+
+def write_export(path, rows, header='Date,Description,Amount'):
+    path.write_text('\n'.join([header] + rows) + '\n')
+    return str(path)
+
+@pytest.mark.parametrize('dates, expected', [
+    (['2024-03-05', '2024-03-14'], ['2024-03-05', '2024-03-14']),
+    (['03/05/2024', '03/14/2024'], ['2024-03-05', '2024-03-14']),
+    (['03/05/24', '03/14/24'], ['2024-03-05', '2024-03-14']),
+    (['05-Mar-24', '14-Mar-24'], ['2024-03-05', '2024-03-14']),
+    (['"March 5, 2024"', '"March 14, 2024"'], ['2024-03-05', '2024-03-14']),
+])
+def test_date_format_is_detected(tmp_path, dates, expected):
+    path = write_export(tmp_path / 'export.csv', [f'{day},Coffee,-4.50' for day in dates])
+    assert [expense['date'] for expense in read_transactions(path, DEFAULT_PROFILE)] == expected
+
+def test_profile_date_format_is_used(tmp_path):
+    path = write_export(tmp_path / 'export.csv', ['05/03/2024,Coffee,-4.50'])
+    profile = {**DEFAULT_PROFILE, 'date_format': '%d/%m/%Y'}
+    assert [expense['date'] for expense in read_transactions(path, profile)] == ['2024-03-05']
+
+def test_only_money_going_out_is_imported(tmp_path):
+    path = write_export(tmp_path / 'export.csv', [
+        '2024-03-05,"Paper,  A4",-12.00',
+        '2024-03-06,Payment received,250.00',
+        '2024-03-07,Blank,',
+        '2024-03-08,Ink,($8.25)',
+    ])
+    assert list(read_transactions(path, DEFAULT_PROFILE)) == [
+        {'date': '2024-03-05', 'description': 'Paper, A4', 'amount': 12.0},
+        {'date': '2024-03-08', 'description': 'Ink', 'amount': 8.25},
+    ]
+
+def test_reimport_adds_nothing(tmp_path):
+    db = Database(str(tmp_path / 'data'))
+    path = write_export(tmp_path / 'export.csv', ['2024-03-05,Coffee,-4.50', '2024-03-05,Coffee,-4.50'])
+    assert import_expenses(db, path, DEFAULT_PROFILE) == {'added': 2, 'duplicates': 0}
+    assert import_expenses(db, path, DEFAULT_PROFILE) == {'added': 0, 'duplicates': 2}
+
+def test_ambiguous_dates_are_read_with_the_format_fitting_the_whole_file(tmp_path):
+    path = write_export(tmp_path / 'export.csv', ['05/03/2024,Coffee,-4.50', '25/03/2024,Tea,-3.00'])
+    assert detect_date_format(path, DEFAULT_PROFILE) == '%d/%m/%Y'
+    assert [expense['date'] for expense in read_transactions(path, DEFAULT_PROFILE)] == ['2024-03-05', '2024-03-25']
+
+def test_rows_in_another_format_are_reported_not_guessed(tmp_path):
+    db = Database(str(tmp_path / 'data'))
+    path = write_export(tmp_path / 'export.csv', [
+        '2024-03-05,Coffee,-4.50',
+        '03/06/2024,Tea,-3.00',
+        '2024-03-07,Paper,-9.00',
+        '7 Mar 2024,Ink,-8.00',
+    ])
+    with pytest.raises(ValueError, match=r'2 rows do not match the date format %Y-%m-%d \(lines 3, 5\)'):
+        import_expenses(db, path, DEFAULT_PROFILE)
+    # Nothing is imported from a file with mismatched dates
+    assert len(db.get_expenses()) == 0
+
+def test_undetectable_dates_are_reported(tmp_path):
+    path = write_export(tmp_path / 'export.csv', ['someday,Coffee,-4.50'])
+    with pytest.raises(ValueError, match='date format'):
+        list(read_transactions(path, DEFAULT_PROFILE))
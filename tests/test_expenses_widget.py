@@ -0,0 +1,40 @@
+import os
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+QtWidgets = pytest.importorskip('PySide6.QtWidgets')
+
+from modules.database import Database
+from modules.expenses import ExpensesWidget
+
+@pytest.fixture(scope='module')
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+def test_expense_with_receipt_is_one_write_outside_the_lock(app, tmp_path, monkeypatch):
+    db = Database(str(tmp_path / 'data'))
+    widget = ExpensesWidget(db)
+    def fail(parent, title, text):
+        raise AssertionError(text)
+    monkeypatch.setattr(QtWidgets.QMessageBox, 'critical', fail)
+    receipt = tmp_path / 'receipt.pdf'
+    receipt.write_bytes(b'%PDF')
+
+    # The receipt is copied before the storage is touched
+    store_receipt = db.store_receipt
+    def checked_store(source_path):
+        assert db.storage._batch_depth == 0
+        return store_receipt(source_path)
+    monkeypatch.setattr(db, 'store_receipt', checked_store)
+
+    widget.desc_edit.setText('Glaze')
+    widget.amount_edit.setText('$42.50')
+    widget.current_receipt_path = str(receipt)
+    widget.add_expense()
+
+    [expense] = db.get_expenses()
+    assert expense['description'] == 'Glaze' and expense['amount'] == 42.5
+    assert db.get_receipt_refcounts()[expense['receipt_file']] == 1
+    with open(db.storage.journal_file) as f:
+        assert len(f.readlines()) == 1
+    assert widget.current_receipt_path is None
@@ -0,0 +1,76 @@
+import os
+import time
+import pytest
+import pandas as pd
+from modules.database import Database, consolidate_statement
+from tests.statement_factory import write_statement
+
+MONTHS = ['2024_01', '2024_02', '2024_03', '2024_04']
+
+def make_store(tmp_path):
+    data_dir = tmp_path / 'data'
+    os.makedirs(data_dir / 'statements')
+    for seed, month in enumerate(MONTHS):
+        write_statement(data_dir / 'statements' / f'etsy_statement_{month}.csv', 300, seed=seed,
+                        start=month.replace('_', '-') + '-01')
+    return str(data_dir)
+
+def downloads(tmp_path, seed_offset):
+    downloads_dir = tmp_path / f'downloads{seed_offset}'
+    os.makedirs(downloads_dir)
+    files = {}
+    for seed, month in enumerate(MONTHS):
+        path = downloads_dir / f'etsy_statement_{month}.csv'
+        write_statement(path, 2000, seed=seed + seed_offset, start=month.replace('_', '-') + '-01')
+        files[month] = str(path)
+    return files
+
+def assert_cache_matches_statements(db):
+    for file_path in db.get_statement_files():
+        assert db.statement_cache.is_current(file_path)
+        cached = pd.read_pickle(db.statement_cache.cache_path(file_path))
+        expected = consolidate_statement(pd.read_csv(file_path))
+        pd.testing.assert_frame_equal(cached, expected)
+
+def test_import_replaces_months(tmp_path):
+    db = Database(make_store(tmp_path))
+    db.sales_store.get_sales()
+    assert db.import_statements(downloads(tmp_path, 10)) == MONTHS
+    assert_cache_matches_statements(db)
+    assert len(db.sales_store.get_sales()) == sum(
+        len(consolidate_statement(pd.read_csv(path))) for path in db.get_statement_files())
+
+def test_cancelled_import_keeps_cache_of_stored_statements(tmp_path):
+    db = Database(make_store(tmp_path))
+    db.sales_store.get_sales()
+    files = downloads(tmp_path, 10)
+
+    start = time.monotonic()
+    assert db.import_statements(files, is_cancelled=lambda: True) == []
+    # Statements already being processed are not waited for
+    assert time.monotonic() - start < 5
+
+    # Let the jobs that were already running finish writing their build files
+    time.sleep(8)
+    assert_cache_matches_statements(db)
+    reopened = Database(db.storage_path)
+    assert_cache_matches_statements(reopened)
+    assert not [name for name in os.listdir(reopened.statement_cache.cache_dir) if name.endswith('.part')]
+
+def test_clearing_and_relocating_wait_for_a_running_import(tmp_path):
+    db = Database(str(tmp_path / 'data'))
+    source = tmp_path / 'download.csv'
+    write_statement(source, 100, seed=1, start='2024-05-01')
+
+    def check_refused(done, total):
+        for action in (db.clear_sales_data, lambda: db.update_storage_location(str(tmp_path / 'moved')),
+                       lambda: db.copy_data_to(str(tmp_path / 'copy'))):
+            with pytest.raises(RuntimeError, match='import is running'):
+                action()
+    assert db.import_statements({'2024_05': str(source)}, progress=check_refused) == ['2024_05']
+    assert db.storage_path == str(tmp_path / 'data')
+    assert not os.path.exists(tmp_path / 'copy')
+
+    # Allowed again once the import finished
+    assert db.clear_sales_data()
+    assert db.get_statement_files() == []
@@ -0,0 +1,130 @@
+import os
+import re
+import random
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from modules.database import Database
+from modules.rollup import rollup_categories
+from modules.range_index import RangeIndex
+from modules.search_index import SearchIndex, tokenize
+from tests.statement_factory import write_statement
+
+def make_store(tmp_path, months=('2023_11', '2023_12', '2024_01')):
+    data_dir = tmp_path / 'data'
+    os.makedirs(data_dir / 'statements')
+    for seed, month in enumerate(months):
+        write_statement(data_dir / 'statements' / f'etsy_statement_{month}.csv', 300, seed=seed,
+                        start=month.replace('_', '-') + '-01')
+    return str(data_dir)
+
+def random_ranges(rng, first, last, count=40):
+    ranges = [(None, None), (first, last), (last, first)]
+    span = (last - first).days
+    for _ in range(count):
+        start = first + timedelta(days=rng.randint(-5, span + 5))
+        ranges.append((start, start + timedelta(days=rng.randint(0, 40))))
+    return ranges
+
+def test_range_index_matches_brute_force():
+    rng = random.Random(1)
+    dates = [date(2024, 1, 1) + timedelta(days=rng.randint(0, 90)) for _ in range(500)]
+    values = [rng.uniform(-50, 50) for _ in dates]
+    values[3] = np.nan
+    index = RangeIndex(dates, {'amount': values})
+    for start, end in random_ranges(rng, date(2024, 1, 1), date(2024, 3, 31)):
+        expected = sum(
+            value for day, value in zip(dates, values)
+            if not np.isnan(value) and (start is None or day >= start) and (end is None or day <= end)
+        )
+        assert abs(index.total('amount', start, end) - expected) < 1e-6
+
+def test_range_totals_match_brute_force(tmp_path):
+    db = Database(make_store(tmp_path))
+    for number in range(60):
+        db.add_expense({'date': (date(2023, 11, 1) + timedelta(days=number * 2)).isoformat(),
+                        'description': f'Expense {number}', 'amount': number + 0.25})
+    sales = db.sales_store.get_sales()
+    categories = rollup_categories(sales)
+    days = sales['Date'].dt.date
+    expenses = db.get_expenses_df()
+
+    rng = random.Random(2)
+    for start, end in random_ranges(rng, date(2023, 11, 1), date(2024, 1, 31)):
+        in_range = pd.Series(True, index=sales.index)
+        expense_in_range = pd.Series(True, index=expenses.index)
+        if start is not None:
+            in_range &= days >= start
+            expense_in_range &= expenses['date'].dt.date >= start
+        if end is not None:
+            in_range &= days <= end
+            expense_in_range &= expenses['date'].dt.date <= end
+
+        totals = db.get_range_totals(start, end)
+        for category, value in categories[in_range].sum().items():
+            assert abs(totals[category] - value) < 1e-6, category
+        assert abs(totals['expenses'] - expenses['amount'][expense_in_range].sum()) < 1e-6
+
+def brute_force_search(sales, query):
+    words = tokenize(query)
+    text = (sales['Order ID'].fillna('').astype(str) + ' ' + sales['Items'].fillna('').astype(str)).str.lower()
+    matches = text.apply(lambda value: all(
+        any(token.startswith(word) for token in re.findall(r'\w+', value)) for word in words))
+    return sales[matches] if words else sales.iloc[:0]
+
+def row_keys(frame):
+    return sorted(zip(frame['Order ID'].astype(str), frame['Items'].astype(str), frame['Net'].round(2)))
+
+def test_search_matches_brute_force(tmp_path):
+    db = Database(make_store(tmp_path))
+    sales = db.sales_store.get_sales()
+    order_id = str(sales['Order ID'].dropna().iloc[5])
+    assert len(db.search_sales('mug')) > 0 and len(db.search_sales(order_id)) == 1
+    for query in ['mug', 'Cer MUG', 'glazed bowl', 'vase large', 'refunded', 'listing', 'label', 'ads',
+                  order_id, order_id[:6], 'nothing-like-this', '', '  ']:
+        assert row_keys(db.search_sales(query)) == row_keys(brute_force_search(sales, query)), query
+
+def test_search_index_follows_replaced_sources(tmp_path):
+    index = SearchIndex(str(tmp_path), 1)
+    index.set_source('etsy_statement_2024_01.csv', 'a', {'mug': [0, 2], 'bowl': [1]}, save=False)
+    index.set_source('etsy_statement_2024_02.csv', 'b', {'mug': [3]}, save=False)
+    assert index.search('mu') == {'etsy_statement_2024_01.csv': [0, 2], 'etsy_statement_2024_02.csv': [3]}
+    index.set_source('etsy_statement_2024_01.csv', 'c', {'vase': [0]}, save=False)
+    assert index.search('mug') == {'etsy_statement_2024_02.csv': [3]}
+    index.remove_source('etsy_statement_2024_02.csv', save=False)
+    assert index.search('mug') == {}
+    assert index.search('va') == {'etsy_statement_2024_01.csv': [0]}
+
+def test_search_index_of_another_parser_version_is_rebuilt(tmp_path, monkeypatch):
+    db = Database(make_store(tmp_path))
+    db.sales_store.get_sales()
+    expected = row_keys(db.search_sales('mug'))
+
+    # Rows numbered by an older parser no longer point at the right sales
+    for source in db.search_index.sources.values():
+        source['parser_version'] = 0
+        source['tokens'] = {'mug': [0]}
+    db.search_index.save()
+
+    reopened = Database(db.storage_path)
+    assert row_keys(reopened.search_sales('mug')) == expected
+    assert {source['parser_version'] for source in reopened.search_index.sources.values()} == {
+        reopened.search_index.parser_version}
+
+def test_import_writes_the_indexes_once(tmp_path, monkeypatch):
+    db = Database(make_store(tmp_path, months=()))
+    sources = {}
+    for seed, month in enumerate(('2024_01', '2024_02', '2024_03', '2024_04')):
+        sources[month] = str(tmp_path / f'download_{month}.csv')
+        write_statement(sources[month], 200, seed=seed, start=month.replace('_', '-') + '-01')
+
+    saves = []
+    for index in (db.order_index, db.manifest, db.search_index):
+        save = index.save
+        monkeypatch.setattr(index, 'save', lambda save=save, index=index: (saves.append(type(index).__name__), save()))
+    assert sorted(db.import_statements(sources)) == sorted(sources)
+    assert sorted(saves) == ['OrderIndex', 'SearchIndex', 'StatementManifest']
+
+    reopened = Database(db.storage_path)
+    assert set(reopened.search_index.sources) == {f'etsy_statement_{month}.csv' for month in sources}
+    assert set(reopened.manifest.statements) == set(reopened.search_index.sources)
@@ -0,0 +1,79 @@
+import os
+from modules.database import Database
+from tests.statement_factory import write_statement
+
+def make_store(tmp_path):
+    data_dir = tmp_path / 'data'
+    os.makedirs(data_dir / 'statements')
+    for seed, month in enumerate(('2024_01', '2024_02')):
+        write_statement(data_dir / 'statements' / f'etsy_statement_{month}.csv', 200, seed=seed,
+                        start=month.replace('_', '-') + '-01')
+    # Not a statement at all, so it can never be consolidated
+    (data_dir / 'statements' / 'etsy_statement_2024_03.csv').write_text('hello\nworld\n')
+    return str(data_dir)
+
+def count_reloads(db, monkeypatch):
+    reloads = []
+    reload = db.sales_store.reload
+    def counting_reload():
+        reloads.append(1)
+        return reload()
+    monkeypatch.setattr(db.sales_store, 'reload', counting_reload)
+    return reloads
+
+def test_failed_statement_does_not_reload_on_every_manifest_call(tmp_path, monkeypatch):
+    db = Database(make_store(tmp_path))
+    db.get_statement_manifest()
+    assert 'etsy_statement_2024_03.csv' in db.manifest.failed
+
+    reloads = count_reloads(db, monkeypatch)
+    for _ in range(3):
+        db.get_years_from_sales()
+        db.get_statement_manifest()
+    assert reloads == []
+
+    # A reopened database remembers the failure too
+    reopened = Database(db.storage_path)
+    reloads = count_reloads(reopened, monkeypatch)
+    reopened.get_statement_manifest()
+    assert reloads == []
+
+def test_failed_statement_is_retried_once_fixed(tmp_path, monkeypatch):
+    db = Database(make_store(tmp_path))
+    db.get_statement_manifest()
+    calls = []
+    load_statement = db.load_statement
+    def counting_load(file_path):
+        calls.append(os.path.basename(file_path))
+        return load_statement(file_path)
+    monkeypatch.setattr(db, 'load_statement', counting_load)
+
+    db.sales_store.reload()
+    db.sales_store.get_sales()
+    assert 'etsy_statement_2024_03.csv' not in calls
+
+    write_statement(os.path.join(db.statements_dir, 'etsy_statement_2024_03.csv'), 200, seed=3,
+                    start='2024-03-01')
+    db.check_statements()
+    db.sales_store.get_sales()
+    assert 'etsy_statement_2024_03.csv' in calls
+    assert 'etsy_statement_2024_03.csv' not in db.manifest.failed
+    assert db.manifest.statements['etsy_statement_2024_03.csv']['rows'] > 0
+
+def test_manifest_reload_only_reports_changed_statements(tmp_path, monkeypatch):
+    db = Database(make_store(tmp_path))
+    db.sales_store.get_sales()
+    # Even a statement the manifest never records must not make every rollup a data change
+    monkeypatch.setattr(db.manifest, 'set_failed', lambda *args, **kwargs: None)
+    db.manifest.failed.clear()
+    version = db.get_data_version('sales')
+    for _ in range(3):
+        db.get_sales_rollup()
+    assert db.get_data_version('sales') == version
+
+    write_statement(os.path.join(db.statements_dir, 'etsy_statement_2024_04.csv'), 200, seed=4,
+                    start='2024-04-01')
+    db.get_sales_rollup()
+    assert db.get_data_version('sales') == version + 1
+    assert not db.check_statements()
+    assert db.get_data_version('sales') == version + 1
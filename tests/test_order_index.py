@@ -0,0 +1,54 @@
+import os
+import pandas as pd
+from modules.database import Database, consolidate_statement
+from modules.order_index import OrderIndex
+from tests.statement_factory import write_statement
+
+def make_store(tmp_path, months=('2024_01', '2024_02', '2024_03')):
+    data_dir = tmp_path / 'data'
+    os.makedirs(data_dir / 'statements')
+    for seed, month in enumerate(months):
+        write_statement(data_dir / 'statements' / f'etsy_statement_{month}.csv', 400, seed=seed,
+                        start=month.replace('_', '-') + '-01')
+    return str(data_dir)
+
+def brute_force_order_ids(db):
+    order_ids = set()
+    for file_path in db.get_statement_files():
+        processed_df = consolidate_statement(pd.read_csv(file_path))
+        order_ids.update(str(order_id) for order_id in processed_df['Order ID'].dropna())
+    return order_ids
+
+def test_order_lookups_match_statements_without_reading_them(tmp_path, monkeypatch):
+    db = Database(make_store(tmp_path))
+    db.sales_store.get_sales()
+    expected = brute_force_order_ids(db)
+
+    reopened = Database(db.storage_path)
+    def fail():
+        raise AssertionError("order lookups must not load the sales")
+    monkeypatch.setattr(reopened.sales_store, 'get_sales', fail)
+    monkeypatch.setattr(reopened, 'load_statements', fail)
+    assert reopened.get_existing_order_ids() == expected
+    assert all(reopened.has_order(order_id) for order_id in list(expected)[:50])
+    assert not reopened.has_order('no-such-order')
+
+def test_order_index_follows_replaced_and_cleared_statements(tmp_path):
+    db = Database(make_store(tmp_path))
+    db.sales_store.get_sales()
+    replacement = tmp_path / 'replacement.csv'
+    write_statement(replacement, 400, seed=42, start='2024-02-01')
+    db.import_statements({'2024_02': str(replacement)})
+    assert db.get_existing_order_ids() == brute_force_order_ids(db)
+
+    db.clear_sales_data()
+    assert db.get_existing_order_ids() == set()
+
+def test_find_locates_orders(tmp_path):
+    index = OrderIndex(str(tmp_path / 'order_index.json'))
+    index.set_source('etsy_statement_2024_01.csv', 'a', ['1', None, '2'], save=False)
+    index.set_source('etsy_statement_2024_02.csv', 'b', ['2'], save=False)
+    assert sorted(index.find('2')) == [('2024_01', 'etsy_statement_2024_01.csv', 2),
+                                       ('2024_02', 'etsy_statement_2024_02.csv', 0)]
+    index.remove_source('etsy_statement_2024_01.csv', save=False)
+    assert '1' not in index and index.find('2') == [('2024_02', 'etsy_statement_2024_02.csv', 0)]
@@ -0,0 +1,92 @@
+import os
+import pytest
+from modules.database import Database
+from modules.receipt_store import ReceiptStore
+
+def add_with_receipt(db, source, description):
+    receipt_file = db.store_receipt(str(source))
+    return db.add_expense({'date': '2024-03-01', 'description': description, 'amount': 5.0,
+                           'receipt_file': receipt_file}), receipt_file
+
+def blob_path(db, receipt_file):
+    return os.path.join(db.receipts_dir, *receipt_file.split('/'))
+
+def test_shared_receipt_is_stored_once_and_collected_with_its_last_expense(tmp_path, monkeypatch):
+    monkeypatch.setattr(ReceiptStore, 'GC_GRACE_SECONDS', -60)
+    db = Database(str(tmp_path / 'data'))
+    source = tmp_path / 'receipt.pdf'
+    source.write_bytes(b'%PDF receipt')
+
+    first, receipt_file = add_with_receipt(db, source, 'Paper')
+    second, same_file = add_with_receipt(db, source, 'More paper')
+    assert receipt_file == same_file
+    assert db.get_receipt_refcounts()[receipt_file] == 2
+
+    db.delete_expense(first)
+    db.receipt_store.close()
+    assert os.path.exists(blob_path(db, receipt_file))
+    assert db.get_receipt_refcounts()[receipt_file] == 1
+
+    db.delete_expense(second)
+    db.receipt_store.close()
+    assert not os.path.exists(blob_path(db, receipt_file))
+
+def test_replaced_receipt_is_collected(tmp_path, monkeypatch):
+    monkeypatch.setattr(ReceiptStore, 'GC_GRACE_SECONDS', -60)
+    db = Database(str(tmp_path / 'data'))
+    old, new = tmp_path / 'old.png', tmp_path / 'new.png'
+    old.write_bytes(b'old')
+    new.write_bytes(b'new')
+
+    expense_id, old_file = add_with_receipt(db, old, 'Ink')
+    new_file = db.store_receipt(str(new))
+    db.update_expense_receipt(expense_id, new_file)
+    db.receipt_store.close()
+    assert not os.path.exists(blob_path(db, old_file))
+    assert os.path.exists(blob_path(db, new_file))
+
+def test_recent_blobs_survive_collection(tmp_path):
+    store = ReceiptStore(str(tmp_path / 'receipts'))
+    source = tmp_path / 'receipt.jpg'
+    source.write_bytes(b'jpeg')
+    receipt_file = store.add(str(source))
+    # Stored moments ago and not yet attached to an expense
+    assert store.collect_garbage(set()) == 0
+    assert os.path.exists(os.path.join(store.receipts_dir, *receipt_file.split('/')))
+
+def test_receipts_of_a_rolled_back_batch_are_collected(tmp_path, monkeypatch):
+    monkeypatch.setattr(ReceiptStore, 'GC_GRACE_SECONDS', -60)
+    db = Database(str(tmp_path / 'data'))
+    source = tmp_path / 'receipt.pdf'
+    source.write_bytes(b'%PDF rolled back')
+    version = db.get_data_version('expenses')
+
+    with pytest.raises(RuntimeError):
+        with db.batch():
+            _, receipt_file = add_with_receipt(db, source, 'Paper')
+            raise RuntimeError("stop")
+    db.receipt_store.close()
+
+    assert len(db.get_expenses()) == 0
+    assert not os.path.exists(blob_path(db, receipt_file))
+    assert db.get_data_version('expenses') > version
+
+def test_unreferenced_receipts_are_collected_at_startup(tmp_path, monkeypatch):
+    db = Database(str(tmp_path / 'data'))
+    orphan, kept = tmp_path / 'orphan.pdf', tmp_path / 'kept.pdf'
+    orphan.write_bytes(b'%PDF orphan')
+    kept.write_bytes(b'%PDF kept')
+    orphan_id, orphan_file = add_with_receipt(db, orphan, 'Paper')
+    _, kept_file = add_with_receipt(db, kept, 'Ink')
+    # Still within the grace period when its expense is deleted
+    db.delete_expense(orphan_id)
+    db.close()
+    assert os.path.exists(blob_path(db, orphan_file))
+
+    # Stale by the next start, which collects it the way main.py does
+    monkeypatch.setattr(ReceiptStore, 'GC_GRACE_SECONDS', -60)
+    reopened = Database(str(tmp_path / 'data'))
+    reopened.collect_receipts()
+    reopened.close()
+    assert not os.path.exists(blob_path(reopened, orphan_file))
+    assert os.path.exists(blob_path(reopened, kept_file))
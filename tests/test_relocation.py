@@ -0,0 +1,138 @@
+import os
+import pytest
+from modules import relocation
+from modules.relocation import relocate, RESUME_FILENAME
+
+def make_source(tmp_path, count=30):
+    source = tmp_path / 'source'
+    for number in range(count):
+        folder = source / ('receipts' if number % 2 else 'statements')
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f'file_{number}.bin').write_bytes(os.urandom(1000 + number))
+    (source / 'expenses.json').write_text('[]')
+    return source
+
+def tree(directory):
+    return {
+        os.path.relpath(os.path.join(root, name), directory): open(os.path.join(root, name), 'rb').read()
+        for root, _, names in os.walk(directory) for name in names
+    }
+
+def test_cancelled_copy_resumes_without_copying_finished_files(tmp_path, monkeypatch):
+    source = make_source(tmp_path)
+    target = tmp_path / 'target'
+    names = ['expenses.json', 'receipts', 'statements']
+    monkeypatch.setattr(relocation, 'COPY_WORKERS', 1)
+
+    progress = []
+    assert not relocate(str(source), str(target), names, progress=lambda done, total: progress.append(done),
+                        is_cancelled=lambda: len(progress) > 5)
+    assert os.path.exists(target / RESUME_FILENAME)
+    assert not any(path.endswith('.part') for path in tree(target))
+
+    copied = []
+    transfer = relocation._transfer
+    def counting_transfer(source_file, target_file, allow_link):
+        copied.append(source_file)
+        return transfer(source_file, target_file, allow_link)
+    monkeypatch.setattr(relocation, '_transfer', counting_transfer)
+
+    assert relocate(str(source), str(target), names)
+    assert 0 < len(copied) < 31
+    assert tree(target) == tree(source)
+
+def test_changed_source_is_copied_again_on_resume(tmp_path):
+    source = make_source(tmp_path, count=4)
+    target = tmp_path / 'target'
+    names = ['expenses.json', 'receipts', 'statements']
+    assert not relocate(str(source), str(target), names, is_cancelled=lambda: True)
+    state_source = relocation._ResumeState(str(source), str(target))
+    for relative_path in relocation.list_files(str(source), names):
+        state_source.add(relative_path, os.path.join(source, relative_path))
+        os.makedirs(os.path.dirname(os.path.join(target, relative_path)), exist_ok=True)
+        with open(os.path.join(target, relative_path), 'wb') as f:
+            f.write(open(os.path.join(source, relative_path), 'rb').read())
+    state_source.save()
+
+    (source / 'expenses.json').write_text('[{"id": 1}]')
+    assert relocate(str(source), str(target), names)
+    assert tree(target) == tree(source)
+    assert not os.path.exists(target / RESUME_FILENAME)
+
+def test_move_removes_sources_only_when_complete(tmp_path):
+    source = make_source(tmp_path, count=6)
+    expected = tree(source)
+    target = tmp_path / 'target'
+    names = ['expenses.json', 'receipts', 'statements']
+    assert relocate(str(source), str(target), names, move=True)
+    assert tree(target) == expected
+    assert tree(source) == {}
+
+def test_copy_data_to_includes_inventory_images(tmp_path):
+    from modules.database import Database
+    db = Database(str(tmp_path / 'data'))
+    image = tmp_path / 'mug.png'
+    image.write_bytes(b'png')
+    db.add_inventory_item({'name': 'Mug', 'description': '', 'count': 3, 'image': str(image)})
+    receipt_file = db.store_receipt(str(image))
+    db.add_expense({'date': '2024-01-02', 'description': 'Clay', 'amount': 3.0, 'receipt_file': receipt_file})
+
+    target = tmp_path / 'copy'
+    assert db.copy_data_to(str(target))
+    assert tree(target / 'inventory_images') == tree(db.inventory_images_dir) != {}
+    assert tree(target / 'receipts') == tree(db.receipts_dir)
+    assert Database(str(target)).get_inventory()[0]['name'] == 'Mug'
+
+def test_copies_are_on_disk_before_they_are_verified(tmp_path, monkeypatch):
+    source = tmp_path / 'source.bin'
+    source.write_bytes(os.urandom(3 * relocation.CHUNK_SIZE + 7))
+    events = []
+    fsync = os.fsync
+    monkeypatch.setattr(relocation.os, 'fsync', lambda fd: (events.append('fsync'), fsync(fd)))
+    file_hash = relocation._file_hash
+    monkeypatch.setattr(relocation, '_file_hash', lambda path: (events.append('verify'), file_hash(path))[1])
+    monkeypatch.setattr(relocation, '_reflink', lambda source, target: False)
+
+    assert relocation._transfer(str(source), str(tmp_path / 'out' / 'target.bin'), False) == 'copy'
+    assert events == ['fsync', 'verify']
+    assert (tmp_path / 'out' / 'target.bin').read_bytes() == source.read_bytes()
+
+def test_only_receipt_blobs_are_shared_with_the_copy(tmp_path):
+    source = tmp_path / 'source'
+    for relative_path in ('receipts/blobs/ab/abc.pdf', 'receipts/old.pdf', 'inventory_images/1.png'):
+        os.makedirs(os.path.dirname(source / relative_path), exist_ok=True)
+        (source / relative_path).write_bytes(relative_path.encode())
+    target = tmp_path / 'target'
+    assert relocate(str(source), str(target), ['receipts', 'inventory_images'])
+
+    def shared(relative_path):
+        return os.path.samefile(source / relative_path, target / relative_path)
+    assert shared('receipts/blobs/ab/abc.pdf')
+    assert not shared('receipts/old.pdf') and not shared('inventory_images/1.png')
+
+def test_storing_an_inventory_image_never_writes_into_a_shared_file(tmp_path):
+    from modules.database import Database
+    db = Database(str(tmp_path / 'data'))
+    # An image path shared with another data directory through a hard link
+    shared = tmp_path / 'shared.png'
+    shared.write_bytes(b'old item')
+    os.link(shared, os.path.join(db.inventory_images_dir, '1.png'))
+    image = tmp_path / 'mug.png'
+    image.write_bytes(b'new item')
+
+    db.add_inventory_item({'name': 'Mug', 'description': '', 'count': 1, 'image': str(image)})
+    assert db.get_inventory()[0]['image'] == os.path.join(db.inventory_images_dir, '1.png')
+    assert open(db.get_inventory()[0]['image'], 'rb').read() == b'new item'
+    assert shared.read_bytes() == b'old item'
+
+def test_clones_are_checked_like_copies(tmp_path, monkeypatch):
+    source = tmp_path / 'source.bin'
+    source.write_bytes(b'original')
+    def bad_reflink(source_file, target_file):
+        with open(target_file, 'wb') as f:
+            f.write(b'garbled')
+        return True
+    monkeypatch.setattr(relocation, '_reflink', bad_reflink)
+    with pytest.raises(OSError, match='Checksum mismatch'):
+        relocation._transfer(str(source), str(tmp_path / 'target.bin'), False)
+    assert not os.path.exists(tmp_path / 'target.bin') and not os.path.exists(tmp_path / 'target.bin.part')
@@ -0,0 +1,33 @@
+import os
+from modules.database import Database
+from modules.statement_cache import local_cache_dir
+from tests.statement_factory import write_statement
+
+def test_statement_cache_is_kept_outside_the_data_directory(tmp_path, local_cache):
+    data_dir = tmp_path / 'data'
+    os.makedirs(data_dir / 'statements')
+    write_statement(data_dir / 'statements' / 'etsy_statement_2024_03.csv', 200)
+
+    db = Database(str(data_dir))
+    assert len(db.sales_store.get_sales()) > 0
+    data_files = [name for _, _, names in os.walk(data_dir) for name in names]
+    assert not [name for name in data_files if name.endswith('.pkl')]
+    assert os.path.commonpath([db.statement_cache.cache_dir, str(local_cache)]) == str(local_cache)
+    assert os.listdir(local_cache_dir(str(data_dir)))
+
+def test_cache_entry_describes_the_bytes_read(tmp_path):
+    data_dir = tmp_path / 'data'
+    os.makedirs(data_dir / 'statements')
+    statement = data_dir / 'statements' / 'etsy_statement_2024_03.csv'
+    write_statement(statement, 200)
+
+    db = Database(str(data_dir))
+    db.sales_store.get_sales()
+    entry = db.statement_cache.index[statement.name]
+    assert entry['size'] == os.path.getsize(statement)
+    assert db.statement_cache.is_current(str(statement))
+
+    # Rewritten with other content: reprocessed even if the size matches
+    content = statement.read_bytes()
+    statement.write_bytes(content.replace(b'Ceramic', b'Ceramix'))
+    assert not db.statement_cache.is_current(str(statement))
@@ -0,0 +1,123 @@
+import json
+import pytest
+from modules.storage import JsonStorage, SqliteStorage
+
+def expense(number):
+    return {'date': f'2024-01-{number % 28 + 1:02d}', 'description': f'Expense {number}',
+            'amount': float(number), 'receipt_file': None}
+
+def descriptions(storage):
+    return sorted(e['description'] for e in storage.get_expenses())
+
+def test_journal_replays_after_torn_write(tmp_path, capsys):
+    storage = JsonStorage(str(tmp_path))
+    for number in range(3):
+        storage.add_expense(expense(number))
+
+    # A crash in the middle of appending leaves half a line behind
+    with open(storage.journal_file, 'a') as f:
+        f.write('{"op": "add", "expense": {"id": 99, "da')
+
+    reopened = JsonStorage(str(tmp_path))
+    assert descriptions(reopened) == ['Expense 0', 'Expense 1', 'Expense 2']
+    reopened.add_expense(expense(3))
+    reopened.delete_expense(1)
+
+    # The events written after the torn line are still replayed
+    again = JsonStorage(str(tmp_path))
+    assert descriptions(again) == ['Expense 1', 'Expense 2', 'Expense 3']
+    assert 'journal line 4' in capsys.readouterr().out
+
+def test_torn_line_in_the_middle_is_skipped(tmp_path, capsys):
+    storage = JsonStorage(str(tmp_path))
+    storage.add_expense(expense(0))
+    with open(storage.journal_file, 'a') as f:
+        f.write('{"op": "add"\n')
+        f.write(json.dumps({'op': 'add', 'expense': {'id': 5, **expense(5)}}) + '\n')
+
+    assert descriptions(JsonStorage(str(tmp_path))) == ['Expense 0', 'Expense 5']
+    assert 'journal line 2' in capsys.readouterr().out
+
+def test_compaction_keeps_every_expense(tmp_path, monkeypatch):
+    monkeypatch.setattr(JsonStorage, 'JOURNAL_COMPACT_BYTES', 2048)
+    storage = JsonStorage(str(tmp_path))
+    expected = {}
+    for number in range(200):
+        expected[storage.add_expense(expense(number))] = f'Expense {number}'
+        if number % 7 == 0:
+            storage.update_expense(number // 2 + 1, {'description': f'Updated {number}'})
+            expected[number // 2 + 1] = f'Updated {number}'
+        if number % 11 == 0:
+            storage.delete_expense(number // 3 + 1)
+            expected.pop(number // 3 + 1, None)
+    storage.close()
+
+    assert {e['id']: e['description'] for e in JsonStorage(str(tmp_path)).get_expenses()} == expected
+    storage.flush()
+    assert (tmp_path / 'expenses.journal').stat().st_size == 0
+    with open(tmp_path / 'expenses.json') as f:
+        assert {e['id']: e['description'] for e in json.load(f)['expenses']} == expected
+
+def test_batch_rollback_undoes_every_change(tmp_path):
+    storage = JsonStorage(str(tmp_path))
+    storage.add_expense(expense(0))
+    storage.add_inventory_item({'id': storage.next_inventory_id(), 'name': 'Mug'})
+    storage.close()
+    version = storage.expenses_version()
+
+    with pytest.raises(RuntimeError):
+        with storage.batch():
+            storage.add_expense(expense(1))
+            storage.update_expense(1, {'description': 'Changed'})
+            storage.delete_inventory_item(1)
+            raise RuntimeError("stop")
+
+    assert descriptions(storage) == ['Expense 0']
+    assert [item['name'] for item in storage.get_inventory()] == ['Mug']
+    assert storage.expenses_version() != version
+    # Nothing of the batch reached the files
+    assert descriptions(JsonStorage(str(tmp_path))) == ['Expense 0']
+
+@pytest.mark.parametrize('backend', [JsonStorage, SqliteStorage])
+def test_ids_of_deleted_expenses_are_not_reused(tmp_path, backend):
+    storage = backend(str(tmp_path))
+    first = storage.add_expense(expense(0))
+    last = storage.add_expense(expense(1))
+    storage.delete_expense(last)
+    # From the journal
+    storage.close()
+    storage = backend(str(tmp_path))
+    assert storage.add_expense(expense(2)) == last + 1
+    storage.delete_expense(last + 1)
+
+    # From the compacted snapshot
+    storage.flush()
+    storage.close()
+    storage = backend(str(tmp_path))
+    assert storage.add_expense(expense(3)) == last + 2
+    assert first == 1
+
+def test_snapshot_without_next_id_still_loads(tmp_path):
+    (tmp_path / 'expenses.json').write_text(json.dumps([{'id': 4, **expense(4)}]))
+    storage = JsonStorage(str(tmp_path))
+    assert descriptions(storage) == ['Expense 4']
+    assert storage.add_expense(expense(5)) == 5
+
+@pytest.mark.parametrize('backend', [JsonStorage, SqliteStorage])
+def test_ids_of_deleted_inventory_items_are_not_reused(tmp_path, backend):
+    storage = backend(str(tmp_path))
+    for name in ('Mug', 'Bowl'):
+        storage.add_inventory_item({'id': storage.next_inventory_id(), 'name': name})
+    largest = max(item['id'] for item in storage.get_inventory())
+    storage.delete_inventory_item(largest)
+    storage.close()
+
+    storage = backend(str(tmp_path))
+    assert storage.next_inventory_id() == largest + 1
+    assert [item['name'] for item in storage.get_inventory()] == ['Mug']
+
+def test_inventory_without_next_id_still_loads(tmp_path):
+    (tmp_path / 'inventory.json').write_text(json.dumps([{'id': 3, 'name': 'Vase'}]))
+    storage = JsonStorage(str(tmp_path))
+    assert [item['name'] for item in storage.get_inventory()] == ['Vase']
+    assert storage.next_inventory_id() == 4
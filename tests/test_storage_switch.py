@@ -0,0 +1,33 @@
+import os
+from datetime import date
+import pytest
+from modules.database import Database
+from modules.storage import SqliteStorage, SQLITE_FILENAME
+
+def test_failed_switch_keeps_json_storage(tmp_path, monkeypatch):
+    db = Database(str(tmp_path))
+    db.add_expense({'date': '2024-01-05', 'description': 'Paper', 'amount': 12.5})
+
+    def fail(self, expenses, inventory):
+        raise OSError("disk full")
+    monkeypatch.setattr(SqliteStorage, 'replace_all', fail)
+    with pytest.raises(OSError):
+        db.switch_storage_backend('sqlite')
+
+    assert db.storage.backend == 'json'
+    assert not os.path.exists(tmp_path / SQLITE_FILENAME)
+    # Without a saved backend the next start must still open the JSON data
+    assert Database(str(tmp_path)).storage.backend == 'json'
+    assert [expense['description'] for expense in db.get_expenses()] == ['Paper']
+
+def test_sqlite_keeps_no_date_index_and_still_filters_by_date(tmp_path):
+    db = Database(str(tmp_path))
+    for day in (3, 9, 17, 28):
+        db.add_expense({'date': f'2024-02-{day:02d}', 'description': f'Day {day}', 'amount': float(day)})
+    db.switch_storage_backend('sqlite')
+
+    indexes = db.storage.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'expenses'")
+    assert 'idx_expenses_date' not in [row['name'] for row in indexes]
+    for expenses in (db.storage.get_expenses(date(2024, 2, 9), date(2024, 2, 17)),
+                     db.get_expenses(date(2024, 2, 9), date(2024, 2, 17))):
+        assert [expense['description'] for expense in expenses] == ['Day 9', 'Day 17']